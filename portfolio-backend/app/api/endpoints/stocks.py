@@ -1,7 +1,16 @@
-from fastapi import APIRouter, Query
-from typing import List
-from app.services.stock_service import StockService
-from app.models.stock import StockResponse
+from fastapi import APIRouter, Query, Request, Response
+import json
+from typing import List, Optional
+from app.services.stock_service import (
+    MAX_BATCH_SYMBOLS, StockService, history_store, market_data, price_scheduler,
+    quote_versions, symbol_index, upstream_gateway, warm_up
+)
+from app.services.symbols import MAX_SEARCH_LIMIT
+from app.services.versions import etag_matches
+from app.models.stock import (
+    BacktestRequest, OptimizeRequest, RiskRequest, StockResponse, ValuationRequest
+)
+from app.services.portfolio import MAX_HOLDINGS
 
 router = APIRouter(prefix="/stocks", tags=["stocks"])
 
@@ -10,22 +19,159 @@ router = APIRouter(prefix="/stocks", tags=["stocks"])
 async def get_stock_price(symbol: str):
     """Get current price for a stock"""
     try:
-        price_data = StockService.get_stock_price(symbol)
+        price_data = await StockService.get_stock_price_async(symbol)
         return StockResponse(success=True, data=price_data.dict())
     except Exception as e:
         return StockResponse(success=False, error=str(e))
 
 
+@router.get("/search")
+async def search_symbols(q: str = Query(..., min_length=1),
+                         limit: int = Query(10, ge=1, le=MAX_SEARCH_LIMIT)):
+    """Typeahead over listed symbols and company names"""
+    if symbol_index is None:
+        return StockResponse(success=False, error="Symbol master not loaded")
+    return {"success": True, "data": symbol_index.search(q, limit)}
+
+
 @router.get("/batch/prices")
-async def get_batch_prices(symbols: List[str] = Query(...)):
-    """Get prices for multiple stocks"""
+async def get_batch_prices(request: Request, response: Response,
+                           symbols: List[str] = Query(...),
+                           since: Optional[int] = None):
+    """Get prices for multiple stocks (?symbols=A&symbols=B or ?symbols=A,B).
+
+    With ``since`` (the ``version`` of an earlier response) only quotes that
+    changed after it are returned. Honours If-None-Match with 304.
+    """
+    try:
+        symbols = list(dict.fromkeys(
+            part.strip().upper()
+            for value in symbols for part in value.split(',') if part.strip()
+        ))
+        if not 0 < len(symbols) <= MAX_BATCH_SYMBOLS:
+            raise ValueError(f"Pass 1 to {MAX_BATCH_SYMBOLS} symbols")
+        prices = await StockService.get_multiple_prices_async(symbols)
+
+        keys = {symbol: StockService.format_indian_symbol(symbol) for symbol in symbols}
+        etag = quote_versions.etag(keys.values())
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+
+        result = {"success": True, "data": prices, "version": quote_versions.current()}
+        if since is not None:
+            result["data"] = {
+                symbol: price for symbol, price in prices.items()
+                if "error" in price or quote_versions.get(keys[symbol]) > since
+            }
+            result["unchanged"] = [s for s in symbols if s not in result["data"]]
+        return result
+    except Exception as e:
+        return StockResponse(success=False, error=str(e))
+
+
+@router.post("/portfolio/value")
+async def value_portfolio(request: Request, response: Response,
+                          portfolio: ValuationRequest):
+    """Per-holding value and P&L, sector allocation and totals.
+
+    With ``since`` (the ``version`` of an earlier response) only holdings
+    whose quote changed after it are listed; totals and sector allocation
+    always cover the whole portfolio. Honours If-None-Match with 304.
+    """
+    try:
+        if not 0 < len(portfolio.holdings) <= MAX_HOLDINGS:
+            raise ValueError(f"'holdings' needs 1 to {MAX_HOLDINGS} entries")
+        holdings = [
+            {**holding.dict(), "symbol": holding.symbol.strip().upper()}
+            for holding in portfolio.holdings
+        ]
+        if len({h["symbol"] for h in holdings}) > MAX_BATCH_SYMBOLS:
+            raise ValueError(f"At most {MAX_BATCH_SYMBOLS} distinct symbols per portfolio")
+        valuation = await StockService.value_portfolio_async(holdings)
+
+        # The same quotes value a different portfolio differently, so the
+        # holdings are part of the tag
+        keys = {h["symbol"]: StockService.format_indian_symbol(h["symbol"]) for h in holdings}
+        etag = quote_versions.etag(keys.values(), extra=json.dumps(holdings, sort_keys=True))
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+
+        valuation["version"] = quote_versions.current()
+        if portfolio.since is not None:
+            # Holdings without a price stay in, as in real_backend
+            valuation["holdings"] = [
+                row for row in valuation["holdings"]
+                if not row["priceAvailable"]
+                or quote_versions.get(keys[row["symbol"]]) > portfolio.since
+            ]
+            valuation["delta"] = True
+        return StockResponse(success=True, data=valuation)
+    except Exception as e:
+        return StockResponse(success=False, error=str(e))
+
+
+@router.post("/portfolio/risk")
+async def portfolio_risk(request: RiskRequest):
+    """Volatility, correlation, beta vs NIFTY, drawdown and VaR of the holdings"""
     try:
-        prices = StockService.get_multiple_prices(symbols)
-        return StockResponse(success=True, data=prices)
+        if not 0 < len(request.holdings) <= MAX_HOLDINGS:
+            raise ValueError(f"'holdings' needs 1 to {MAX_HOLDINGS} entries")
+        holdings = [holding.dict() for holding in request.holdings]
+        risk = await StockService.portfolio_risk_async(
+            holdings, request.start, request.window, request.confidence)
+        return StockResponse(success=True, data=risk)
     except Exception as e:
         return StockResponse(success=False, error=str(e))
 
 
+@router.post("/portfolio/optimize")
+async def optimize_portfolio(request: OptimizeRequest):
+    """Efficient frontier, minimum-variance and max-Sharpe portfolios"""
+    try:
+        options = request.dict()
+        symbols, start = options.pop("symbols"), options.pop("start")
+        frontier = await StockService.efficient_frontier_async(symbols, start, **options)
+        return StockResponse(success=True, data=frontier)
+    except Exception as e:
+        return StockResponse(success=False, error=str(e))
+
+
+@router.post("/portfolio/backtest")
+async def backtest_portfolio(request: BacktestRequest):
+    """Equity curves, CAGR, volatility and drawdown for a batch of allocations"""
+    try:
+        options = request.dict()
+        symbols, allocations = options.pop("symbols"), options.pop("allocations")
+        start, end = options.pop("start"), options.pop("end")
+        options["rebalance"] = options["rebalance"].lower()
+        result = await StockService.backtest_async(
+            symbols, allocations, start, end, **options)
+        return StockResponse(success=True, data=result)
+    except Exception as e:
+        return StockResponse(success=False, error=str(e))
+
+
+@router.get("/stats")
+async def get_stats():
+    """Cache and upstream call counters"""
+    return {
+        "success": True,
+        "data": {
+            "caches": [StockService.price_cache.stats()],
+            "schedulers": [price_scheduler.stats()],
+            "warm_up": warm_up.stats(),
+            "upstream": upstream_gateway.stats(),
+            "market_data": market_data.stats(),
+            "symbols": symbol_index.stats() if symbol_index is not None else None,
+            "history": history_store.stats() if history_store is not None else None
+        }
+    }
+
+
 @router.get("/")
 async def get_available_stocks():
     """Get list of available Indian stocks"""
@@ -1,13 +1,30 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.endpoints import stocks
+from app.services import metrics
+from app.services.stock_service import price_scheduler, warm_up
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Health checks answer at once; data libraries load in the background
+    warm_up.start()
+    # Background refresh of hot symbols runs for the lifetime of the app
+    if settings.REFRESH_ENABLED:
+        price_scheduler.start()
+    yield
+    price_scheduler.stop()
+
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
     description="Backend API for Indian stock portfolio analytics",
-    version=settings.VERSION
+    version=settings.VERSION,
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -17,7 +34,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+# Per-route latency, status and in-flight counts for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Include routers
 app.include_router(stocks.router)
@@ -33,3 +53,15 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "portfolio-backend"}
+
+
+@app.get("/ready")
+async def readiness_check():
+    """200 once the data libraries are loaded, 503 until then"""
+    return JSONResponse(warm_up.stats(), status_code=200 if warm_up.ready else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text exposition of the process metrics"""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
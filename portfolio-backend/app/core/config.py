@@ -0,0 +1,75 @@
+import os
+
+
+class Settings:
+    APP_NAME: str = "Portfolio Visualizer API"
+    VERSION: str = "1.0.0"
+    PORT: int = int(os.getenv("PORT", 8000))
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    CORS_ORIGINS: list = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:5173").split(",")
+
+    # Market data caches (seconds)
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", 2000))
+    PRICE_CACHE_TTL: int = int(os.getenv("PRICE_CACHE_TTL", 300))
+    PRICE_CACHE_STALE_TTL: int = int(os.getenv("PRICE_CACHE_STALE_TTL", 900))
+    FUNDAMENTALS_CACHE_TTL: int = int(os.getenv("FUNDAMENTALS_CACHE_TTL", 6 * 3600))
+    FUNDAMENTALS_CACHE_STALE_TTL: int = int(os.getenv("FUNDAMENTALS_CACHE_STALE_TTL", 3 * 86400))
+    # SQLite file for warm restarts; leave empty to keep caches in memory only
+    CACHE_DB_PATH: str = os.getenv("CACHE_DB_PATH", "")
+
+    # Live price streaming (GET /stocks/stream): subscribed symbols are
+    # refreshed every STREAM_REFRESH_INTERVAL seconds, within the refresh budget
+    STREAM_REFRESH_INTERVAL: float = float(os.getenv("STREAM_REFRESH_INTERVAL", 60))
+    STREAM_MAX_SUBSCRIBERS: int = int(os.getenv("STREAM_MAX_SUBSCRIBERS", 10000))
+
+    # Local daily OHLCV store; leave empty to download history on each miss
+    HISTORY_DIR: str = os.getenv("HISTORY_DIR", "data/history")
+    HISTORY_BACKFILL_PERIOD: str = os.getenv("HISTORY_BACKFILL_PERIOD", "5y")
+
+    # Market data source: "yahoo", or "replay" to serve recorded files from
+    # REPLAY_DATA_DIR (python -m app.services.market_data DIR SYMBOLS... records
+    # them) with injected latency and failures for offline load tests
+    MARKET_DATA_PROVIDER: str = os.getenv("MARKET_DATA_PROVIDER", "yahoo").lower()
+    REPLAY_DATA_DIR: str = os.getenv("REPLAY_DATA_DIR", "data/replay")
+    REPLAY_LATENCY_MS: float = float(os.getenv("REPLAY_LATENCY_MS", 0))
+    REPLAY_JITTER_MS: float = float(os.getenv("REPLAY_JITTER_MS", 0))
+    REPLAY_FAILURE_RATE: float = float(os.getenv("REPLAY_FAILURE_RATE", 0))
+    REPLAY_SEED: int = int(os.getenv("REPLAY_SEED", 0))
+
+    # Exchange listings (symbol,name,sector,exchange CSV, or the NSE/BSE
+    # downloads) for search and exchange suffixes. The bundled file only
+    # seeds the large caps, so only set SYMBOL_VALIDATION to true (reject
+    # unlisted tickers before any upstream call) with SYMBOL_MASTER_PATH
+    # pointing at the full NSE EQUITY_L / BSE listing
+    SYMBOL_MASTER_PATH: str = os.getenv("SYMBOL_MASTER_PATH", "app/listings/symbols.csv")
+    SYMBOL_VALIDATION: bool = os.getenv("SYMBOL_VALIDATION", "false").lower() == "true"
+
+    # Symbols the screener ranks (comma-separated tickers); empty screens
+    # every listing in the symbol master. The fundamentals scheduler keeps
+    # them warm, one upstream call per symbol, so the universe is capped at
+    # SCREENER_MAX_SYMBOLS
+    SCREENER_UNIVERSE: str = os.getenv("SCREENER_UNIVERSE", "")
+    SCREENER_MAX_SYMBOLS: int = int(os.getenv("SCREENER_MAX_SYMBOLS", 500))
+
+    # Background refresh of hot symbols ahead of cache expiry
+    REFRESH_ENABLED: bool = os.getenv("REFRESH_ENABLED", "true").lower() == "true"
+    REFRESH_CALLS_PER_MINUTE: int = int(os.getenv("REFRESH_CALLS_PER_MINUTE", 30))
+    REFRESH_BATCH_SIZE: int = int(os.getenv("REFRESH_BATCH_SIZE", 50))
+    REFRESH_HOT_WINDOW: int = int(os.getenv("REFRESH_HOT_WINDOW", 3600))
+
+    # Upstream (Yahoo) calls made from async endpoints
+    UPSTREAM_MAX_CONCURRENCY: int = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", 8))
+    UPSTREAM_TIMEOUT: float = float(os.getenv("UPSTREAM_TIMEOUT", 10))
+    # Shared Yahoo rate limit and circuit breaker: after UPSTREAM_FAILURE_THRESHOLD
+    # consecutive failures calls are refused (cached data is served instead)
+    # and one probe is let through after UPSTREAM_BACKOFF seconds, doubling
+    # up to UPSTREAM_MAX_BACKOFF while probes keep failing
+    UPSTREAM_CALLS_PER_SECOND: float = float(os.getenv("UPSTREAM_CALLS_PER_SECOND", 5))
+    UPSTREAM_BURST: int = int(os.getenv("UPSTREAM_BURST", 10))
+    UPSTREAM_MAX_WAIT: float = float(os.getenv("UPSTREAM_MAX_WAIT", 2))
+    UPSTREAM_FAILURE_THRESHOLD: int = int(os.getenv("UPSTREAM_FAILURE_THRESHOLD", 5))
+    UPSTREAM_BACKOFF: float = float(os.getenv("UPSTREAM_BACKOFF", 5))
+    UPSTREAM_MAX_BACKOFF: float = float(os.getenv("UPSTREAM_MAX_BACKOFF", 300))
+
+
+settings = Settings()
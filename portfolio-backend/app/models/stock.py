@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional, Union
 from datetime import datetime
 
 
@@ -16,6 +16,49 @@ class StockPrice(BaseModel):
     last_updated: datetime
 
 
+class PortfolioHolding(BaseModel):
+    symbol: str
+    quantity: float = Field(..., gt=0)
+    purchasePrice: float
+    sector: Optional[str] = None
+
+
+class PortfolioRequest(BaseModel):
+    holdings: List[PortfolioHolding]
+
+
+class ValuationRequest(PortfolioRequest):
+    since: Optional[int] = None
+
+
+class RiskRequest(PortfolioRequest):
+    start: Optional[str] = None
+    window: int = 63
+    confidence: float = 0.95
+
+
+class OptimizeRequest(BaseModel):
+    symbols: Optional[List[str]] = None
+    start: Optional[str] = None
+    long_only: bool = True
+    max_weight: Optional[float] = None
+    risk_free: float = 6.5
+    points: int = 50
+    samples: int = 2000
+    seed: Optional[int] = None
+
+
+class BacktestRequest(BaseModel):
+    symbols: List[str]
+    allocations: List[Union[List[float], Dict[str, float]]]
+    start: Optional[str] = None
+    end: Optional[str] = None
+    rebalance: str = "none"
+    cost_bps: float = 0.0
+    initial: float = 100000.0
+    curve_points: int = 250
+
+
 class StockResponse(BaseModel):
     success: bool
     data: Optional[dict] = None
@@ -0,0 +1,149 @@
+import numpy as np
+from typing import Any, Dict, List
+
+from app.services.dcf import to_json_array
+from app.services.history_store import days_to_iso
+from app.services.risk import TRADING_DAYS, log_returns, max_drawdowns
+
+REBALANCE_FREQUENCIES = ["none", "monthly", "quarterly"]
+MAX_ALLOCATIONS = 500
+DEFAULT_INITIAL = 100000.0
+DEFAULT_CURVE_POINTS = 250
+MAX_CURVE_POINTS = 5000
+
+
+def parse_allocations(allocations: Any, symbols: List[str]) -> np.ndarray:
+    """(allocations x symbols) weight matrix, each row normalised to sum to 1.
+
+    Each allocation is either a list of weights in ``symbols`` order or a
+    {symbol: weight} dict; weights may be fractions or percentages.
+    """
+    if not isinstance(allocations, list) or not 0 < len(allocations) <= MAX_ALLOCATIONS:
+        raise ValueError(f"'allocations' needs 1 to {MAX_ALLOCATIONS} entries")
+    index = {symbol: j for j, symbol in enumerate(symbols)}
+    weights = np.zeros((len(allocations), len(symbols)))
+    for i, allocation in enumerate(allocations):
+        try:
+            if isinstance(allocation, dict):
+                for symbol, weight in allocation.items():
+                    weights[i, index[str(symbol).strip().upper()]] = float(weight)
+            elif len(allocation) == len(symbols):
+                weights[i] = [float(weight) for weight in allocation]
+            else:
+                raise ValueError
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(
+                f"Allocation {i} needs {len(symbols)} numeric weights or a "
+                "{symbol: weight} object over the requested symbols")
+
+    if (weights < 0).any():
+        raise ValueError("Weights must be non-negative")
+    totals = weights.sum(axis=1, keepdims=True)
+    if (totals <= 0).any():
+        raise ValueError("Every allocation needs a positive total weight")
+    return weights / totals
+
+
+def rebalance_starts(dates: np.ndarray, frequency: str) -> np.ndarray:
+    """Row indices that open a holding period: the first bar of each month/quarter"""
+    if frequency not in REBALANCE_FREQUENCIES:
+        raise ValueError(f"rebalance must be one of {', '.join(REBALANCE_FREQUENCIES)}")
+    if frequency == "none":
+        return np.array([0])
+    months = np.asarray(dates).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    periods = months // 3 if frequency == "quarterly" else months
+    return np.flatnonzero(np.diff(periods, prepend=periods[0] - 1))
+
+
+def backtest(dates: np.ndarray, closes: np.ndarray, symbols: List[str],
+             weights: np.ndarray, rebalance: str = "none", cost_bps: float = 0.0,
+             initial: float = DEFAULT_INITIAL,
+             curve_points: int = DEFAULT_CURVE_POINTS) -> Dict[str, Any]:
+    """Replay daily closes for a batch of target allocations.
+
+    Between rebalances each allocation holds a fixed number of shares, so
+    a whole holding period for every allocation is one
+    (allocations x assets) @ (assets x days) product. At each rebalance the
+    drifted holdings are traded back to target and ``cost_bps`` is charged
+    on the traded value (the initial purchase included). Turnover counts
+    rebalancing trades only.
+    """
+    if not 0 <= cost_bps <= 1000:
+        raise ValueError("cost_bps must be between 0 and 1000")
+    if initial <= 0:
+        raise ValueError("initial must be positive")
+    if not 2 <= curve_points <= MAX_CURVE_POINTS:
+        raise ValueError(f"curve_points must be between 2 and {MAX_CURVE_POINTS}")
+    if len(dates) < 2:
+        raise ValueError("Need at least 2 common trading days of history")
+
+    starts = rebalance_starts(dates, rebalance)
+    ends = np.append(starts[1:], len(dates))
+    cost_rate = cost_bps / 10000
+    count = len(weights)
+
+    equity = np.empty((len(dates), count))
+    costs = np.zeros(count)
+    turnover = np.zeros(count)
+    held = np.zeros_like(weights)
+    for start, end in zip(starts, ends):
+        prices = closes[start]
+        # Marked to this bar's close, before trading back to target
+        value = held @ prices if start > 0 else np.full(count, float(initial))
+        traded = np.abs(value[:, None] * weights - held * prices).sum(axis=1)
+        cost = traded * cost_rate
+        costs += cost
+        if start > 0:
+            turnover += traded / value
+
+        held = (value - cost)[:, None] * weights / prices
+        equity[start:end] = (held @ closes[start:end].T).T
+
+    returns = log_returns(equity)
+    years = (dates[-1] - dates[0]) / 365.25
+    total_return = equity[-1] / initial - 1
+    with np.errstate(invalid="ignore"):
+        cagr = (1 + total_return) ** (1 / years) - 1 if years > 0 else np.full(count, np.nan)
+    volatility = returns.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS) if len(returns) > 1 \
+        else np.full(count, np.nan)
+    drawdown = max_drawdowns(equity)
+
+    sample = np.unique(np.linspace(0, len(dates) - 1, min(curve_points, len(dates))).astype(int))
+    return {
+        "symbols": symbols,
+        "start": days_to_iso(dates[:1])[0],
+        "end": days_to_iso(dates[-1:])[0],
+        "observations": len(dates),
+        "rebalance": rebalance,
+        "rebalances": len(starts) - 1,
+        "cost_bps": cost_bps,
+        "initial": initial,
+        "curve_dates": days_to_iso(dates[sample]),
+        "results": [
+            {
+                "weights": to_json_array(weights[i] * 100),
+                "finalValue": round(float(equity[-1, i]), 2),
+                "totalReturn": round(float(total_return[i]) * 100, 2),
+                "cagr": to_json_array(cagr[i] * 100),
+                "volatility": to_json_array(volatility[i] * 100),
+                "maxDrawdown": round(float(drawdown[i]), 2),
+                "costs": round(float(costs[i]), 2),
+                "turnover": round(float(turnover[i]) * 100, 2),
+                "equity": to_json_array(equity[sample, i])
+            }
+            for i in range(count)
+        ]
+    }
+
+
+def parse_options(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Backtest keyword arguments from a JSON request body"""
+    try:
+        return {
+            "rebalance": str(payload.get("rebalance", "none")).lower(),
+            "cost_bps": float(payload.get("cost_bps", 0)),
+            "initial": float(payload.get("initial", DEFAULT_INITIAL)),
+            "curve_points": int(payload.get("curve_points", DEFAULT_CURVE_POINTS))
+        }
+    except (TypeError, ValueError):
+        raise ValueError("cost_bps, initial and curve_points must be numbers")
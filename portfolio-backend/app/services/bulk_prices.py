@@ -0,0 +1,44 @@
+import pandas as pd
+import yfinance as yf
+from typing import Dict, List, Optional
+
+
+def download_histories(symbols: List[str], period: str = "5d",
+                       start: Optional[str] = None,
+                       timeout: float = 10) -> Dict[str, pd.DataFrame]:
+    """Fetch daily OHLCV for many symbols in one multi-ticker download.
+
+    ``start`` (YYYY-MM-DD) fetches everything from that date and takes
+    precedence over ``period``. Returns one frame per symbol that came back
+    with data. Symbols that Yahoo does not know are simply absent. ``timeout``
+    bounds each HTTP request in seconds.
+    """
+    if not symbols:
+        return {}
+
+    frame = yf.download(
+        symbols,
+        period=None if start else period,
+        start=start,
+        group_by="ticker",
+        auto_adjust=True,
+        progress=False,
+        threads=True,
+        timeout=timeout
+    )
+
+    histories = {}
+    if frame is None or frame.empty:
+        return histories
+
+    if isinstance(frame.columns, pd.MultiIndex):
+        for symbol in frame.columns.get_level_values(0).unique():
+            history = frame[symbol].dropna(subset=["Close"])
+            if not history.empty:
+                histories[symbol] = history
+    else:
+        history = frame.dropna(subset=["Close"])
+        if not history.empty:
+            histories[symbols[0]] = history
+
+    return histories
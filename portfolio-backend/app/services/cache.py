@@ -0,0 +1,291 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.services.single_flight import SingleFlight
+
+# Shared pool for stale-while-revalidate refreshes across all caches
+_refresh_executor = None
+_refresh_executor_lock = threading.Lock()
+REFRESH_WORKERS = 4
+
+
+def _get_refresh_executor() -> ThreadPoolExecutor:
+    global _refresh_executor
+    with _refresh_executor_lock:
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(
+                max_workers=REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+        return _refresh_executor
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a TTL and stale-while-revalidate.
+
+    Entries younger than ``ttl`` are fresh. Entries older than ``ttl`` but
+    younger than ``ttl + stale_ttl`` are served immediately while a
+    background refresh replaces them. Anything older is dropped. Once the
+    cache holds ``maxsize`` entries the least recently used one is evicted.
+
+    With a ``store`` (see persistent_cache.SQLiteStore) every write goes
+    through to disk and memory misses are restored from it lazily, keeping
+    their original timestamps. ``encode``/``decode`` convert values to and
+    from JSON-friendly data for the store. Callbacks registered with
+    ``add_listener`` are called as ``listener(key, value)`` after every set.
+
+    ``serialize`` turns a value into response bytes (or any derived form);
+    ``fetch_encoded`` keeps that result next to the entry, so repeated hits
+    on an unchanged value skip re-encoding it.
+    """
+
+    HIT = "hit"
+    STALE = "stale"
+    MISS = "miss"
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 1024,
+                 stale_ttl: float = 0, store=None,
+                 encode: Callable = None, decode: Callable = None,
+                 serialize: Callable = None):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale_ttl = stale_ttl
+        self.store = store
+        self.encode = encode or (lambda value: value)
+        self.decode = decode or (lambda value: value)
+        self.serialize = serialize
+        self.flight = SingleFlight(name)
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        # key -> (value, serialize(value)); valid while the value is current
+        self._encoded: Dict[Hashable, Tuple[Any, Any]] = {}
+        self._refreshing = set()
+        self._listeners = []
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.restored = 0
+        if store is not None:
+            store.purge(name, ttl + stale_ttl)
+
+    def _lookup(self, key: Hashable) -> Tuple[Any, Optional[float]]:
+        """Return (value, age) for a servable entry; caller holds the lock"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None, None
+        value, timestamp = entry
+        age = time.time() - timestamp
+        if age >= self.ttl + self.stale_ttl:
+            del self._data[key]
+            self._encoded.pop(key, None)
+            return None, None
+        self._data.move_to_end(key)
+        return value, age
+
+    def _insert(self, key: Hashable, value: Any, timestamp: float) -> None:
+        """Store an entry and enforce the size bound; caller holds the lock"""
+        self._data[key] = (value, timestamp)
+        self._data.move_to_end(key)
+        self._encoded.pop(key, None)
+        while len(self._data) > self.maxsize:
+            evicted, _ = self._data.popitem(last=False)
+            self._encoded.pop(evicted, None)
+            self.evictions += 1
+
+    def _restore(self, key: Hashable) -> Tuple[Any, Optional[float]]:
+        """Load a still-servable entry from the persistent store"""
+        stored, timestamp = self.store.get(self.name, str(key))
+        if timestamp is None:
+            return None, None
+        age = time.time() - timestamp
+        if age >= self.ttl + self.stale_ttl:
+            return None, None
+        value = self.decode(stored)
+        with self._lock:
+            if key not in self._data:
+                self._insert(key, value, timestamp)
+                self.restored += 1
+        return value, age
+
+    def _servable(self, key: Hashable) -> Tuple[Any, Optional[float]]:
+        """Return (value, age) from memory, falling back to the store"""
+        with self._lock:
+            value, age = self._lookup(key)
+        if age is None and self.store is not None:
+            value, age = self._restore(key)
+        return value, age
+
+    def get(self, key: Hashable, count_miss: bool = True) -> Tuple[Any, Optional[float]]:
+        """Return (value, age) for a fresh entry, or (None, None).
+
+        Pass ``count_miss=False`` when a miss falls through to ``fetch``,
+        which counts it itself.
+        """
+        with self._lock:
+            value, age = self._lookup(key)
+            if age is not None and age < self.ttl:
+                self.hits += 1
+                return value, age
+        if age is None and self.store is not None:
+            value, age = self._restore(key)
+            if age is not None and age < self.ttl:
+                with self._lock:
+                    self.hits += 1
+                return value, age
+        if count_miss:
+            with self._lock:
+                self.misses += 1
+        return None, None
+
+    def peek(self, key: Hashable) -> Any:
+        """Return the last stored value for a key, however old, or None"""
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is not None:
+            return entry[0]
+        if self.store is not None:
+            stored, timestamp = self.store.get(self.name, str(key))
+            if timestamp is not None:
+                return self.decode(stored)
+        return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        timestamp = time.time()
+        with self._lock:
+            self._insert(key, value, timestamp)
+        if self.store is not None:
+            self.store.put(self.name, str(key), self.encode(value), timestamp)
+        for listener in self._listeners:
+            try:
+                listener(key, value)
+            except Exception as e:
+                print(f"⚠️ {self.name} listener failed for {key}: {e}")
+
+    def add_listener(self, listener: Callable[[Hashable, Any], Any]) -> None:
+        """Call ``listener(key, value)`` whenever a value is stored"""
+        self._listeners.append(listener)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            self._encoded.pop(key, None)
+        if self.store is not None:
+            self.store.delete(self.name, str(key))
+
+    def fetch(self, key: Hashable, loader: Callable, *args,
+              **kwargs) -> Tuple[Any, Optional[float], str]:
+        """Return (value, age, status), loading the value on a miss.
+
+        Misses call ``loader`` through the cache's single-flight so concurrent
+        callers share one upstream fetch. Stale entries are returned as-is and
+        refreshed in the background.
+        """
+        value, age = self._servable(key)
+        with self._lock:
+            if age is not None and age < self.ttl:
+                self.hits += 1
+                return value, age, self.HIT
+            if age is not None:
+                self.stale_hits += 1
+                start_refresh = key not in self._refreshing
+                if start_refresh:
+                    self._refreshing.add(key)
+            else:
+                self.misses += 1
+
+        if age is not None:
+            if start_refresh:
+                _get_refresh_executor().submit(
+                    self._refresh, key, loader, args, kwargs)
+            return value, age, self.STALE
+
+        value = self.flight.do(key, self._load, key, loader, args, kwargs)
+        return value, None, self.MISS
+
+    def fetch_encoded(self, key: Hashable, loader: Callable, *args,
+                      **kwargs) -> Tuple[Any, Optional[float], str]:
+        """Like ``fetch`` but returns ``serialize(value)`` in place of the value.
+
+        The serialized form is computed once per stored value and reused by
+        every later hit until the entry is replaced, evicted or deleted.
+        """
+        value, age, status = self.fetch(key, loader, *args, **kwargs)
+        with self._lock:
+            cached = self._encoded.get(key)
+        if cached is not None and cached[0] is value:
+            return cached[1], age, status
+
+        encoded = self.serialize(value)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] is value:
+                self._encoded[key] = (value, encoded)
+        return encoded, age, status
+
+    def refresh(self, key: Hashable, loader: Callable, *args, **kwargs) -> Any:
+        """Reload a key now, whatever its age, sharing any in-flight fetch"""
+        return self.flight.do(key, self._load, key, loader, args, kwargs)
+
+    def _load(self, key, loader, args, kwargs):
+        value = loader(*args, **kwargs)
+        self.set(key, value)
+        return value
+
+    def _refresh(self, key, loader, args, kwargs):
+        try:
+            self.refresh(key, loader, *args, **kwargs)
+        except Exception as e:
+            print(f"⚠️ Background refresh failed for {self.name}:{key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def snapshot(self) -> Dict[Hashable, Any]:
+        """Copy of every servable in-memory entry (fresh or stale)"""
+        cutoff = time.time() - (self.ttl + self.stale_ttl)
+        with self._lock:
+            return {
+                key: value for key, (value, timestamp) in self._data.items()
+                if timestamp > cutoff
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "restored": self.restored,
+                "encoded": len(self._encoded),
+                "persistent": self.store is not None,
+                "refreshing": len(self._refreshing)
+            }
+        stats["single_flight"] = self.flight.stats()
+        return stats
+
+    def metrics(self):
+        """Scrape-time families for metrics.add_collector"""
+        with self._lock:
+            lookups = [("hit", self.hits), ("stale", self.stale_hits), ("miss", self.misses)]
+            size, evictions = len(self._data), self.evictions
+        labels = {"cache": self.name}
+        return [
+            ("cache_lookups_total", "counter", "Cache lookups by result",
+             [(dict(labels, result=result), count) for result, count in lookups]),
+            ("cache_evictions_total", "counter", "Entries evicted to stay within maxsize",
+             [(labels, evictions)]),
+            ("cache_entries", "gauge", "Entries held in memory", [(labels, size)])
+        ]
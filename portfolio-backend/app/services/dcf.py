@@ -0,0 +1,209 @@
+import numpy as np
+from typing import Any, Dict, Sequence
+
+# Same model as calculateDCF in src/pages/Valuation.tsx: a 5-year explicit
+# FCF projection plus a Gordon Growth terminal value. All rates are decimals.
+PROJECTION_YEARS = 5
+
+# Default sensitivity axes (percent), matching the Valuation page sliders
+DEFAULT_GROWTH_RATES = np.arange(0, 25.5, 0.5)
+DEFAULT_DISCOUNT_RATES = np.arange(8, 20.5, 0.5)
+DEFAULT_TERMINAL_RATES = np.arange(1, 6.5, 0.5)
+
+
+def intrinsic_values(fcf_per_share, growth, discount, terminal_growth,
+                     years: int = PROJECTION_YEARS) -> np.ndarray:
+    """Intrinsic value per share for broadcastable arrays of assumptions.
+
+    ``growth``, ``discount`` and ``terminal_growth`` (and ``fcf_per_share``)
+    may be scalars or arrays of any broadcast-compatible shapes; the result
+    has their broadcast shape. Combinations where terminal growth is not
+    below the discount rate have no valuation and come back as NaN.
+    """
+    fcf = np.asarray(fcf_per_share, dtype=float)
+    g = np.asarray(growth, dtype=float)
+    r = np.asarray(discount, dtype=float)
+    tg = np.asarray(terminal_growth, dtype=float)
+
+    # Sum of discounted FCF over the explicit years: fcf * sum(q^t), q=(1+g)/(1+r)
+    q = (1 + g) / (1 + r)
+    t = np.arange(1, years + 1)
+    explicit_pv = fcf * (q[..., None] ** t).sum(axis=-1)
+
+    # Terminal value on the final-year FCF, discounted back `years` periods
+    final_fcf = fcf * (1 + g) ** years
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terminal_value = final_fcf * (1 + tg) / (r - tg)
+    terminal_pv = terminal_value / (1 + r) ** years
+
+    value = explicit_pv + terminal_pv
+    return np.where(tg < r, value, np.nan)
+
+
+def margins_of_safety(intrinsic, current_price) -> np.ndarray:
+    """Margin of safety in percent; 0 where intrinsic value is not positive"""
+    iv = np.asarray(intrinsic, dtype=float)
+    price = np.asarray(current_price, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mos = (iv - price) / iv * 100
+    mos = np.where(iv > 0, mos, 0.0)
+    return np.where(np.isnan(iv), np.nan, mos)
+
+
+def sensitivity_grid(fcf_per_share: float, current_price: float,
+                     growth_rates: Sequence[float] = DEFAULT_GROWTH_RATES,
+                     discount_rates: Sequence[float] = DEFAULT_DISCOUNT_RATES,
+                     terminal_rates: Sequence[float] = DEFAULT_TERMINAL_RATES) -> Dict[str, np.ndarray]:
+    """Evaluate every (growth, discount, terminal) combination in one pass.
+
+    Rates are given in percent, as on the Valuation page. The returned
+    arrays are indexed [growth, discount, terminal].
+    """
+    g = np.asarray(growth_rates, dtype=float) / 100
+    r = np.asarray(discount_rates, dtype=float) / 100
+    tg = np.asarray(terminal_rates, dtype=float) / 100
+
+    intrinsic = intrinsic_values(
+        fcf_per_share, g[:, None, None], r[None, :, None], tg[None, None, :])
+    return {
+        "intrinsic_value": intrinsic,
+        "margin_of_safety": margins_of_safety(intrinsic, current_price)
+    }
+
+
+def to_json_array(values: np.ndarray, decimals: int = 2) -> Any:
+    """Round an array and convert it to nested lists with NaN as None"""
+    rounded = np.round(np.asarray(values, dtype=float), decimals)
+    return np.where(np.isnan(rounded), None, rounded).tolist()
+
+
+# Monte Carlo defaults (percent): centred on the Valuation page defaults
+DEFAULT_SIMULATION = {
+    "growth": ("normal", 8.0, 3.0),
+    "discount": ("normal", 12.0, 1.5),
+    "terminal": ("normal", 3.0, 0.5)
+}
+PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
+MAX_SIMULATION_PATHS = 1_000_000
+
+
+def parse_distribution(spec: str) -> tuple:
+    """Parse "normal:mean:std", "uniform:low:high" or "triangular:low:mode:high"
+
+    A bare number is treated as a fixed rate. Values are in percent.
+    """
+    parts = spec.split(":")
+    kind = parts[0].strip().lower()
+    try:
+        if len(parts) == 1:
+            return ("fixed", float(kind))
+        params = tuple(float(p) for p in parts[1:])
+    except ValueError:
+        raise ValueError(f"Invalid distribution '{spec}'")
+
+    expected = {"normal": 2, "uniform": 2, "triangular": 3, "fixed": 1}
+    if kind not in expected:
+        raise ValueError(f"Unknown distribution '{kind}'")
+    if len(params) != expected[kind]:
+        raise ValueError(f"'{kind}' takes {expected[kind]} parameters")
+    if kind == "normal" and params[1] < 0:
+        raise ValueError("normal std must be >= 0")
+    if kind == "uniform" and params[0] > params[1]:
+        raise ValueError("uniform needs low <= high")
+    if kind == "triangular" and not params[0] <= params[1] <= params[2]:
+        raise ValueError("triangular needs low <= mode <= high")
+    return (kind,) + params
+
+
+def sample_rates(rng: np.random.Generator, distribution: tuple, size: int) -> np.ndarray:
+    """Draw ``size`` rates (as decimals) from a parsed distribution"""
+    kind, *params = distribution
+    if kind == "normal":
+        draws = rng.normal(params[0], params[1], size)
+    elif kind == "uniform":
+        draws = rng.uniform(params[0], params[1], size)
+    elif kind == "triangular":
+        if params[0] == params[2]:
+            draws = np.full(size, params[0])
+        else:
+            draws = rng.triangular(params[0], params[1], params[2], size)
+    else:
+        draws = np.full(size, params[0])
+    return draws / 100
+
+
+def simulate(fcf_per_share: Sequence[float], current_prices: Sequence[float],
+             paths: int = 100_000, distributions: Dict[str, tuple] = None,
+             seed: int = None, bins: int = 50) -> Dict[str, Any]:
+    """Monte Carlo DCF for a batch of symbols sharing one set of draws.
+
+    Intrinsic value is linear in FCF per share, so each path's discount
+    factor is computed once with FCF = 1. Every symbol's distribution is
+    that one scaled by its FCF: mean, std, percentiles and the probability
+    of beating the price come straight from the sorted factors, and only
+    the histogram scales them, one symbol at a time. Memory is O(paths)
+    however many symbols are valued. Paths where terminal growth is not
+    below the discount rate are dropped.
+    """
+    if not 0 < paths <= MAX_SIMULATION_PATHS:
+        raise ValueError(f"paths must be between 1 and {MAX_SIMULATION_PATHS}")
+    dists = dict(DEFAULT_SIMULATION)
+    dists.update(distributions or {})
+
+    rng = np.random.default_rng(seed)
+    g = sample_rates(rng, dists["growth"], paths)
+    r = sample_rates(rng, dists["discount"], paths)
+    tg = sample_rates(rng, dists["terminal"], paths)
+
+    valid = tg < r
+    factor = np.sort(intrinsic_values(1.0, g[valid], r[valid], tg[valid]))
+
+    fcf = np.asarray(fcf_per_share, dtype=float)
+    prices = np.asarray(current_prices, dtype=float)
+
+    results = []
+    if len(factor) == 0:
+        error = {"error": "No valid paths (terminal growth >= discount rate)"}
+        results = [dict(error) for _ in range(len(fcf))]
+    else:
+        # Histograms cover p1-p99 so near-singular terminal values do not
+        # flatten every bin. A negative FCF reverses the order, turning
+        # percentile p of the factor into percentile 100 - p of the value
+        levels = PERCENTILES + [1, 99]
+        factor_quantiles = np.percentile(factor, levels)
+        reversed_quantiles = np.percentile(factor, [100 - p for p in levels])
+        factor_mean, factor_std = factor.mean(), factor.std()
+        for i in range(len(fcf)):
+            scale = fcf[i]
+            quantiles = scale * (factor_quantiles if scale >= 0 else reversed_quantiles)
+            # Paths where scale * factor > price
+            if scale > 0:
+                beats = len(factor) - np.searchsorted(factor, prices[i] / scale, side="right")
+            elif scale < 0:
+                beats = np.searchsorted(factor, prices[i] / scale, side="left")
+            else:
+                beats = len(factor) if prices[i] < 0 else 0
+            low, high = quantiles[-2], quantiles[-1]
+            counts, edges = np.histogram(
+                scale * factor, bins=bins, range=(low, high) if high > low else None)
+            results.append({
+                "mean": round(float(scale * factor_mean), 2),
+                "std": round(float(abs(scale) * factor_std), 2),
+                "percentiles": {
+                    f"p{p}": round(float(quantiles[j]), 2)
+                    for j, p in enumerate(PERCENTILES)
+                },
+                "prob_positive_margin": round(float(beats / len(factor)), 4),
+                "histogram": {
+                    "counts": counts.tolist(),
+                    "bin_edges": np.round(edges, 2).tolist()
+                }
+            })
+
+    return {
+        "paths": paths,
+        "valid_paths": int(valid.sum()),
+        "seed": seed,
+        "distributions": {k: list(v) for k, v in dists.items()},
+        "results": results
+    }
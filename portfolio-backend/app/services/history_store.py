@@ -0,0 +1,252 @@
+import os
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    # Only the downloader's frames are pandas; importing it is left to them
+    import pandas as pd
+
+# Column order of the per-symbol OHLCV matrix
+COLUMNS = ["open", "high", "low", "close", "volume"]
+# Tail downloads per update: symbols sharing a last stored date share one
+# download; past this many distinct dates the oldest are fetched together
+MAX_UPDATE_GROUPS = 4
+# Memory maps kept open (each holds two file descriptors); least recently
+# read symbols are unmapped first
+MAX_MAPPED_SYMBOLS = 256
+
+
+class HistoryStore:
+    """Per-symbol daily OHLCV on disk as append-only memory-mapped arrays.
+
+    Each symbol has two raw files under ``root``: ``<SYMBOL>.dates`` (int64
+    days since 1970-01-01, ascending) and ``<SYMBOL>.ohlcv`` (float64 rows of
+    open, high, low, close, volume). Reads map the files and hand back
+    slices of the map, so range queries copy nothing; the maps of the
+    ``max_mapped`` most recently read symbols stay open. ``update`` downloads
+    only the bars after the last stored one, plus the last bar itself,
+    which may have been a partial trading day and is rewritten in place.
+
+    ``download`` has the signature of bulk_prices.download_histories:
+    (symbols, period=..., start=...) -> {symbol: DataFrame}.
+    """
+
+    def __init__(self, root: str, download: Callable[..., Dict[str, "pd.DataFrame"]],
+                 backfill_period: str = "5y", max_mapped: int = MAX_MAPPED_SYMBOLS):
+        self.root = root
+        self.download = download
+        self.backfill_period = backfill_period
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._symbol_locks: Dict[str, threading.Lock] = {}
+        self.max_mapped = max_mapped
+        self._maps: "OrderedDict[str, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._updated_at: Dict[str, float] = {}
+        self.upstream_calls = 0
+
+    def _paths(self, symbol: str) -> Tuple[str, str]:
+        safe = symbol.replace("/", "_")
+        base = os.path.join(self.root, safe)
+        return f"{base}.dates", f"{base}.ohlcv"
+
+    def _symbol_lock(self, symbol: str) -> threading.Lock:
+        with self._lock:
+            return self._symbol_locks.setdefault(symbol, threading.Lock())
+
+    def arrays(self, symbol: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Memory-mapped (dates, ohlcv) for a symbol; empty if not stored"""
+        with self._lock:
+            cached = self._maps.get(symbol)
+            if cached is not None:
+                self._maps.move_to_end(symbol)
+        if cached is not None:
+            return cached
+
+        dates_path, ohlcv_path = self._paths(symbol)
+        rows = os.path.getsize(dates_path) // 8 if os.path.exists(dates_path) else 0
+        if rows == 0:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(COLUMNS)))
+        dates = np.memmap(dates_path, dtype=np.int64, mode="r", shape=(rows,))
+        ohlcv = np.memmap(ohlcv_path, dtype=np.float64, mode="r",
+                          shape=(rows, len(COLUMNS)))
+        with self._lock:
+            self._maps[symbol] = (dates, ohlcv)
+            self._maps.move_to_end(symbol)
+            # Views already handed out keep their map alive until released
+            while len(self._maps) > self.max_mapped:
+                self._maps.popitem(last=False)
+        return dates, ohlcv
+
+    def last_date(self, symbol: str) -> Optional[date]:
+        dates, _ = self.arrays(symbol)
+        if len(dates) == 0:
+            return None
+        return date(1970, 1, 1) + timedelta(days=int(dates[-1]))
+
+    def append(self, symbol: str, frame: "pd.DataFrame") -> int:
+        """Store bars newer than the last stored one; returns bars added"""
+        if frame is None or frame.empty:
+            return 0
+        index = frame.index
+        if getattr(index, "tz", None) is not None:
+            index = index.tz_localize(None)
+        days = index.values.astype("datetime64[D]").astype(np.int64)
+        values = frame[["Open", "High", "Low", "Close", "Volume"]].to_numpy(dtype=np.float64)
+        order = np.argsort(days, kind="stable")
+        days, values = days[order], values[order]
+
+        with self._symbol_lock(symbol):
+            dates, _ = self.arrays(symbol)
+            dates_path, ohlcv_path = self._paths(symbol)
+            added = 0
+            if len(dates):
+                last = dates[-1]
+                # The last stored bar may have been mid-session: overwrite it
+                same = days == last
+                if same.any():
+                    stored = np.memmap(ohlcv_path, dtype=np.float64, mode="r+",
+                                       shape=(len(dates), len(COLUMNS)))
+                    stored[-1] = values[same][-1]
+                    stored.flush()
+                    del stored
+                newer = days > last
+                days, values = days[newer], values[newer]
+            if len(days):
+                # Rows are counted from the dates file, so write it last
+                with open(ohlcv_path, "ab") as f:
+                    f.write(np.ascontiguousarray(values).tobytes())
+                with open(dates_path, "ab") as f:
+                    f.write(days.tobytes())
+                added = len(days)
+                with self._lock:
+                    self._maps.pop(symbol, None)
+            return added
+
+    def update(self, symbols: List[str]) -> Dict[str, int]:
+        """Fetch only the missing tail for each symbol in bulk downloads.
+
+        Symbols with no history are backfilled with ``backfill_period``.
+        The rest are grouped by their last stored date and each group is
+        downloaded from its own start, so one stale symbol does not make
+        up-to-date ones fetch its whole gap. Beyond ``MAX_UPDATE_GROUPS``
+        dates the oldest groups are merged into one download.
+        """
+        last_dates = {s: self.last_date(s) for s in symbols}
+        new = [s for s in symbols if last_dates[s] is None]
+        groups: Dict[date, List[str]] = {}
+        for symbol in symbols:
+            if last_dates[symbol] is not None:
+                groups.setdefault(last_dates[symbol], []).append(symbol)
+        starts = sorted(groups, reverse=True)
+        if len(starts) > MAX_UPDATE_GROUPS:
+            oldest = starts[MAX_UPDATE_GROUPS - 1:]
+            merged = [s for start in oldest for s in groups.pop(start)]
+            groups[oldest[-1]] = merged
+        added = {}
+
+        if new:
+            with self._lock:
+                self.upstream_calls += 1
+            histories = self.download(new, period=self.backfill_period)
+            for symbol in new:
+                added[symbol] = self.append(symbol, histories.get(symbol))
+
+        for start, known in sorted(groups.items()):
+            with self._lock:
+                self.upstream_calls += 1
+            histories = self.download(known, start=start.isoformat())
+            for symbol in known:
+                added[symbol] = self.append(symbol, histories.get(symbol))
+
+        now = time.time()
+        with self._lock:
+            for symbol in symbols:
+                self._updated_at[symbol] = now
+        return added
+
+    def refresh(self, symbols: List[str], max_age: float) -> Dict[str, int]:
+        """``update`` only the symbols not updated in the last ``max_age`` seconds"""
+        now = time.time()
+        with self._lock:
+            stale = [s for s in symbols if now - self._updated_at.get(s, 0) > max_age]
+        return self.update(stale) if stale else {}
+
+    def range(self, symbol: str, start: Optional[str] = None,
+              end: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Zero-copy (dates, ohlcv) views for start <= date <= end (YYYY-MM-DD)"""
+        dates, ohlcv = self.arrays(symbol)
+        lo = 0 if start is None else int(np.searchsorted(
+            dates, _to_days(start), side="left"))
+        hi = len(dates) if end is None else int(np.searchsorted(
+            dates, _to_days(end), side="right"))
+        return dates[lo:hi], ohlcv[lo:hi]
+
+    def closes(self, symbol: str, start: Optional[str] = None,
+               end: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(dates, close) views; close is a strided view, not a copy"""
+        dates, ohlcv = self.range(symbol, start, end)
+        return dates, ohlcv[:, COLUMNS.index("close")]
+
+    def aligned_closes(self, symbols: List[str], start: Optional[str] = None,
+                       end: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(dates, closes) on the trading days every symbol has a bar for.
+
+        ``closes`` is a (days x symbols) matrix in the order of ``symbols``.
+        Raises ValueError naming any symbol with no stored history.
+        """
+        series = [self.closes(symbol, start, end) for symbol in symbols]
+        empty = [s for s, (dates, _) in zip(symbols, series) if len(dates) == 0]
+        if empty:
+            raise ValueError(f"No stored history for {', '.join(empty)}")
+
+        common = series[0][0]
+        for dates, _ in series[1:]:
+            common = np.intersect1d(common, dates, assume_unique=True)
+        closes = np.empty((len(common), len(symbols)))
+        for j, (dates, close) in enumerate(series):
+            closes[:, j] = close[np.searchsorted(dates, common)]
+        return np.asarray(common), closes
+
+    def latest_quote(self, symbol: str) -> Dict[str, Any]:
+        """Last bar plus previous close and daily change, from disk only"""
+        dates, ohlcv = self.arrays(symbol)
+        if len(dates) == 0:
+            raise ValueError(f"No stored history for {symbol}")
+        bar = ohlcv[-1]
+        current = float(bar[3])
+        previous = float(ohlcv[-2, 3]) if len(dates) > 1 else current
+        change = current - previous
+        return {
+            "date": (date(1970, 1, 1) + timedelta(days=int(dates[-1]))).isoformat(),
+            "open": float(bar[0]),
+            "high": float(bar[1]),
+            "low": float(bar[2]),
+            "close": current,
+            "volume": float(bar[4]),
+            "previous_close": previous,
+            "change": change,
+            "change_percent": change / previous * 100 if previous else 0.0
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            mapped = len(self._maps)
+            upstream_calls = self.upstream_calls
+        return {
+            "root": self.root,
+            "mapped_symbols": mapped,
+            "upstream_calls": upstream_calls
+        }
+
+
+def _to_days(value: str) -> int:
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def days_to_iso(days: np.ndarray) -> List[str]:
+    """Convert stored day numbers to YYYY-MM-DD strings"""
+    return np.asarray(days).astype("datetime64[D]").astype(str).tolist()
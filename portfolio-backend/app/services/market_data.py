@@ -0,0 +1,305 @@
+import abc
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from app.services.upstream import UpstreamRejected
+
+# pandas, yfinance and requests are imported where they are used: loading
+# them takes seconds on small instances and the server must answer health
+# checks before that (warm_up loads them in the background instead)
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Replay directory layout
+REPLAY_HISTORY_DIR = "histories"
+REPLAY_FUNDAMENTALS_FILE = "fundamentals.json"
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class ProviderError(ValueError):
+    """A market data call failed (upstream error or injected failure)"""
+
+
+class UnknownSymbol(ProviderError, UpstreamRejected):
+    """The provider has no data for the symbol; not an upstream failure"""
+
+
+class MarketDataProvider(abc.ABC):
+    """Where quotes, daily history and fundamentals come from.
+
+    ``histories`` is the primitive: (symbols, period=..., start=...) ->
+    {symbol: daily OHLCV DataFrame}, with unknown symbols simply absent.
+    The single-symbol and quote methods default to it, so a provider only
+    has to implement ``histories`` and ``fundamentals`` (abstract, so an
+    incomplete provider fails when it is created). Quotes use the shape of
+    yahoo_chart.parse_meta.
+    """
+
+    name = "provider"
+
+    @abc.abstractmethod
+    def histories(self, symbols: List[str], period: str = "5d",
+                  start: Optional[str] = None) -> Dict[str, "pd.DataFrame"]:
+        """{symbol: daily OHLCV DataFrame}; unknown symbols are left out"""
+
+    def history(self, symbol: str, period: str = "5d") -> "pd.DataFrame":
+        import pandas as pd
+        history = self.histories([symbol], period=period).get(symbol)
+        return history if history is not None else pd.DataFrame(columns=OHLCV_COLUMNS)
+
+    @abc.abstractmethod
+    def fundamentals(self, symbol: str) -> Dict[str, Any]:
+        """Yahoo ``Ticker.info``-style dict (currentPrice, trailingEps, sector, ...)"""
+
+    def quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Latest quote per symbol; failures map to {"error": message}"""
+        histories = self.histories(symbols, period="5d")
+        results = {}
+        for symbol in symbols:
+            history = histories.get(symbol)
+            if history is None or history.empty:
+                results[symbol] = {"error": f"No data for {symbol}"}
+            else:
+                results[symbol] = quote_from_history(symbol, history)
+        return results
+
+    def quote(self, symbol: str) -> Dict[str, Any]:
+        quote = self.quotes([symbol])[symbol]
+        if "error" in quote:
+            raise UnknownSymbol(quote["error"])
+        return quote
+
+    def warm_up(self) -> None:
+        """Import the libraries the first data call would otherwise load"""
+        import pandas  # noqa: F401
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name}
+
+
+def quote_from_history(symbol: str, history: "pd.DataFrame") -> Dict[str, Any]:
+    """Quote from the last two closes of a daily history"""
+    current_price = float(history["Close"].iloc[-1])
+    previous_close = float(history["Close"].iloc[-2]) if len(history) > 1 else current_price
+    change = current_price - previous_close
+    return {
+        "symbol": symbol,
+        "name": symbol,
+        "current_price": round(current_price, 2),
+        "change": round(change, 2),
+        "change_percent": round(change / previous_close * 100, 2) if previous_close else 0,
+        "previous_close": round(previous_close, 2),
+        "volume": int(history["Volume"].iloc[-1]) if "Volume" in history else 0,
+        "sector": "N/A",
+        "last_updated": datetime.now().isoformat()
+    }
+
+
+class YahooProvider(MarketDataProvider):
+    """Yahoo Finance: bulk yfinance downloads, Ticker.info and chart quotes"""
+
+    name = "yahoo"
+
+    def __init__(self, max_concurrency: int = 8, timeout: float = 10.0):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._chart = None
+        self._chart_lock = threading.Lock()
+
+    def _chart_client(self):
+        # Created on first use so history-only processes open no sessions
+        with self._chart_lock:
+            if self._chart is None:
+                from app.services.yahoo_chart import ChartClient
+                self._chart = ChartClient(max_concurrency=self.max_concurrency,
+                                          timeout=(3.05, self.timeout))
+            return self._chart
+
+    def warm_up(self):
+        super().warm_up()
+        import yfinance  # noqa: F401
+        from app.services import bulk_prices, yahoo_chart  # noqa: F401
+
+    def histories(self, symbols, period="5d", start=None):
+        from app.services.bulk_prices import download_histories
+        return download_histories(symbols, period=period, start=start,
+                                  timeout=self.timeout)
+
+    def history(self, symbol, period="5d"):
+        import yfinance as yf
+        return yf.Ticker(symbol).history(period=period, timeout=self.timeout)
+
+    def fundamentals(self, symbol):
+        import yfinance as yf
+        return yf.Ticker(symbol).info
+
+    def quote(self, symbol):
+        try:
+            return self._chart_client().quote(symbol)
+        except UpstreamRejected as e:
+            raise UnknownSymbol(str(e))
+        except ValueError as e:
+            raise ProviderError(str(e))
+
+    def quotes(self, symbols):
+        return self._chart_client().quotes(symbols)
+
+
+class ReplayProvider(MarketDataProvider):
+    """Market data from files, with injectable latency and failures.
+
+    ``root`` holds ``histories/<SYMBOL>.csv`` (Date, Open, High, Low, Close,
+    Volume) and ``fundamentals.json`` ({symbol: info dict}); ``capture``
+    writes that layout from another provider. Every call sleeps
+    ``latency`` seconds plus up to ``jitter`` more and fails with
+    probability ``failure_rate``, drawn from one RNG seeded with ``seed`` so
+    a run is reproducible. ``period``/``start`` are applied relative to the
+    last recorded bar, so the replayed "today" is always the recording's.
+    """
+
+    name = "replay"
+
+    def __init__(self, root: str, latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0, seed: Optional[int] = 0):
+        self.root = root
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._histories: Dict[str, Optional["pd.DataFrame"]] = {}
+        self._fundamentals = None
+        self.calls = 0
+        self.injected_failures = 0
+
+    def _call(self) -> None:
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + (self._rng.random() * self.jitter if self.jitter else 0)
+            fail = self.failure_rate > 0 and self._rng.random() < self.failure_rate
+            if fail:
+                self.injected_failures += 1
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise ProviderError("Injected replay failure")
+
+    def _load_history(self, symbol: str) -> Optional["pd.DataFrame"]:
+        import pandas as pd
+        with self._lock:
+            if symbol in self._histories:
+                return self._histories[symbol]
+        path = os.path.join(self.root, REPLAY_HISTORY_DIR, f"{symbol}.csv")
+        history = None
+        if os.path.exists(path):
+            history = pd.read_csv(path, index_col="Date", parse_dates=True)
+        with self._lock:
+            self._histories[symbol] = history
+        return history
+
+    def histories(self, symbols, period="5d", start=None):
+        import pandas as pd
+        self._call()
+        results = {}
+        for symbol in symbols:
+            history = self._load_history(symbol)
+            if history is None or history.empty:
+                continue
+            if start:
+                history = history[history.index >= pd.Timestamp(start)]
+            else:
+                cutoff = history.index[-1] - _period_offset(period)
+                history = history[history.index > cutoff]
+            if not history.empty:
+                results[symbol] = history
+        return results
+
+    def fundamentals(self, symbol):
+        self._call()
+        with self._lock:
+            if self._fundamentals is None:
+                path = os.path.join(self.root, REPLAY_FUNDAMENTALS_FILE)
+                self._fundamentals = {}
+                if os.path.exists(path):
+                    with open(path) as f:
+                        self._fundamentals = json.load(f)
+            info = self._fundamentals.get(symbol)
+        if info is None:
+            raise UnknownSymbol(f"No recorded fundamentals for {symbol}")
+        return dict(info)
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "root": self.root,
+            "calls": self.calls,
+            "injected_failures": self.injected_failures
+        }
+
+    @staticmethod
+    def capture(source: MarketDataProvider, symbols: List[str], root: str,
+                period: str = "5y") -> Dict[str, int]:
+        """Record history and fundamentals for ``symbols`` from ``source``"""
+        import pandas as pd
+        os.makedirs(os.path.join(root, REPLAY_HISTORY_DIR), exist_ok=True)
+        recorded = {"histories": 0, "fundamentals": 0}
+        for symbol, history in source.histories(symbols, period=period).items():
+            frame = history[OHLCV_COLUMNS].copy()
+            frame.index = pd.DatetimeIndex(frame.index).tz_localize(None).normalize()
+            frame.index.name = "Date"
+            frame.to_csv(os.path.join(root, REPLAY_HISTORY_DIR, f"{symbol}.csv"))
+            recorded["histories"] += 1
+
+        path = os.path.join(root, REPLAY_FUNDAMENTALS_FILE)
+        fundamentals = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                fundamentals = json.load(f)
+        for symbol in symbols:
+            try:
+                fundamentals[symbol] = source.fundamentals(symbol)
+                recorded["fundamentals"] += 1
+            except Exception as e:
+                print(f"⚠️ No fundamentals recorded for {symbol}: {e}")
+        with open(path, "w") as f:
+            json.dump(fundamentals, f, default=str)
+        return recorded
+
+
+def _period_offset(period: str) -> "pd.DateOffset":
+    """yfinance-style period ("5d", "1mo", "5y", "max") as a date offset"""
+    import pandas as pd
+    if period == "max":
+        return pd.DateOffset(years=1000)
+    for suffix, unit in (("mo", "months"), ("d", "days"), ("y", "years"), ("wk", "weeks")):
+        if period.endswith(suffix):
+            return pd.DateOffset(**{unit: int(period[:-len(suffix)])})
+    raise ValueError(f"Unsupported period {period!r}")
+
+
+def provider_from_settings(settings) -> MarketDataProvider:
+    """The provider named by MARKET_DATA_PROVIDER"""
+    if settings.MARKET_DATA_PROVIDER == "yahoo":
+        return YahooProvider(max_concurrency=settings.UPSTREAM_MAX_CONCURRENCY,
+                             timeout=settings.UPSTREAM_TIMEOUT)
+    if settings.MARKET_DATA_PROVIDER == "replay":
+        return ReplayProvider(
+            settings.REPLAY_DATA_DIR,
+            latency=settings.REPLAY_LATENCY_MS / 1000,
+            jitter=settings.REPLAY_JITTER_MS / 1000,
+            failure_rate=settings.REPLAY_FAILURE_RATE,
+            seed=settings.REPLAY_SEED)
+    raise ValueError(f"Unknown MARKET_DATA_PROVIDER {settings.MARKET_DATA_PROVIDER!r}")
+
+
+if __name__ == "__main__":
+    # python -m app.services.market_data REPLAY_DIR SYMBOL [SYMBOL ...]
+    import sys
+    if len(sys.argv) < 3:
+        sys.exit("usage: python -m app.services.market_data REPLAY_DIR SYMBOL [SYMBOL ...]")
+    print(ReplayProvider.capture(YahooProvider(), sys.argv[2:], sys.argv[1]))
@@ -0,0 +1,352 @@
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds: sub-millisecond cache hits up to upstream calls near their timeout
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (labels, value) pairs of one metric family
+Samples = List[Tuple[Dict[str, str], float]]
+
+
+class _ShardOwner:
+    __slots__ = ("__weakref__",)
+
+
+class _ThreadShards:
+    """Per-thread ``{label values: state}`` dicts, merged when read.
+
+    Each thread only ever writes its own dict, so updates need no lock.
+    When a thread exits its dict is folded into a retired total, so short
+    lived threads (one per connection in a ThreadingHTTPServer) do not
+    accumulate shards.
+    """
+
+    def __init__(self, merge: Callable[[Any, Any], Any]):
+        self._merge = merge
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._live: Dict[int, dict] = {}
+        self._retired: dict = {}
+        self._next_id = 0
+
+    def get(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            return self._new_shard()
+
+    def _new_shard(self) -> dict:
+        shard = {}
+        # Dropped with the thread's locals when the thread exits
+        owner = _ShardOwner()
+        with self._lock:
+            shard_id = self._next_id
+            self._next_id += 1
+            self._live[shard_id] = shard
+        weakref.finalize(owner, self._retire, shard_id)
+        self._local.shard = shard
+        self._local.owner = owner
+        return shard
+
+    def _retire(self, shard_id: int) -> None:
+        with self._lock:
+            shard = self._live.pop(shard_id, None)
+            if shard:
+                self._fold(self._retired, shard)
+
+    def _fold(self, into: dict, shard: dict) -> None:
+        # list() copies in one step, so a writer adding keys can't break the loop
+        for key, state in list(shard.items()):
+            into[key] = self._merge(into.get(key), state)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            merged = {key: self._merge(None, state) for key, state in self._retired.items()}
+            for shard in self._live.values():
+                self._fold(merged, shard)
+        return merged
+
+
+def _add(total, value):
+    return value if total is None else total + value
+
+
+def _add_lists(total, values):
+    values = list(values)
+    if total is None:
+        return values
+    return [a + b for a, b in zip(total, values)]
+
+
+class Counter:
+    """Monotonic count per label set (``inc("GET", "/x")``)"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._shards = _ThreadShards(_add)
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        shard = self._shards.get()
+        shard[label_values] = shard.get(label_values, 0) + amount
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        for values, total in sorted(self._shards.snapshot().items()):
+            yield self.name, dict(zip(self.labels, values)), total
+
+
+class Gauge(Counter):
+    """Up/down value per label set, e.g. requests in flight.
+
+    Increments and decrements may happen on different threads; the shards
+    hold deltas, so their sum is the current value.
+    """
+
+    kind = "gauge"
+
+    def dec(self, *label_values, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram:
+    """Bucketed observations (seconds by default) per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._shards = _ThreadShards(_add_lists)
+
+    def observe(self, value: float, *label_values) -> None:
+        shard = self._shards.get()
+        state = shard.get(label_values)
+        if state is None:
+            # One count per bucket, one for +Inf, then the sum
+            state = shard[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        for values, state in sorted(self._shards.snapshot().items()):
+            labels = dict(zip(self.labels, values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                yield self.name + "_bucket", dict(labels, le=_format(bound)), cumulative
+            yield self.name + "_sum", labels, state[-1]
+            yield self.name + "_count", labels, cumulative
+
+
+class Registry:
+    """Metrics plus collectors, rendered in the Prometheus text format.
+
+    Collectors are called at scrape time and return families as
+    ``(name, kind, help, samples)``; they suit values a component already
+    counts (cache stats, circuit state) and cost nothing per request.
+    Families with the same name from several collectors are merged.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Samples]]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collect: Callable[[], Iterable[Tuple[str, str, str, Samples]]]) -> None:
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self) -> bytes:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(_sample_line(name, labels, value)
+                         for name, labels, value in metric.samples())
+
+        families: Dict[str, Tuple[str, str, Samples]] = {}
+        for collect in collectors:
+            for name, kind, help, samples in collect():
+                families.setdefault(name, (kind, help, []))[2].extend(samples)
+        for name, (kind, help, samples) in families.items():
+            lines.append(f"# HELP {name} {_escape_help(help)}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(_sample_line(name, labels, value) for labels, value in samples)
+        return ("\n".join(lines) + "\n").encode()
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _sample_line(name: str, labels: Dict[str, Any], value: float) -> str:
+    if labels:
+        label_text = ",".join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+        return f"{name}{{{label_text}}} {_format(value)}"
+    return f"{name} {_format(value)}"
+
+
+# Process-wide registry: each server process exposes one /metrics
+REGISTRY = Registry()
+
+
+def counter(name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help, labels))
+
+
+def gauge(name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, help, labels))
+
+
+def histogram(name: str, help: str, labels: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help, labels, buckets))
+
+
+def add_collector(collect: Callable[[], Iterable[Tuple[str, str, str, Samples]]]) -> None:
+    REGISTRY.add_collector(collect)
+
+
+def render() -> bytes:
+    return REGISTRY.render()
+
+
+# HTTP server metrics, shared by real_backend, proper_backend and the FastAPI app
+HTTP_REQUESTS = counter(
+    "http_requests_total", "HTTP requests by endpoint and status code",
+    ("method", "endpoint", "status"))
+HTTP_REQUEST_DURATION = histogram(
+    "http_request_duration_seconds", "Time to handle an HTTP request",
+    ("method", "endpoint"))
+HTTP_IN_FLIGHT = gauge("http_requests_in_flight", "HTTP requests being handled")
+
+PROCESS_START = time.time()
+add_collector(lambda: [("process_start_time_seconds", "gauge",
+                        "Start time of the process since the Unix epoch",
+                        [({}, PROCESS_START)])])
+
+
+def observe_request(method: str, endpoint: str, status: int, seconds: float) -> None:
+    HTTP_REQUESTS.inc(method, endpoint, str(status))
+    HTTP_REQUEST_DURATION.observe(seconds, method, endpoint)
+
+
+def route_label(path: str, routes: Sequence[str]) -> str:
+    """Endpoint label for a request path, so symbols don't become labels.
+
+    ``routes`` are templates such as ``/stocks/price/{symbol}``, checked in
+    order: a template matches its literal part before the first ``{`` as a
+    prefix, or the whole path exactly when it has no placeholder. Anything
+    else is labelled ``other``.
+    """
+    path = path.split("?", 1)[0]
+    for route in routes:
+        brace = route.find("{")
+        if path == route if brace < 0 else path.startswith(route[:brace]):
+            return route
+    return "other"
+
+
+class RequestMetricsMixin:
+    """``HTTP_*`` metrics for a http.server request handler.
+
+    List it before the handler base class and set ``metric_routes`` to the
+    route templates for ``route_label``. Timing starts once the request
+    line has been read, so idle keep-alive time is not counted; the status
+    is whatever the handler last passed to ``log_request``.
+    """
+
+    metric_routes: Sequence[str] = ()
+
+    def handle_one_request(self):
+        self._started = None
+        self._status = 500
+        try:
+            super().handle_one_request()
+        finally:
+            if self._started is not None:
+                HTTP_IN_FLIGHT.dec()
+                # command/path stay unset when the request line is malformed
+                observe_request(self.command or "-",
+                                route_label(getattr(self, "path", ""), self.metric_routes),
+                                self._status, time.perf_counter() - self._started)
+
+    def parse_request(self):
+        self._started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        return super().parse_request()
+
+    def log_request(self, code="-", size="-"):
+        if isinstance(code, int):
+            self._status = int(code)
+        super().log_request(code, size)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording ``HTTP_*`` metrics per route template.
+
+    The endpoint label is the matched route's path (``/stocks/price/{symbol}``),
+    read from the scope after routing; unmatched requests are ``other``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            observe_request(scope["method"], getattr(route, "path", "other"), status,
+                            time.perf_counter() - started)
+
@@ -0,0 +1,198 @@
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+from app.services.dcf import to_json_array
+from app.services.history_store import days_to_iso
+from app.services.risk import TRADING_DAYS, covariance, log_returns
+
+# Annual risk-free rate (percent) for Sharpe ratios: roughly the 10y G-Sec yield
+DEFAULT_RISK_FREE = 6.5
+DEFAULT_FRONTIER_POINTS = 50
+MAX_FRONTIER_POINTS = 200
+DEFAULT_SAMPLES = 2000
+MAX_SAMPLES = 20000
+# Bound on samples x assets, so the scatter stays a few MB at any size
+MAX_SAMPLE_WEIGHTS = 500000
+MAX_ITERATIONS = 2000
+MAX_ASSETS = 100
+
+
+def project_capped_simplex(v: np.ndarray, lower: float, upper: float) -> np.ndarray:
+    """Euclidean projection of each row of ``v`` onto {sum(w) = 1, lower <= w <= upper}.
+
+    sum(clip(v - tau, lower, upper)) is piecewise linear and decreasing in
+    tau with breakpoints at v - upper (a weight leaves the upper cap) and
+    v - lower (it reaches the lower one). After one sort per row, running
+    counts of weights between the caps give the slope on each segment and
+    so the sum at every breakpoint; tau is then interpolated, with no
+    iterative search. Time is O(n log n) and memory O(n) per row.
+    """
+    v = np.atleast_2d(v)
+    rows = np.arange(len(v))
+    n = v.shape[1]
+    breakpoints = np.concatenate([v - upper, v - lower], axis=1)
+    order = np.argsort(breakpoints, axis=1, kind="stable")
+    breakpoints = np.take_along_axis(breakpoints, order, axis=1)
+    # +1 where a weight starts moving with tau, -1 where it stops
+    free = np.cumsum(np.where(order < n, 1, -1), axis=1)
+    sums = np.empty_like(breakpoints)
+    sums[:, 0] = n * upper
+    np.cumsum(-free[:, :-1] * np.diff(breakpoints, axis=1), axis=1, out=sums[:, 1:])
+    sums[:, 1:] += n * upper
+
+    k = np.argmax(sums <= 1, axis=1)
+    k0 = np.maximum(k - 1, 0)
+    t0, t1 = breakpoints[rows, k0], breakpoints[rows, k]
+    s0, s1 = sums[rows, k0], sums[rows, k]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tau = np.where(s0 > s1, t0 + (s0 - 1) * (t1 - t0) / (s0 - s1), t1)
+    return np.clip(v - tau[:, None], lower, upper)
+
+
+def evaluate_portfolios(weights: np.ndarray, mean: np.ndarray, cov: np.ndarray,
+                        risk_free: float) -> Dict[str, np.ndarray]:
+    """Return, volatility and Sharpe for a (portfolios x assets) weight matrix.
+
+    One matrix product with the shared covariance covers every portfolio.
+    Inputs and outputs are annual decimals.
+    """
+    weights = np.atleast_2d(weights)
+    returns = weights @ mean
+    volatility = np.sqrt(np.maximum(np.einsum("ij,ij->i", weights @ cov, weights), 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(volatility > 0, (returns - risk_free) / volatility, np.nan)
+    return {"return": returns, "volatility": volatility, "sharpe": sharpe}
+
+
+def solve_mean_variance(mean: np.ndarray, cov: np.ndarray, aversions: np.ndarray,
+                        lower: float, upper: float, tol: float = 1e-8) -> np.ndarray:
+    """Minimise w'Σw - λ·μ'w over the capped simplex for a batch of λ.
+
+    All λ are solved together by accelerated projected gradient: each step
+    is one (λ x assets) @ (assets x assets) product plus one batched
+    projection. Returns the (len(aversions) x assets) weight matrix.
+    """
+    n = len(mean)
+    step = 1 / (2 * max(float(np.linalg.eigvalsh(cov)[-1]), 1e-12))
+    linear = np.outer(aversions, mean)
+
+    w = project_capped_simplex(np.full((len(aversions), n), 1 / n), lower, upper)
+    y, t = w, 1.0
+    for _ in range(MAX_ITERATIONS):
+        w_next = project_capped_simplex(y - step * (2 * y @ cov - linear), lower, upper)
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        y = w_next + (t - 1) / t_next * (w_next - w)
+        done = np.abs(w_next - w).max() < tol
+        w, t = w_next, t_next
+        if done:
+            break
+    return w
+
+
+def efficient_frontier(dates: np.ndarray, closes: np.ndarray, symbols: List[str],
+                       long_only: bool = True, max_weight: Optional[float] = None,
+                       risk_free: float = DEFAULT_RISK_FREE,
+                       points: int = DEFAULT_FRONTIER_POINTS,
+                       samples: int = DEFAULT_SAMPLES,
+                       seed: Optional[int] = None) -> Dict[str, Any]:
+    """Minimum-variance, max-Sharpe and frontier portfolios from daily closes.
+
+    ``max_weight`` and ``risk_free`` are in percent. Without ``long_only``
+    weights may go as low as -max_weight (short positions). Expected
+    returns and covariance are annualized from simple daily returns.
+    """
+    n = len(symbols)
+    if not 2 <= n <= MAX_ASSETS:
+        raise ValueError(f"Need 2 to {MAX_ASSETS} symbols to optimize")
+    if len(dates) < 3:
+        raise ValueError("Need at least 3 common trading days of history")
+    if not 2 <= points <= MAX_FRONTIER_POINTS:
+        raise ValueError(f"points must be between 2 and {MAX_FRONTIER_POINTS}")
+    if not 0 <= samples <= min(MAX_SAMPLES, MAX_SAMPLE_WEIGHTS // n):
+        raise ValueError(f"samples must be between 0 and "
+                         f"{min(MAX_SAMPLES, MAX_SAMPLE_WEIGHTS // n)} for {n} symbols")
+    upper = 1.0 if max_weight is None else max_weight / 100
+    lower = 0.0 if long_only else -upper
+    if not 0 < upper <= 1 or upper * n < 1:
+        raise ValueError(f"max_weight must be in (0, 100] and at least {100 / n:.2f} "
+                         f"for {n} symbols")
+
+    returns = np.expm1(log_returns(closes))
+    mean = returns.mean(axis=0) * TRADING_DAYS
+    cov = covariance(returns)
+    rf = risk_free / 100
+
+    # λ from 0 (minimum variance) up to where the return term dominates
+    scale = 2 * float(np.linalg.eigvalsh(cov)[-1]) / max(float(np.abs(mean).max()), 1e-12)
+    aversions = np.concatenate([[0.0], np.geomspace(1e-3, 1e3, points - 1) * scale])
+    frontier = solve_mean_variance(mean, cov, aversions, lower, upper)
+    stats = evaluate_portfolios(frontier, mean, cov, rf)
+
+    # Refine the max-Sharpe point between the neighbours of the best λ
+    best = int(np.nanargmax(stats["sharpe"]))
+    lo_aversion = aversions[max(best - 1, 0)]
+    hi_aversion = aversions[min(best + 1, points - 1)]
+    refine = solve_mean_variance(
+        mean, cov, np.linspace(lo_aversion, hi_aversion, 25), lower, upper)
+    refine_stats = evaluate_portfolios(refine, mean, cov, rf)
+    best_refined = int(np.nanargmax(refine_stats["sharpe"]))
+
+    def portfolio(weights, stats, i):
+        return {
+            "weights": {symbols[j]: round(float(weights[i, j]) * 100, 2) for j in range(n)},
+            "return": round(float(stats["return"][i]) * 100, 2),
+            "volatility": round(float(stats["volatility"][i]) * 100, 2),
+            "sharpe": to_json_array(stats["sharpe"][i], 3)
+        }
+
+    order = np.argsort(stats["volatility"], kind="stable")
+    result = {
+        "symbols": symbols,
+        "start": days_to_iso(dates[:1])[0],
+        "end": days_to_iso(dates[-1:])[0],
+        "observations": len(returns),
+        "risk_free": risk_free,
+        "constraints": {
+            "long_only": long_only,
+            "max_weight": round(upper * 100, 2)
+        },
+        "expected_returns": np.round(mean * 100, 2).tolist(),
+        "volatilities": np.round(np.sqrt(np.diag(cov)) * 100, 2).tolist(),
+        "min_variance": portfolio(frontier, stats, 0),
+        "max_sharpe": portfolio(refine, refine_stats, best_refined),
+        "frontier": [portfolio(frontier, stats, i) for i in order]
+    }
+
+    if samples:
+        # Random feasible portfolios, all evaluated in one batch for the scatter
+        rng = np.random.default_rng(seed)
+        candidates = rng.dirichlet(np.ones(n), samples)
+        # Draws already sum to 1 and are >= 0 >= lower; only those over the
+        # cap need projecting
+        capped = (candidates > upper).any(axis=1)
+        if capped.any():
+            candidates[capped] = project_capped_simplex(candidates[capped], lower, upper)
+        sample_stats = evaluate_portfolios(candidates, mean, cov, rf)
+        result["samples"] = {
+            "return": to_json_array(sample_stats["return"] * 100),
+            "volatility": to_json_array(sample_stats["volatility"] * 100),
+            "sharpe": to_json_array(sample_stats["sharpe"], 3)
+        }
+    return result
+
+
+def parse_options(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Optimizer keyword arguments from a JSON request body"""
+    try:
+        max_weight = payload.get("max_weight")
+        seed = payload.get("seed")
+        return {
+            "long_only": bool(payload.get("long_only", True)),
+            "max_weight": None if max_weight is None else float(max_weight),
+            "risk_free": float(payload.get("risk_free", DEFAULT_RISK_FREE)),
+            "points": int(payload.get("points", DEFAULT_FRONTIER_POINTS)),
+            "samples": int(payload.get("samples", DEFAULT_SAMPLES)),
+            "seed": None if seed is None else int(seed)
+        }
+    except (TypeError, ValueError):
+        raise ValueError("max_weight, risk_free, points, samples and seed must be numbers")
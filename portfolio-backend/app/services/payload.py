@@ -0,0 +1,77 @@
+import json
+import struct
+import threading
+import zlib
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Bodies smaller than this are not worth a Content-Encoding
+MIN_GZIP_BYTES = 512
+
+# gzip member header: deflate, no flags, no mtime, unknown OS
+_GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+
+def _plain(value: Any) -> Any:
+    # numpy scalars and arrays expose their Python equivalent via tolist()
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON bytes, through orjson when it is installed.
+
+    Values orjson rejects fall back to the standard library encoder. numpy
+    scalars and arrays are written as their Python equivalents either way.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(obj, separators=(",", ":"), default=_plain).encode()
+
+
+class EncodedBody:
+    """A JSON document whose opening is encoded once and whose end varies.
+
+    ``head`` is everything up to the per-request fields (e.g. ``{"data":...``
+    without the closing brace). ``body(tail)`` appends a small tail such as
+    the cache age. The gzip form deflates ``head`` once, ends it on a byte
+    boundary with a sync flush and appends the tail as a stored block, so a
+    compressed response costs a CRC over the tail rather than a compressor
+    run over the whole document.
+    """
+
+    __slots__ = ("head", "_deflated", "_crc", "_lock")
+
+    def __init__(self, head: bytes):
+        self.head = head
+        self._deflated: Optional[bytes] = None
+        self._crc = 0
+        self._lock = threading.Lock()
+
+    def gzippable(self) -> bool:
+        return len(self.head) >= MIN_GZIP_BYTES
+
+    def body(self, tail: bytes, gzip: bool = False) -> bytes:
+        if not gzip:
+            return self.head + tail
+        if self._deflated is None:
+            with self._lock:
+                if self._deflated is None:
+                    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+                    self._crc = zlib.crc32(self.head)
+                    self._deflated = compressor.compress(self.head) + \
+                        compressor.flush(zlib.Z_SYNC_FLUSH)
+        size = len(tail)
+        # Final stored block: BFINAL=1, BTYPE=00, then LEN and its complement
+        stored = b"\x01" + struct.pack("<HH", size, size ^ 0xFFFF) + tail
+        trailer = struct.pack("<II", zlib.crc32(tail, self._crc),
+                              (len(self.head) + size) & 0xFFFFFFFF)
+        return _GZIP_HEADER + self._deflated + stored + trailer
@@ -0,0 +1,84 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+
+class SQLiteStore:
+    """Small key/value store that lets in-memory caches survive restarts.
+
+    Rows are namespaced by cache name and keep the timestamp of the original
+    fetch, so a reloaded entry ages exactly as it would have in memory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " timestamp REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))")
+        self._conn.commit()
+
+    def get(self, namespace: str, key: str) -> Tuple[Any, Optional[float]]:
+        """Return (value, timestamp) or (None, None)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, timestamp FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key)).fetchone()
+        if row is None:
+            return None, None
+        return json.loads(row[0]), row[1]
+
+    def put(self, namespace: str, key: str, value: Any, timestamp: float) -> None:
+        payload = json.dumps(value, default=str)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, timestamp)"
+                " VALUES (?, ?, ?, ?)",
+                (namespace, key, payload, timestamp))
+            self._conn.commit()
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key))
+            self._conn.commit()
+
+    def purge(self, namespace: str, max_age: float) -> int:
+        """Drop rows older than max_age seconds; returns the number removed"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND timestamp < ?",
+                (namespace, time.time() - max_age))
+            self._conn.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(path: str) -> Optional[SQLiteStore]:
+    """Return the shared store for a path, or None when persistence is off"""
+    if not path:
+        return None
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = SQLiteStore(path)
+        return _stores[path]
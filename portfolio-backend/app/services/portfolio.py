@@ -0,0 +1,115 @@
+import numpy as np
+from typing import Any, Dict, List
+
+MAX_HOLDINGS = 5000
+
+
+def parse_holdings(payload: Any) -> List[Dict[str, Any]]:
+    """Validate a {"holdings": [{symbol, quantity, purchasePrice}]} payload"""
+    if not isinstance(payload, dict) or not isinstance(payload.get("holdings"), list):
+        raise ValueError("Body must be a JSON object with a 'holdings' list")
+    holdings = payload["holdings"]
+    if not 0 < len(holdings) <= MAX_HOLDINGS:
+        raise ValueError(f"'holdings' needs 1 to {MAX_HOLDINGS} entries")
+
+    parsed = []
+    for i, holding in enumerate(holdings):
+        try:
+            parsed.append({
+                "symbol": str(holding["symbol"]).strip().upper(),
+                "quantity": float(holding["quantity"]),
+                "purchasePrice": float(holding["purchasePrice"]),
+                "sector": holding.get("sector")
+            })
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise ValueError(
+                f"Holding {i} needs symbol, numeric quantity and purchasePrice")
+        if not parsed[-1]["quantity"] > 0:
+            raise ValueError(f"Holding {i} needs a positive quantity")
+    return parsed
+
+
+def value_portfolio(holdings: List[Dict[str, Any]],
+                    prices: Dict[str, Any],
+                    sectors: Dict[str, str]) -> Dict[str, Any]:
+    """Per-holding value and P&L, sector allocation and totals.
+
+    ``prices`` maps symbol to a price payload (with ``current_price`` and
+    optionally ``previous_close``) or an error payload; holdings without a
+    price are valued at their purchase price, as the dashboard does.
+    ``sectors`` maps symbol to sector for holdings that did not carry one.
+    """
+    symbols = [h["symbol"] for h in holdings]
+    quantity = np.array([h["quantity"] for h in holdings], dtype=float)
+    purchase = np.array([h["purchasePrice"] for h in holdings], dtype=float)
+
+    quotes = [prices.get(s) or {} for s in symbols]
+    has_price = np.array(["current_price" in q for q in quotes])
+    current = np.array([q.get("current_price", 0) for q in quotes], dtype=float)
+    current = np.where(has_price, current, purchase)
+    previous = np.array([q.get("previous_close") or 0 for q in quotes], dtype=float)
+    previous = np.where(previous > 0, previous, current)
+
+    cost = quantity * purchase
+    value = quantity * current
+    pnl = value - cost
+    day_change = quantity * (current - previous)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pnl_percent = np.where(cost > 0, pnl / cost * 100, 0.0)
+
+    total_cost = float(cost.sum())
+    total_value = float(value.sum())
+    total_pnl = total_value - total_cost
+    total_day_change = float(day_change.sum())
+
+    holding_sectors = np.array(
+        [h.get("sector") or sectors.get(h["symbol"]) or "Unknown" for h in holdings],
+        dtype=object)
+    sector_names, sector_index = np.unique(holding_sectors, return_inverse=True)
+    sector_values = np.bincount(sector_index, weights=value, minlength=len(sector_names))
+
+    weight = value / total_value * 100 if total_value > 0 else np.zeros_like(value)
+
+    rows = [
+        {
+            "symbol": symbols[i],
+            "quantity": float(quantity[i]),
+            "purchasePrice": round(float(purchase[i]), 2),
+            "currentPrice": round(float(current[i]), 2),
+            "priceAvailable": bool(has_price[i]),
+            "sector": holding_sectors[i],
+            "investment": round(float(cost[i]), 2),
+            "currentValue": round(float(value[i]), 2),
+            "pnl": round(float(pnl[i]), 2),
+            "pnlPercent": round(float(pnl_percent[i]), 2),
+            "dayChange": round(float(day_change[i]), 2),
+            "weight": round(float(weight[i]), 2)
+        }
+        for i in range(len(holdings))
+    ]
+
+    allocation = [
+        {
+            "sector": str(name),
+            "value": round(float(v), 2),
+            "weight": round(float(v / total_value * 100), 2) if total_value > 0 else 0
+        }
+        for name, v in sorted(zip(sector_names, sector_values), key=lambda x: -x[1])
+    ]
+
+    previous_value = total_value - total_day_change
+    return {
+        "holdings": rows,
+        "sector_allocation": allocation,
+        "totals": {
+            "investment": round(total_cost, 2),
+            "currentValue": round(total_value, 2),
+            "pnl": round(total_pnl, 2),
+            "pnlPercent": round(total_pnl / total_cost * 100, 2) if total_cost > 0 else 0,
+            "dayChange": round(total_day_change, 2),
+            "dayChangePercent": round(total_day_change / previous_value * 100, 2)
+            if previous_value > 0 else 0,
+            "holdingsCount": len(holdings),
+            "pricedHoldings": int(has_price.sum())
+        }
+    }
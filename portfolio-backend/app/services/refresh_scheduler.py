@@ -0,0 +1,149 @@
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List
+
+from app.services.rate_limit import TokenBucket
+
+
+class RefreshScheduler:
+    """Background thread that refreshes "hot" symbols before they expire.
+
+    Hot symbols are the fixed ``universe`` plus anything passed to
+    ``track()`` within the last ``hot_window`` seconds (i.e. symbols users
+    are actually requesting) plus whatever the ``sources`` callables return
+    (e.g. symbols with live stream subscribers). Every symbol is refreshed once per
+    ``interval`` seconds, in batches of ``batch_size``, with random jitter
+    between batches. Upstream calls are drawn from a ``budget`` token
+    bucket that can be shared between schedulers. A bulk refresher costs
+    one token per batch, a per-symbol refresher one token per symbol.
+    """
+
+    def __init__(self, name: str, refresh: Callable[[List[str]], Any],
+                 interval: float, universe: Iterable[str] = (),
+                 batch_size: int = 50, bulk: bool = True,
+                 budget: TokenBucket = None, jitter: float = 2.0,
+                 hot_window: float = 3600, tick: float = 5.0,
+                 sources: Iterable[Callable[[], Iterable[str]]] = ()):
+        self.name = name
+        self.refresh = refresh
+        self.interval = interval
+        self.universe = list(universe)
+        self.batch_size = batch_size
+        self.bulk = bulk
+        self.budget = budget
+        self.jitter = jitter
+        self.hot_window = hot_window
+        self.tick = tick
+        self.sources = list(sources)
+        self._lock = threading.Lock()
+        self._tracked: Dict[str, float] = {}
+        self._next_due: Dict[str, float] = {}
+        self._last_refresh: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.queue_depth = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_error = None
+
+    def track(self, *symbols: str) -> None:
+        """Mark symbols as in use so they stay in the refresh set"""
+        now = time.time()
+        with self._lock:
+            for symbol in symbols:
+                self._tracked[symbol] = now
+
+    def hot_symbols(self) -> List[str]:
+        cutoff = time.time() - self.hot_window
+        with self._lock:
+            for symbol in [s for s, seen in self._tracked.items() if seen < cutoff]:
+                del self._tracked[symbol]
+            tracked = list(self._tracked)
+        sourced = [symbol for source in self.sources for symbol in source()]
+        return list(dict.fromkeys(self.universe + tracked + sourced))
+
+    def due_symbols(self) -> List[str]:
+        """Hot symbols whose refresh is due, oldest first"""
+        now = time.time()
+        symbols = self.hot_symbols()
+        with self._lock:
+            due = [s for s in symbols if self._next_due.get(s, 0) <= now]
+            due.sort(key=lambda s: self._last_refresh.get(s, 0))
+        return due
+
+    def run_once(self) -> int:
+        """Refresh every due symbol once; returns the number refreshed"""
+        due = self.due_symbols()
+        self.queue_depth = len(due)
+        refreshed = 0
+
+        for start in range(0, len(due), self.batch_size):
+            if self._stop.is_set():
+                break
+            batch = due[start:start + self.batch_size]
+            cost = 1 if self.bulk else len(batch)
+            if self.budget is not None:
+                while not self.budget.try_acquire(cost):
+                    if self._stop.wait(self.budget.wait_time(cost)):
+                        return refreshed
+
+            now = time.time()
+            try:
+                self.refresh(batch)
+                with self._lock:
+                    for symbol in batch:
+                        self._last_refresh[symbol] = now
+                        self._next_due[symbol] = now + self.interval
+                refreshed += len(batch)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                print(f"⚠️ {self.name} refresh failed for {len(batch)} symbols: {e}")
+                # Back off on this batch instead of retrying every tick
+                with self._lock:
+                    for symbol in batch:
+                        self._next_due[symbol] = now + self.interval / 4
+            self.batches += 1
+            self.queue_depth = max(0, len(due) - start - len(batch))
+
+            if self.jitter:
+                self._stop.wait(random.uniform(0, self.jitter))
+
+        return refreshed
+
+    def _run(self) -> None:
+        # Spread the first pass of multiple schedulers/processes apart
+        if self._stop.wait(random.uniform(0, self.jitter)):
+            return
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.tick)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"{self.name}-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            last_refresh = dict(self._last_refresh)
+        return {
+            "name": self.name,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "interval": self.interval,
+            "hot_symbols": len(self.hot_symbols()),
+            "queue_depth": self.queue_depth,
+            "batches": self.batches,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_refresh": last_refresh
+        }
@@ -0,0 +1,269 @@
+import numpy as np
+from collections import deque
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from app.services.dcf import to_json_array
+from app.services.history_store import days_to_iso
+
+TRADING_DAYS = 252
+# NIFTY 50 on Yahoo Finance
+BENCHMARK_SYMBOL = "^NSEI"
+DEFAULT_WINDOW = 63
+MAX_WINDOW = 1260
+DEFAULT_CONFIDENCE = 0.95
+# Rolling states kept for repeat risk requests (see rolling_series)
+ROLLING_STATE_TTL = 86400
+ROLLING_STATE_ENTRIES = 256
+
+
+def log_returns(closes) -> np.ndarray:
+    """Daily log returns down axis 0 of a close series or (days x series) matrix"""
+    return np.diff(np.log(np.asarray(closes, dtype=float)), axis=0)
+
+
+def covariance(returns: np.ndarray, periods: int = TRADING_DAYS) -> np.ndarray:
+    """Annualized covariance matrix of the columns of ``returns``"""
+    centred = returns - returns.mean(axis=0)
+    return centred.T @ centred / (len(returns) - 1) * periods
+
+
+def correlation(cov: np.ndarray) -> np.ndarray:
+    """Correlation matrix from a covariance matrix; NaN for flat series"""
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.clip(cov / np.outer(std, std), -1, 1)
+
+
+def betas(returns: np.ndarray, benchmark_returns: np.ndarray) -> np.ndarray:
+    """Beta of every column of ``returns`` against one benchmark series"""
+    centred = returns - returns.mean(axis=0)
+    bench = benchmark_returns - benchmark_returns.mean()
+    variance = bench @ bench
+    if variance == 0:
+        return np.full(centred.shape[1:], np.nan)
+    return centred.T @ bench / variance
+
+
+def max_drawdowns(values) -> np.ndarray:
+    """Worst peak-to-trough decline in percent (<= 0) down axis 0"""
+    values = np.asarray(values, dtype=float)
+    peaks = np.maximum.accumulate(values, axis=0)
+    return (values / peaks - 1).min(axis=0) * 100
+
+
+def historical_var(returns: np.ndarray, confidence: float = DEFAULT_CONFIDENCE) -> np.ndarray:
+    """One-day historical VaR as a positive percent loss down axis 0"""
+    return -np.percentile(np.expm1(returns), (1 - confidence) * 100, axis=0) * 100
+
+
+class RollingMoments:
+    """Mean and covariance of the last ``window`` rows of k return series.
+
+    ``push`` folds in the newest bar and drops the one leaving the window by
+    updating running sums, O(k^2) per bar instead of re-reading the window.
+    The sums are rebuilt from the buffered rows once per ``window`` bars so
+    floating-point drift cannot accumulate.
+    """
+
+    def __init__(self, k: int, window: int):
+        self.window = window
+        self._rows: deque = deque()
+        self._sum = np.zeros(k)
+        self._outer = np.zeros((k, k))
+        self._since_rebuild = 0
+
+    def push(self, row) -> None:
+        row = np.asarray(row, dtype=float)
+        self._rows.append(row)
+        self._sum += row
+        self._outer += np.outer(row, row)
+        if len(self._rows) > self.window:
+            old = self._rows.popleft()
+            self._sum -= old
+            self._outer -= np.outer(old, old)
+            self._since_rebuild += 1
+            if self._since_rebuild >= self.window:
+                rows = np.array(self._rows)
+                self._sum = rows.sum(axis=0)
+                self._outer = rows.T @ rows
+                self._since_rebuild = 0
+
+    def copy(self) -> "RollingMoments":
+        clone = RollingMoments.__new__(RollingMoments)
+        clone.window = self.window
+        clone._rows = deque(self._rows)
+        clone._sum = self._sum.copy()
+        clone._outer = self._outer.copy()
+        clone._since_rebuild = self._since_rebuild
+        return clone
+
+    def ready(self) -> bool:
+        return len(self._rows) == self.window
+
+    def mean(self) -> np.ndarray:
+        return self._sum / max(len(self._rows), 1)
+
+    def covariance(self) -> np.ndarray:
+        n = len(self._rows)
+        if n < 2:
+            return np.full(self._outer.shape, np.nan)
+        mean = self._sum / n
+        return (self._outer - n * np.outer(mean, mean)) / (n - 1)
+
+
+class RollingSeries:
+    """Rolling volatility (and beta vs column 1) of a return series so far.
+
+    ``extend`` pushes further rows through RollingMoments, so a state kept
+    from an earlier request only has to take the bars added since.
+    """
+
+    def __init__(self, k: int, window: int):
+        self.moments = RollingMoments(k, window)
+        self.rows = 0
+        self.last_day: Optional[int] = None
+        self.volatility: List[float] = []
+        self.beta: List[float] = []
+
+    def copy(self) -> "RollingSeries":
+        clone = RollingSeries.__new__(RollingSeries)
+        clone.moments = self.moments.copy()
+        clone.rows = self.rows
+        clone.last_day = self.last_day
+        clone.volatility = list(self.volatility)
+        clone.beta = list(self.beta)
+        return clone
+
+    def extend(self, series: np.ndarray, days: np.ndarray) -> None:
+        """Push rows of ``series``; ``days`` holds the date of each row"""
+        for row in series:
+            self.moments.push(row)
+            if self.moments.ready():
+                moments = self.moments.covariance()
+                self.volatility.append(np.sqrt(moments[0, 0] * TRADING_DAYS) * 100)
+                if series.shape[1] > 1:
+                    self.beta.append(moments[0, 1] / moments[1, 1]
+                                     if moments[1, 1] > 0 else np.nan)
+        self.rows += len(series)
+        if len(days):
+            self.last_day = int(days[-1])
+
+
+def rolling_series(series: np.ndarray, days: np.ndarray, window: int,
+                   states=None, key: Hashable = None) -> Tuple[List[float], List[float]]:
+    """Rolling volatility and beta of ``series`` (row i is on ``days[i]``).
+
+    With ``states`` (a TTLCache) the state after every row but the last is
+    kept under ``key`` and a later call with more bars only pushes the new
+    ones. The last row is left out of the stored state: the history store
+    rewrites a symbol's latest bar while the session is open, but never an
+    earlier one.
+    """
+    state = None
+    if states is not None:
+        state, _ = states.get(key)
+    done = len(series) - 1
+    if (state is None or state.rows > done
+            or (state.rows and state.last_day != int(days[state.rows - 1]))):
+        state = RollingSeries(series.shape[1], window)
+    elif state.rows < done:
+        state = state.copy()
+    if state.rows < done:
+        state.extend(series[state.rows:done], days[state.rows:done])
+        if states is not None:
+            states.set(key, state)
+
+    latest = state.copy()
+    latest.extend(series[done:], days[done:])
+    return latest.volatility, latest.beta
+
+
+def portfolio_risk(dates: np.ndarray, closes: np.ndarray, symbols: List[str],
+                   quantities, benchmark_closes: Optional[np.ndarray] = None,
+                   window: int = DEFAULT_WINDOW,
+                   confidence: float = DEFAULT_CONFIDENCE,
+                   rolling_states=None) -> Dict[str, Any]:
+    """Risk metrics for a buy-and-hold portfolio over aligned daily closes.
+
+    ``closes`` is (days x symbols) as returned by HistoryStore.aligned_closes
+    and ``benchmark_closes`` is on the same dates. Every per-asset metric is
+    computed for all columns at once; the rolling series are produced by
+    pushing one bar at a time through RollingMoments, resuming from the
+    state in ``rolling_states`` when the same portfolio was seen before.
+    """
+    if not 2 <= window <= MAX_WINDOW:
+        raise ValueError(f"window must be between 2 and {MAX_WINDOW}")
+    if not 0.5 <= confidence < 1:
+        raise ValueError("confidence must be between 0.5 and 1")
+    if len(dates) < 3:
+        raise ValueError("Need at least 3 common trading days of history")
+
+    quantities = np.asarray(quantities, dtype=float)
+    if not (quantities > 0).all():
+        raise ValueError("Quantities must be positive")
+    values = closes @ quantities
+    weights = closes[-1] * quantities / values[-1]
+
+    returns = log_returns(closes)
+    portfolio_returns = log_returns(values)
+    cov = covariance(returns)
+    asset_vol = np.sqrt(np.diag(cov)) * 100
+    portfolio_vol = float(np.sqrt(weights @ cov @ weights)) * 100
+
+    if benchmark_closes is not None:
+        benchmark_returns = log_returns(benchmark_closes)
+        asset_beta = betas(returns, benchmark_returns)
+        portfolio_beta = float(betas(portfolio_returns[:, None], benchmark_returns)[0])
+        series = np.column_stack([portfolio_returns, benchmark_returns])
+    else:
+        asset_beta = np.full(len(symbols), np.nan)
+        portfolio_beta = None
+        series = portfolio_returns[:, None]
+
+    asset_drawdown = max_drawdowns(closes)
+    asset_var = historical_var(returns, confidence)
+
+    # Same holdings, window and first day: the stored rows are still valid
+    key = (tuple(symbols), tuple(quantities.tolist()), benchmark_closes is not None,
+           window, int(dates[0]))
+    rolling_vol, rolling_beta = rolling_series(
+        series, dates[1:], window, rolling_states, key)
+
+    years = (dates[-1] - dates[0]) / 365.25
+    total_return = values[-1] / values[0] - 1
+    return {
+        "start": days_to_iso(dates[:1])[0],
+        "end": days_to_iso(dates[-1:])[0],
+        "observations": len(returns),
+        "benchmark": BENCHMARK_SYMBOL if benchmark_closes is not None else None,
+        "confidence": confidence,
+        "portfolio": {
+            "value": round(float(values[-1]), 2),
+            "totalReturn": round(float(total_return) * 100, 2),
+            "annualizedReturn": round(float((1 + total_return) ** (1 / years) - 1) * 100, 2)
+            if years > 0 else None,
+            "volatility": round(portfolio_vol, 2),
+            "beta": round(portfolio_beta, 3) if portfolio_beta is not None else None,
+            "maxDrawdown": round(float(max_drawdowns(values)), 2),
+            "valueAtRisk": round(float(historical_var(portfolio_returns, confidence)), 2)
+        },
+        "assets": [
+            {
+                "symbol": symbols[i],
+                "weight": round(float(weights[i]) * 100, 2),
+                "volatility": round(float(asset_vol[i]), 2),
+                "beta": None if np.isnan(asset_beta[i]) else round(float(asset_beta[i]), 3),
+                "maxDrawdown": round(float(asset_drawdown[i]), 2),
+                "valueAtRisk": round(float(asset_var[i]), 2)
+            }
+            for i in range(len(symbols))
+        ],
+        "correlation": to_json_array(correlation(cov), 4),
+        "covariance": to_json_array(cov, 6),
+        "rolling": {
+            "window": window,
+            "dates": days_to_iso(dates[window:]),
+            "volatility": to_json_array(rolling_vol),
+            "beta": to_json_array(rolling_beta, 3) if rolling_beta else None
+        }
+    }
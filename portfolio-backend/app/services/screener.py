@@ -0,0 +1,145 @@
+import threading
+import time
+import numpy as np
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.services.dcf import intrinsic_values, margins_of_safety
+
+SORT_COLUMNS = ["margin_of_safety", "intrinsic_value",
+                "current_price", "eps", "fcf_per_share", "symbol"]
+MAX_PAGE_SIZE = 500
+
+
+class FundamentalsTable:
+    """Columnar snapshot of cached fundamentals for the screened universe.
+
+    ``load_rows`` returns one dict per symbol (symbol, name, sector, eps,
+    currentPrice), built from caches only, so rebuilding the table never
+    touches the upstream API. With a ``universe``, rows outside it are
+    dropped and results report how much of it has fundamentals cached;
+    without one, every cached row is screened. The table is rebuilt at
+    most once every ``max_age`` seconds and shared by all screener
+    requests in between.
+    """
+
+    def __init__(self, load_rows: Callable[[], List[Dict[str, Any]]],
+                 sector_ratios: Dict[str, float], max_age: float = 30,
+                 universe: Iterable[str] = ()):
+        self.load_rows = load_rows
+        self.sector_ratios = sector_ratios
+        self.max_age = max_age
+        self.universe = frozenset(universe)
+        self._lock = threading.Lock()
+        self._columns: Optional[Dict[str, np.ndarray]] = None
+        self._built_at = 0.0
+
+    def _build(self) -> Dict[str, np.ndarray]:
+        rows = self.load_rows()
+        if self.universe:
+            rows = [row for row in rows if row["symbol"] in self.universe]
+        default_ratio = self.sector_ratios.get("default", 0.80)
+        sectors = np.array([row.get("sector") or "N/A" for row in rows], dtype=object)
+        eps = np.array([row.get("eps") or 0 for row in rows], dtype=float)
+
+        # EPS-based FCF estimate, vectorised over every row
+        ratios = np.array([self.sector_ratios.get(s, default_ratio) for s in sectors],
+                          dtype=float)
+        return {
+            "symbol": np.array([row["symbol"] for row in rows], dtype=object),
+            "name": np.array([row.get("name") or row["symbol"] for row in rows],
+                             dtype=object),
+            "sector": sectors,
+            "eps": eps,
+            "fcf_per_share": np.round(eps * ratios, 2),
+            "current_price": np.array([row.get("currentPrice") or 0 for row in rows],
+                                      dtype=float)
+        }
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        with self._lock:
+            if self._columns is None or time.time() - self._built_at > self.max_age:
+                self._columns = self._build()
+                self._built_at = time.time()
+            return self._columns
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._columns = None
+
+    def screen(self, growth: float, discount: float, terminal_growth: float,
+               sector: str = None, min_margin: float = None,
+               max_margin: float = None, min_price: float = None,
+               max_price: float = None, sort_by: str = "margin_of_safety",
+               descending: bool = True, page: int = 1,
+               page_size: int = 50) -> Dict[str, Any]:
+        """Value every row in one pass, then filter, sort and paginate.
+
+        Rates are in percent, as on the Valuation page.
+        """
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_COLUMNS)}")
+        if page < 1 or not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"page must be >= 1 and page_size 1 to {MAX_PAGE_SIZE}")
+        if terminal_growth >= discount:
+            raise ValueError("Terminal growth rate must be less than discount rate")
+
+        cols = self.columns()
+        intrinsic = intrinsic_values(
+            cols["fcf_per_share"], growth / 100, discount / 100, terminal_growth / 100)
+        margin = margins_of_safety(intrinsic, cols["current_price"])
+
+        # Rows without a price or FCF cannot be valued
+        mask = (cols["current_price"] > 0) & (cols["fcf_per_share"] > 0)
+        if sector:
+            mask &= cols["sector"] == sector
+        if min_margin is not None:
+            mask &= margin >= min_margin
+        if max_margin is not None:
+            mask &= margin <= max_margin
+        if min_price is not None:
+            mask &= cols["current_price"] >= min_price
+        if max_price is not None:
+            mask &= cols["current_price"] <= max_price
+
+        index = np.flatnonzero(mask)
+        sort_values = {
+            "margin_of_safety": margin,
+            "intrinsic_value": intrinsic
+        }.get(sort_by, cols.get(sort_by))
+        order = np.argsort(sort_values[index], kind="stable")
+        if descending:
+            order = order[::-1]
+        index = index[order]
+
+        start = (page - 1) * page_size
+        page_index = index[start:start + page_size]
+        rows = [
+            {
+                "symbol": cols["symbol"][i],
+                "name": cols["name"][i],
+                "sector": cols["sector"][i],
+                "eps": round(float(cols["eps"][i]), 2),
+                "fcfPerShare": float(cols["fcf_per_share"][i]),
+                "currentPrice": round(float(cols["current_price"][i]), 2),
+                "intrinsicValue": round(float(intrinsic[i]), 2),
+                "marginOfSafety": round(float(margin[i]), 2)
+            }
+            for i in page_index
+        ]
+
+        universe_size = len(self.universe) or len(cols["symbol"])
+        return {
+            "universe_size": universe_size,
+            "covered": len(cols["symbol"]),
+            "coverage": round(100 * len(cols["symbol"]) / universe_size, 1)
+            if universe_size else 0.0,
+            "matches": len(index),
+            "page": page,
+            "page_size": page_size,
+            "assumptions": {
+                "growth": growth,
+                "discount": discount,
+                "terminal_growth": terminal_growth
+            },
+            "rows": rows
+        }
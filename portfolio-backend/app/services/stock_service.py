@@ -1,8 +1,73 @@
-import yfinance as yf
-import pandas as pd
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import TYPE_CHECKING, List, Optional, Dict, Any
+from app.core.config import settings
 from app.models.stock import StockPrice
+from app.services.backtest import backtest, parse_allocations
+from app.services.cache import TTLCache
+from app.services import metrics
+from app.services.history_store import HistoryStore
+from app.services.market_data import provider_from_settings
+from app.services.persistent_cache import open_store
+from app.services.optimizer import efficient_frontier
+from app.services.portfolio import value_portfolio
+from app.services.rate_limit import TokenBucket
+from app.services.refresh_scheduler import RefreshScheduler
+from app.services.risk import (
+    BENCHMARK_SYMBOL, ROLLING_STATE_ENTRIES, ROLLING_STATE_TTL, portfolio_risk
+)
+from app.services.symbols import load_symbol_index
+from app.services.upstream import CircuitBreaker, UpstreamGateway
+from app.services.versions import VersionLog
+from app.services.warmup import WarmUp
+
+if TYPE_CHECKING:
+    # Loaded by the market data provider when first needed (see warm_up)
+    import pandas as pd
+
+# Upper bound on symbols per multi-symbol request (as in real_backend)
+MAX_BATCH_SYMBOLS = 500
+
+# Blocking yfinance calls run here so they never stall the event loop. At
+# most UPSTREAM_MAX_CONCURRENCY run for waiting requests; a call that times
+# out gives its slot back at once while its thread finishes in the spare
+# workers (the provider's own timeouts bound how long that takes)
+_upstream_slots = asyncio.Semaphore(settings.UPSTREAM_MAX_CONCURRENCY)
+_upstream_executor = ThreadPoolExecutor(
+    max_workers=2 * settings.UPSTREAM_MAX_CONCURRENCY,
+    thread_name_prefix="upstream")
+
+# Market data source (MARKET_DATA_PROVIDER) behind a shared rate limit and
+# circuit breaker; while the circuit is open upstream calls fail fast and
+# stale cache entries keep being served
+market_data = provider_from_settings(settings)
+upstream_gateway = UpstreamGateway(
+    market_data.name, rate=settings.UPSTREAM_CALLS_PER_SECOND,
+    burst=settings.UPSTREAM_BURST, max_wait=settings.UPSTREAM_MAX_WAIT,
+    breaker=CircuitBreaker(
+        failure_threshold=settings.UPSTREAM_FAILURE_THRESHOLD,
+        backoff=settings.UPSTREAM_BACKOFF,
+        max_backoff=settings.UPSTREAM_MAX_BACKOFF))
+
+# Loads the provider's data libraries in the background once the app is
+# serving; /ready reports when it is done
+warm_up = WarmUp([("market_data", market_data.warm_up)])
+
+# Listed symbols for search and validation (None: accept any ticker)
+symbol_index = load_symbol_index(settings.SYMBOL_MASTER_PATH)
+
+
+def fetch_histories(symbols: List[str], **kwargs) -> Dict[str, "pd.DataFrame"]:
+    """History download through the gateway, skipping unlisted symbols"""
+    listed = [symbol for symbol in symbols if StockService.is_listed(symbol)]
+    return upstream_gateway.call(market_data.histories, listed, **kwargs) if listed else {}
+
+
+# Daily OHLCV on disk: price misses download only the bars since the last one
+history_store = HistoryStore(
+    settings.HISTORY_DIR, fetch_histories,
+    backfill_period=settings.HISTORY_BACKFILL_PERIOD) if settings.HISTORY_DIR else None
 
 
 class StockService:
@@ -25,6 +90,22 @@ class StockService:
         "SUNPHARMA": "SUNPHARMA.NS"
     }
 
+    # Bounded price cache; concurrent misses share one upstream fetch and
+    # expired entries are served stale while refreshing in the background.
+    # Persisted to CACHE_DB_PATH (if set) so restarts start warm.
+    price_cache = TTLCache(
+        "stock_price", ttl=settings.PRICE_CACHE_TTL,
+        maxsize=settings.CACHE_MAX_ENTRIES,
+        stale_ttl=settings.PRICE_CACHE_STALE_TTL,
+        store=open_store(settings.CACHE_DB_PATH),
+        encode=lambda price: price.dict(),
+        decode=lambda data: StockPrice(**data))
+
+    # Rolling risk states per portfolio and window, so repeat requests only
+    # push the bars added since (see risk.rolling_series)
+    rolling_states = TTLCache(
+        "rolling_risk", ttl=ROLLING_STATE_TTL, maxsize=ROLLING_STATE_ENTRIES)
+
     @staticmethod
     def format_indian_symbol(symbol: str) -> str:
         """Convert plain symbol to yfinance format for Indian stocks"""
@@ -38,53 +119,326 @@ class StockService:
         if symbol_upper in StockService.INDIAN_STOCKS:
             return StockService.INDIAN_STOCKS[symbol_upper]
 
+        # Exchange from the symbol master (BSE-only listings get .BO)
+        resolved = symbol_index.resolve(symbol_upper) if symbol_index is not None else None
+        if resolved is not None:
+            return resolved
+
         # Default to NSE format
         return f"{symbol_upper}.NS"
 
+    @staticmethod
+    def is_listed(formatted_symbol: str) -> bool:
+        """Whether a formatted symbol may be sent upstream"""
+        if symbol_index is None or not settings.SYMBOL_VALIDATION:
+            return True
+        return symbol_index.resolve(formatted_symbol) is not None
+
     @staticmethod
     def get_stock_price(symbol: str) -> StockPrice:
         """Get current stock price and details for Indian stocks"""
+        formatted_symbol = StockService.format_indian_symbol(symbol)
+        if not StockService.is_listed(formatted_symbol):
+            raise ValueError(f"Unknown symbol: {symbol}")
+        price_scheduler.track(formatted_symbol)
+        price, _, _ = StockService.price_cache.fetch(
+            formatted_symbol, StockService._fetch_stock_price, symbol)
+        return StockService._for_caller(price, symbol)
+
+    @staticmethod
+    def _for_caller(price: StockPrice, symbol: str) -> StockPrice:
+        """A cached price (keyed and built with the formatted symbol) carrying
+        the symbol as the caller wrote it, as responses always have"""
+        if price.symbol == symbol:
+            return price
+        return price.copy(update={"symbol": symbol})
+
+    @staticmethod
+    def _fetch_stock_price(symbol: str) -> StockPrice:
+        """Fetch price details from yfinance (one upstream call)"""
         try:
             formatted_symbol = StockService.format_indian_symbol(symbol)
             print(f"📈 Fetching data for: {formatted_symbol}")
 
-            stock = yf.Ticker(formatted_symbol)
+            if history_store is not None and history_store.last_date(formatted_symbol) is not None:
+                # Only the bars since the last stored one are downloaded
+                history_store.update([formatted_symbol])
+                return StockService._price_from_quote(
+                    formatted_symbol, history_store.latest_quote(formatted_symbol))
+
+            # Symbols not in the store yet are quoted directly; their history
+            # is backfilled once risk, optimizer or backtest asks for it
+
             # Get 2 days to calculate change
-            history = stock.history(period="2d")
-
-            if history.empty:
-                raise ValueError(f"No data found for symbol: {symbol}")
-
-            current_price = history['Close'].iloc[-1]
-            previous_close = history['Close'].iloc[-2] if len(
-                history) > 1 else current_price
-
-            change = current_price - previous_close
-            change_percent = (change / previous_close) * 100
-
-            return StockPrice(
-                symbol=symbol,
-                current_price=round(current_price, 2),
-                change=round(change, 2),
-                change_percent=round(change_percent, 2),
-                previous_close=round(previous_close, 2),
-                open_price=round(history['Open'].iloc[-1], 2),
-                day_high=round(history['High'].iloc[-1], 2),
-                day_low=round(history['Low'].iloc[-1], 2),
-                volume=int(history['Volume'].iloc[-1]),
-                last_updated=datetime.now()
-            )
+            history = upstream_gateway.call(
+                market_data.history, formatted_symbol, period="2d")
+
+            return StockService._price_from_history(formatted_symbol, history)
         except Exception as e:
             raise ValueError(
                 f"Error fetching stock price for {symbol}: {str(e)}")
 
     @staticmethod
-    def get_multiple_prices(symbols: List[str]) -> Dict[str, Any]:
-        """Get prices for multiple stocks at once"""
+    def _price_from_history(symbol: str, history: "pd.DataFrame") -> StockPrice:
+        """Build a StockPrice from the last two rows of a daily history"""
+        if history.empty:
+            raise ValueError(f"No data found for symbol: {symbol}")
+
+        current_price = history['Close'].iloc[-1]
+        previous_close = history['Close'].iloc[-2] if len(
+            history) > 1 else current_price
+
+        change = current_price - previous_close
+        change_percent = (change / previous_close) * 100
+
+        return StockPrice(
+            symbol=symbol,
+            current_price=round(current_price, 2),
+            change=round(change, 2),
+            change_percent=round(change_percent, 2),
+            previous_close=round(previous_close, 2),
+            open_price=round(history['Open'].iloc[-1], 2),
+            day_high=round(history['High'].iloc[-1], 2),
+            day_low=round(history['Low'].iloc[-1], 2),
+            volume=int(history['Volume'].iloc[-1]),
+            last_updated=datetime.now()
+        )
+
+    @staticmethod
+    def _price_from_quote(symbol: str, quote: Dict[str, Any]) -> StockPrice:
+        """Build a StockPrice from a history store quote"""
+        return StockPrice(
+            symbol=symbol,
+            current_price=round(quote["close"], 2),
+            change=round(quote["change"], 2),
+            change_percent=round(quote["change_percent"], 2),
+            previous_close=round(quote["previous_close"], 2),
+            open_price=round(quote["open"], 2),
+            day_high=round(quote["high"], 2),
+            day_low=round(quote["low"], 2),
+            volume=int(quote["volume"]),
+            last_updated=datetime.now()
+        )
+
+    @staticmethod
+    def get_multiple_prices(symbols: List[str], use_cache: bool = True) -> Dict[str, Any]:
+        """Get prices for multiple stocks at once.
+
+        Cached symbols are served from the price cache; everything else is
+        fetched with a single bulk download.
+        """
+        formatted = {
+            symbol: StockService.format_indian_symbol(symbol) for symbol in symbols
+        }
         results = {}
-        for symbol in symbols:
-            try:
-                results[symbol] = StockService.get_stock_price(symbol).dict()
-            except Exception as e:
-                results[symbol] = {"error": str(e)}
-        return results
+        missing = []
+        unlisted = [symbol for symbol in symbols if not StockService.is_listed(formatted[symbol])]
+        for symbol in unlisted:
+            results[symbol] = {"error": f"Unknown symbol: {symbol}"}
+        symbols_to_fetch = [symbol for symbol in symbols if symbol not in results]
+        if use_cache:
+            price_scheduler.track(*(formatted[symbol] for symbol in symbols_to_fetch))
+        for symbol in symbols_to_fetch:
+            cached = None
+            if use_cache:
+                cached, _ = StockService.price_cache.get(formatted[symbol])
+            if cached is not None:
+                results[symbol] = dict(cached.dict(), symbol=symbol)
+            else:
+                missing.append(symbol)
+
+        if missing:
+            print(f"📈 Bulk fetching {len(missing)} symbols")
+            yahoo_symbols = sorted({formatted[symbol] for symbol in missing})
+            # Stored symbols top up their tail; the rest get a short download
+            # instead of a multi-year backfill on the request path
+            stored = set()
+            if history_store is not None:
+                stored = {s for s in yahoo_symbols if history_store.last_date(s) is not None}
+            cold = [s for s in yahoo_symbols if s not in stored]
+            histories = {}
+            update_error = download_error = None
+            if stored:
+                try:
+                    history_store.update(sorted(stored))
+                except Exception as e:
+                    update_error = str(e)
+            if cold:
+                try:
+                    histories = fetch_histories(cold, period="5d")
+                except Exception as e:
+                    download_error = str(e)
+
+            for symbol in missing:
+                try:
+                    if formatted[symbol] in stored:
+                        if update_error is not None:
+                            raise ValueError(update_error)
+                        price = StockService._price_from_quote(
+                            formatted[symbol], history_store.latest_quote(formatted[symbol]))
+                        StockService.price_cache.set(formatted[symbol], price)
+                        results[symbol] = dict(price.dict(), symbol=symbol)
+                        continue
+                    history = histories.get(formatted[symbol])
+                    if history is None:
+                        raise ValueError(
+                            download_error or f"No data found for symbol: {symbol}")
+                    price = StockService._price_from_history(formatted[symbol], history)
+                    StockService.price_cache.set(formatted[symbol], price)
+                    results[symbol] = dict(price.dict(), symbol=symbol)
+                except Exception as e:
+                    results[symbol] = {
+                        "error": f"Error fetching stock price for {symbol}: {str(e)}"
+                    }
+
+        return {symbol: results[symbol] for symbol in symbols}
+
+    @staticmethod
+    async def _run_upstream(func, *args):
+        """Run a blocking service call in the upstream pool with a timeout"""
+        loop = asyncio.get_running_loop()
+
+        async def run():
+            async with _upstream_slots:
+                return await loop.run_in_executor(_upstream_executor, func, *args)
+
+        try:
+            # Cancelling run() on timeout leaves the semaphore block, so the
+            # slot is released even though the thread is still working
+            return await asyncio.wait_for(run(), timeout=settings.UPSTREAM_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise ValueError(
+                f"Upstream request timed out after {settings.UPSTREAM_TIMEOUT}s")
+
+    @staticmethod
+    async def get_stock_price_async(symbol: str) -> StockPrice:
+        """Non-blocking get_stock_price for async endpoints"""
+        # Fresh cache hits are answered on the event loop without a thread hop
+        formatted_symbol = StockService.format_indian_symbol(symbol)
+        cached, _ = StockService.price_cache.get(formatted_symbol, count_miss=False)
+        if cached is not None:
+            price_scheduler.track(formatted_symbol)
+            return StockService._for_caller(cached, symbol)
+        return await StockService._run_upstream(StockService.get_stock_price, symbol)
+
+    @staticmethod
+    async def get_multiple_prices_async(symbols: List[str]) -> Dict[str, Any]:
+        """Non-blocking get_multiple_prices for async endpoints"""
+        return await StockService._run_upstream(StockService.get_multiple_prices, symbols)
+
+    @staticmethod
+    def value_portfolio(holdings: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Value a whole portfolio from one batched price lookup"""
+        symbols = list(dict.fromkeys(h["symbol"] for h in holdings))
+        prices = StockService.get_multiple_prices(symbols)
+        return value_portfolio(holdings, prices, {})
+
+    @staticmethod
+    async def value_portfolio_async(holdings: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Non-blocking value_portfolio for async endpoints"""
+        return await StockService._run_upstream(StockService.value_portfolio, holdings)
+
+    @staticmethod
+    def portfolio_risk(holdings: List[Dict[str, Any]], start: Optional[str],
+                       window: int, confidence: float) -> Dict[str, Any]:
+        """Risk metrics for the holdings from the local history store"""
+        if history_store is None:
+            raise ValueError("History store is disabled (HISTORY_DIR is empty)")
+        quantities: Dict[str, float] = {}
+        for holding in holdings:
+            symbol = StockService.format_indian_symbol(holding["symbol"])
+            quantities[symbol] = quantities.get(symbol, 0) + holding["quantity"]
+        symbols = list(quantities)
+
+        # New bars are downloaded at most once per price TTL
+        history_store.refresh(symbols + [BENCHMARK_SYMBOL], settings.PRICE_CACHE_TTL)
+        has_benchmark = history_store.last_date(BENCHMARK_SYMBOL) is not None
+        dates, closes = history_store.aligned_closes(
+            symbols + [BENCHMARK_SYMBOL] if has_benchmark else symbols, start)
+        return portfolio_risk(
+            dates, closes[:, :len(symbols)], symbols,
+            [quantities[symbol] for symbol in symbols],
+            closes[:, -1] if has_benchmark else None,
+            window=window, confidence=confidence,
+            rolling_states=StockService.rolling_states)
+
+    @staticmethod
+    async def portfolio_risk_async(holdings: List[Dict[str, Any]], start: Optional[str],
+                                   window: int, confidence: float) -> Dict[str, Any]:
+        """Non-blocking portfolio_risk for async endpoints"""
+        return await StockService._run_upstream(
+            StockService.portfolio_risk, holdings, start, window, confidence)
+
+    @staticmethod
+    def efficient_frontier(symbols: Optional[List[str]], start: Optional[str],
+                           **options) -> Dict[str, Any]:
+        """Efficient frontier for the symbols (default: INDIAN_STOCKS)"""
+        if history_store is None:
+            raise ValueError("History store is disabled (HISTORY_DIR is empty)")
+        symbols = list(dict.fromkeys(
+            StockService.format_indian_symbol(symbol)
+            for symbol in symbols or StockService.INDIAN_STOCKS))
+        history_store.refresh(symbols, settings.PRICE_CACHE_TTL)
+        dates, closes = history_store.aligned_closes(symbols, start)
+        return efficient_frontier(dates, closes, symbols, **options)
+
+    @staticmethod
+    async def efficient_frontier_async(symbols: Optional[List[str]], start: Optional[str],
+                                       **options) -> Dict[str, Any]:
+        """Non-blocking efficient_frontier for async endpoints"""
+        return await StockService._run_upstream(
+            lambda: StockService.efficient_frontier(symbols, start, **options))
+
+    @staticmethod
+    def backtest(symbols: List[str], allocations: List[Any], start: Optional[str],
+                 end: Optional[str], **options) -> Dict[str, Any]:
+        """Backtest a batch of allocations over the symbols' stored closes"""
+        if history_store is None:
+            raise ValueError("History store is disabled (HISTORY_DIR is empty)")
+        symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols))
+        weights = parse_allocations(allocations, symbols)
+        formatted = [StockService.format_indian_symbol(symbol) for symbol in symbols]
+        history_store.refresh(formatted, settings.PRICE_CACHE_TTL)
+        dates, closes = history_store.aligned_closes(formatted, start, end)
+        return backtest(dates, closes, symbols, weights, **options)
+
+    @staticmethod
+    async def backtest_async(symbols: List[str], allocations: List[Any],
+                             start: Optional[str], end: Optional[str],
+                             **options) -> Dict[str, Any]:
+        """Non-blocking backtest for async endpoints"""
+        return await StockService._run_upstream(
+            lambda: StockService.backtest(symbols, allocations, start, end, **options))
+
+    @staticmethod
+    def refresh_prices(symbols: List[str]) -> None:
+        """Re-fetch prices for symbols in one bulk download (scheduler hook)"""
+        prices = StockService.get_multiple_prices(symbols, use_cache=False)
+        errors = [p["error"] for p in prices.values() if "error" in p]
+        if errors and len(errors) == len(prices):
+            raise ValueError(errors[0])
+
+
+# Change versions behind ?since= deltas and ETags on batch responses; a
+# refresh that returns the same quote is not a change
+quote_versions = VersionLog("stock_price")
+StockService.price_cache.add_listener(
+    lambda symbol, price: quote_versions.record(
+        symbol, (price.current_price, price.change, price.previous_close)))
+
+# Keeps the tracked universe and recently requested symbols fresh in the
+# price cache; started and stopped with the FastAPI app
+price_scheduler = RefreshScheduler(
+    "stock_price", StockService.refresh_prices,
+    interval=settings.PRICE_CACHE_TTL * 0.8,
+    universe=list(StockService.INDIAN_STOCKS.values()),
+    batch_size=settings.REFRESH_BATCH_SIZE,
+    budget=TokenBucket(
+        rate=settings.REFRESH_CALLS_PER_MINUTE / 60,
+        capacity=max(1, settings.REFRESH_CALLS_PER_MINUTE / 6)),
+    hot_window=settings.REFRESH_HOT_WINDOW)
+
+# Cache and upstream state for /metrics, read at scrape time
+metrics.add_collector(StockService.price_cache.metrics)
+metrics.add_collector(StockService.rolling_states.metrics)
+metrics.add_collector(upstream_gateway.metrics)
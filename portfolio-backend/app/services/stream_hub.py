@@ -0,0 +1,288 @@
+import json
+import selectors
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+
+class _Subscriber:
+    __slots__ = ("sock", "symbols", "pending", "buffer", "blocked_since", "events")
+
+    def __init__(self, sock: socket.socket, symbols: List[str]):
+        self.sock = sock
+        self.symbols = symbols
+        # Latest unsent quote per symbol; a newer quote replaces an unsent one
+        self.pending: Dict[str, Any] = {}
+        self.buffer = bytearray()
+        self.blocked_since: Optional[float] = None
+        # Selector events currently registered for the socket
+        self.events = selectors.EVENT_READ
+
+
+class StreamHub:
+    """Fans quote updates out to Server-Sent Events subscribers.
+
+    Subscribed sockets are detached from the HTTP worker pool and served by
+    one selector thread, so an idle subscriber costs a socket and a small
+    buffer rather than a worker thread. ``publish`` drops quotes whose
+    ``fingerprint`` has not changed since the last one for that symbol.
+
+    Backpressure: each subscriber keeps at most one pending quote per
+    symbol, and it only gets more encoded bytes while fewer than
+    ``max_buffer`` are unsent. A slow consumer therefore receives the latest
+    quotes instead of a growing backlog. One that cannot drain anything for
+    ``slow_timeout`` seconds is disconnected.
+    """
+
+    def __init__(self, name: str, fingerprint: Callable[[Any], Any] = None,
+                 heartbeat: float = 15.0, max_buffer: int = 64 * 1024,
+                 slow_timeout: float = 60.0, max_subscribers: int = 10000):
+        self.name = name
+        self.fingerprint = fingerprint or (lambda quote: quote)
+        self.heartbeat = heartbeat
+        self.max_buffer = max_buffer
+        self.slow_timeout = slow_timeout
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers: Set[_Subscriber] = set()
+        self._by_symbol: Dict[str, Set[_Subscriber]] = {}
+        self._last: Dict[str, Any] = {}
+        self._dirty: Set[_Subscriber] = set()
+        self._joining: List[_Subscriber] = []
+        self._selector = None
+        self._wake_r = self._wake_w = None
+        self._woken = False
+        self._stop = threading.Event()
+        self._thread = None
+        self.published = 0
+        self.unchanged = 0
+        self.events_sent = 0
+        self.bytes_sent = 0
+        self.dropped_slow = 0
+        self.disconnected = 0
+
+    def subscribe(self, sock: socket.socket, symbols: List[str],
+                  initial: Dict[str, Any] = None) -> None:
+        """Hand a connection whose SSE headers are already sent to the hub"""
+        sub = _Subscriber(sock, list(symbols))
+        sub.pending.update(initial or {})
+        with self._lock:
+            if len(self._subscribers) + len(self._joining) >= self.max_subscribers:
+                raise ValueError(f"Stream is full ({self.max_subscribers} subscribers)")
+            self._joining.append(sub)
+        self.start()
+        self._wake()
+
+    def publish(self, symbol: str, quote: Any) -> bool:
+        """Queue a quote for the symbol's subscribers; False if unchanged"""
+        fingerprint = self.fingerprint(quote)
+        with self._lock:
+            if self._last.get(symbol) == fingerprint:
+                self.unchanged += 1
+                return False
+            self._last[symbol] = fingerprint
+            self.published += 1
+            subscribers = self._by_symbol.get(symbol)
+            if not subscribers:
+                return True
+            for sub in subscribers:
+                sub.pending[symbol] = quote
+            self._dirty.update(subscribers)
+        self._wake()
+        return True
+
+    def symbols(self) -> List[str]:
+        """Every symbol with at least one subscriber"""
+        with self._lock:
+            return list(self._by_symbol)
+
+    def _wake(self) -> None:
+        with self._lock:
+            if self._woken or self._wake_w is None:
+                return
+            self._woken = True
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    def _join(self) -> None:
+        with self._lock:
+            joining, self._joining = self._joining, []
+        for sub in joining:
+            sub.sock.setblocking(False)
+            with self._lock:
+                self._subscribers.add(sub)
+                for symbol in sub.symbols:
+                    self._by_symbol.setdefault(symbol, set()).add(sub)
+            sub.buffer += b"retry: 5000\n\n"
+            self._selector.register(sub.sock, sub.events, sub)
+            self._fill(sub)
+            self._flush(sub)
+
+    def _drop(self, sub: _Subscriber) -> None:
+        with self._lock:
+            if sub not in self._subscribers:
+                return
+            self._subscribers.discard(sub)
+            self._dirty.discard(sub)
+            for symbol in sub.symbols:
+                subscribers = self._by_symbol.get(symbol)
+                if subscribers is not None:
+                    subscribers.discard(sub)
+                    if not subscribers:
+                        del self._by_symbol[symbol]
+        try:
+            self._selector.unregister(sub.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            sub.sock.close()
+        except OSError:
+            pass
+        self.disconnected += 1
+
+    def _fill(self, sub: _Subscriber) -> None:
+        """Encode pending quotes into the send buffer if it has room"""
+        if len(sub.buffer) >= self.max_buffer:
+            return
+        with self._lock:
+            pending, sub.pending = sub.pending, {}
+        if pending:
+            sub.buffer += b"event: quotes\ndata: " + json.dumps(pending).encode() + b"\n\n"
+            self.events_sent += 1
+
+    def _flush(self, sub: _Subscriber) -> None:
+        progressed = False
+        while sub.buffer:
+            try:
+                sent = sub.sock.send(sub.buffer)
+            except BlockingIOError:
+                break
+            except OSError:
+                self._drop(sub)
+                return
+            del sub.buffer[:sent]
+            self.bytes_sent += sent
+            progressed = progressed or sent > 0
+            if not sub.buffer and sub.pending:
+                self._fill(sub)
+
+        # Time since the backlog last moved; a consumer is slow, not stuck,
+        # as long as some bytes keep going out
+        if not sub.buffer:
+            sub.blocked_since = None
+        elif progressed or sub.blocked_since is None:
+            sub.blocked_since = time.time()
+        # Only ask for writability while there is something left to send
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if sub.buffer else 0)
+        if events != sub.events:
+            sub.events = events
+            try:
+                self._selector.modify(sub.sock, events, sub)
+            except (KeyError, ValueError):
+                pass
+
+    def _run(self) -> None:
+        next_heartbeat = time.time() + self.heartbeat
+        while not self._stop.is_set():
+            events = self._selector.select(max(0.0, next_heartbeat - time.time()))
+            for key, mask in events:
+                if key.data is None:
+                    try:
+                        self._wake_r.recv(4096)
+                    except BlockingIOError:
+                        pass
+                    with self._lock:
+                        self._woken = False
+                    continue
+                sub = key.data
+                if mask & selectors.EVENT_READ:
+                    # SSE clients never send; readable means closed (or junk)
+                    try:
+                        if not sub.sock.recv(1024):
+                            self._drop(sub)
+                            continue
+                    except BlockingIOError:
+                        pass
+                    except OSError:
+                        self._drop(sub)
+                        continue
+                if mask & selectors.EVENT_WRITE:
+                    self._flush(sub)
+                    if sub.pending and len(sub.buffer) < self.max_buffer:
+                        self._fill(sub)
+                        self._flush(sub)
+
+            self._join()
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+            for sub in dirty:
+                self._fill(sub)
+                self._flush(sub)
+
+            now = time.time()
+            if now >= next_heartbeat:
+                next_heartbeat = now + self.heartbeat
+                with self._lock:
+                    subscribers = list(self._subscribers)
+                for sub in subscribers:
+                    if sub.blocked_since is not None:
+                        if now - sub.blocked_since > self.slow_timeout:
+                            self.dropped_slow += 1
+                            self._drop(sub)
+                        continue
+                    # Comment line keeps proxies from idling the connection out
+                    sub.buffer += b": ping\n\n"
+                    self._flush(sub)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._woken = False
+            self._selector = selectors.DefaultSelector()
+            self._wake_r, self._wake_w = socket.socketpair()
+            self._wake_r.setblocking(False)
+            self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+            self._thread = threading.Thread(
+                target=self._run, name=f"{self.name}-stream", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake()
+        self._thread.join(timeout)
+        with self._lock:
+            subscribers = list(self._subscribers) + self._joining
+            self._joining = []
+        for sub in subscribers:
+            self._drop(sub)
+            sub.sock.close()
+        self._selector.close()
+        self._wake_r.close()
+        self._wake_w.close()
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subscribers = list(self._subscribers)
+            symbols = len(self._by_symbol)
+        return {
+            "name": self.name,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "subscribers": len(subscribers),
+            "symbols": symbols,
+            "slow_subscribers": sum(1 for s in subscribers if s.blocked_since is not None),
+            "buffered_bytes": sum(len(s.buffer) for s in subscribers),
+            "published": self.published,
+            "unchanged": self.unchanged,
+            "events_sent": self.events_sent,
+            "bytes_sent": self.bytes_sent,
+            "dropped_slow": self.dropped_slow,
+            "disconnected": self.disconnected
+        }
@@ -0,0 +1,237 @@
+import csv
+import heapq
+import os
+import re
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Yahoo Finance suffix per exchange
+EXCHANGE_SUFFIXES = {"NSE": ".NS", "BSE": ".BO"}
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+# Fuzzy matches sharing fewer than this share of the query's trigrams are dropped
+MIN_FUZZY_SCORE = 0.5
+
+# Header aliases: our own format plus the NSE (EQUITY_L.csv) and BSE
+# listing downloads
+_COLUMN_ALIASES = {
+    "symbol": ("symbol", "security id", "scrip id"),
+    "name": ("name", "name of company", "security name", "issuer name"),
+    "sector": ("sector", "industry", "industry new name"),
+    "exchange": ("exchange",),
+}
+
+_NON_WORD = re.compile(r"[^A-Z0-9&]+")
+
+
+def _normalize(text: str) -> str:
+    return _NON_WORD.sub(" ", text.upper()).strip()
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SymbolIndex:
+    """In-memory symbol master for search and validation.
+
+    Listings are stored column-wise (one list per field, shared row ids).
+    Lookups use a dict by symbol; prefix search uses two sorted arrays, one
+    of symbols and one of the words in company names, so a prefix is a
+    ``bisect`` plus a short scan. Queries without enough prefix matches
+    fall back to trigram similarity over an inverted index, which only
+    touches rows sharing at least one trigram with the query.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, str, str, str]]):
+        self.symbols: List[str] = []
+        self.names: List[str] = []
+        self.sectors: List[str] = []
+        self.exchanges: List[str] = []
+        self._by_symbol: Dict[str, List[int]] = {}
+
+        for symbol, name, sector, exchange in rows:
+            symbol = symbol.strip().upper()
+            exchange = (exchange or "NSE").strip().upper()
+            if not symbol or exchange not in EXCHANGE_SUFFIXES:
+                continue
+            existing = self._by_symbol.setdefault(symbol, [])
+            if any(self.exchanges[row] == exchange for row in existing):
+                continue
+            existing.append(len(self.symbols))
+            self.symbols.append(symbol)
+            self.names.append((name or symbol).strip())
+            self.sectors.append(sys.intern((sector or "").strip() or "N/A"))
+            self.exchanges.append(sys.intern(exchange))
+
+        # One search entry per symbol (its first listing); the others
+        # differ only in exchange
+        primary = [rows[0] for rows in self._by_symbol.values()]
+        self._symbol_keys = sorted(
+            (_normalize(self.symbols[row]).replace(" ", ""), row) for row in primary)
+        self._symbol_sorted = [key for key, _ in self._symbol_keys]
+
+        words = []
+        grams: Dict[str, array] = {}
+        self._gram_counts = array("H", [0]) * len(self.symbols)
+        for row in primary:
+            name = _normalize(self.names[row])
+            words.extend((word, row) for word in set(name.split()))
+            row_grams = _trigrams(f"{self.symbols[row]} {name}")
+            self._gram_counts[row] = len(row_grams)
+            for gram in row_grams:
+                grams.setdefault(gram, array("I")).append(row)
+        words.sort()
+        self._word_sorted = [word for word, _ in words]
+        self._word_rows = array("I", (row for _, row in words))
+        self._grams = grams
+
+    @classmethod
+    def from_csv(cls, path: str, exchange: str = "NSE") -> "SymbolIndex":
+        """Load a listing CSV; ``exchange`` applies when it has no exchange column"""
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            header = [column.strip().lower() for column in next(reader, [])]
+            columns = {}
+            for field, aliases in _COLUMN_ALIASES.items():
+                columns[field] = next(
+                    (header.index(alias) for alias in aliases if alias in header), None)
+            if columns["symbol"] is None:
+                raise ValueError(f"{path}: no symbol column in header {header}")
+
+            def column(record, field, default=""):
+                index = columns[field]
+                return record[index] if index is not None and index < len(record) else default
+
+            return cls(
+                (column(record, "symbol"), column(record, "name"),
+                 column(record, "sector"), column(record, "exchange", exchange))
+                for record in reader if record)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def _entry(self, row: int, match: str) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbols[row],
+            "yahoo_symbol": self.symbols[row] + EXCHANGE_SUFFIXES[self.exchanges[row]],
+            "name": self.names[row],
+            "sector": self.sectors[row],
+            "exchange": self.exchanges[row],
+            "match": match
+        }
+
+    def resolve(self, symbol: str) -> Optional[str]:
+        """Yahoo symbol for a listed ticker (NSE preferred), or None.
+
+        ``TCS``, ``tcs`` and ``TCS.NS`` resolve to ``TCS.NS``; ``TCS.BO``
+        stays on BSE. Index tickers (``^NSEI``) are passed through.
+        """
+        symbol = symbol.strip().upper()
+        if symbol.startswith("^"):
+            return symbol
+        base, suffix = symbol, None
+        for candidate in EXCHANGE_SUFFIXES.values():
+            if symbol.endswith(candidate):
+                base, suffix = symbol[:-len(candidate)], candidate
+                break
+        rows = self._by_symbol.get(base)
+        if not rows:
+            return None
+        if suffix is not None:
+            return symbol
+        exchanges = [self.exchanges[row] for row in rows]
+        return base + EXCHANGE_SUFFIXES["NSE" if "NSE" in exchanges else exchanges[0]]
+
+    def yahoo_symbols(self) -> List[str]:
+        """One Yahoo symbol per listed ticker (NSE preferred), in listing order"""
+        return [self.resolve(symbol) for symbol in self._by_symbol]
+
+    def _prefixed(self, keys: List[str], prefix: str, limit: Optional[int] = None):
+        """Positions in a sorted key list that start with ``prefix`` (all
+        of them without a ``limit``)"""
+        start = bisect_left(keys, prefix)
+        if limit is None:
+            return range(start, bisect_left(keys, prefix + "\uffff", start))
+        end = start
+        while end < len(keys) and end - start < limit and keys[end].startswith(prefix):
+            end += 1
+        return range(start, end)
+
+    def search(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> List[Dict[str, Any]]:
+        """Typeahead matches: symbol prefix, then name-word prefix, then fuzzy"""
+        query = _normalize(query)
+        if not query or limit <= 0:
+            return []
+        results: List[Dict[str, Any]] = []
+        seen = set()
+
+        def add(row, match):
+            if row not in seen and len(results) < limit:
+                seen.add(row)
+                results.append(self._entry(row, match))
+
+        # An exact symbol sorts first among the keys it prefixes
+        compact = query.replace(" ", "")
+        for i in self._prefixed(self._symbol_sorted, compact, limit):
+            add(self._symbol_keys[i][1], "symbol")
+
+        if len(results) < limit:
+            # Every query word must prefix some word of the name. Candidates
+            # come from the word with the fewest prefix matches, the rest
+            # are checked per row; a common word ("INDIA", "TATA") can have
+            # far more rows than any window, so with other words to check
+            # the rarest word's rows are scanned in full
+            parts = query.split()
+            ranges = [self._prefixed(self._word_sorted, part) for part in parts]
+            rarest = min(range(len(parts)), key=lambda k: len(ranges[k]))
+            rest = parts[:rarest] + parts[rarest + 1:]
+            candidates = ranges[rarest]
+            if not rest:
+                candidates = candidates[:4 * limit + len(seen)]
+            for i in candidates:
+                row = self._word_rows[i]
+                if row in seen:
+                    continue
+                words = _normalize(self.names[row]).split()
+                if all(any(word.startswith(part) for word in words) for part in rest):
+                    add(row, "name")
+
+        if len(results) < limit and len(query) >= 3:
+            query_grams = _trigrams(query)
+            shared: Dict[int, int] = {}
+            for gram in query_grams:
+                for row in self._grams.get(gram, ()):
+                    shared[row] = shared.get(row, 0) + 1
+            # Share of the query's trigrams found in the row; among equals
+            # the shorter symbol + name is the closer match
+            scored = (
+                (count / len(query_grams), -self._gram_counts[row], row)
+                for row, count in shared.items() if row not in seen)
+            for score, _, row in heapq.nlargest(limit - len(results), scored):
+                if score < MIN_FUZZY_SCORE:
+                    break
+                add(row, "fuzzy")
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "listings": len(self.symbols),
+            "symbols": len(self._by_symbol),
+            "exchanges": {
+                exchange: self.exchanges.count(exchange) for exchange in EXCHANGE_SUFFIXES
+            }
+        }
+
+
+def load_symbol_index(path: str) -> Optional[SymbolIndex]:
+    """Index from a listing CSV; None (validation off) if the path is empty or missing"""
+    if not path:
+        return None
+    if not os.path.exists(path):
+        print(f"⚠️ Symbol master {path} not found; symbol validation disabled")
+        return None
+    return SymbolIndex.from_csv(path)
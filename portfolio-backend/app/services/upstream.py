@@ -0,0 +1,206 @@
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from app.services import metrics
+from app.services.rate_limit import TokenBucket
+
+UPSTREAM_CALLS = metrics.counter(
+    "upstream_calls_total", "Calls made to an upstream, by outcome", ("upstream", "outcome"))
+UPSTREAM_DURATION = metrics.histogram(
+    "upstream_call_duration_seconds", "Duration of calls made to an upstream", ("upstream",))
+
+
+def observe_call(upstream: str, started: float, outcome: str) -> None:
+    """Record one upstream call that began at perf_counter() ``started``"""
+    UPSTREAM_DURATION.observe(time.perf_counter() - started, upstream)
+    UPSTREAM_CALLS.inc(upstream, outcome)
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling upstream while the circuit is open or the rate limit is spent"""
+
+
+class UpstreamRejected(ValueError):
+    """The upstream answered but refused this request (unknown symbol, 4xx).
+
+    The service itself is healthy, so the gateway passes these through
+    without counting them against the circuit breaker.
+    """
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` consecutive failures.
+
+    While open every call is refused without touching upstream. Once the
+    backoff has passed a single probe is let through (half-open): success
+    closes the circuit, failure re-opens it with the backoff doubled, up to
+    ``max_backoff`` seconds.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, backoff: float = 5.0,
+                 max_backoff: float = 300.0):
+        self.failure_threshold = failure_threshold
+        self.base_backoff = backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.backoff = backoff
+        self.retry_at = 0.0
+        self._probing = False
+        self.trips = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() >= self.retry_at:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            return max(0.0, self.retry_at - time.monotonic())
+
+    def release(self) -> None:
+        """Give back a probe slot that was granted but never used"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.backoff = self.base_backoff
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                # The probe failed: stay open for twice as long
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+            elif self.state == self.OPEN or self.failures < self.failure_threshold:
+                return
+            else:
+                self.trips += 1
+            self.state = self.OPEN
+            self.retry_at = time.monotonic() + self.backoff
+            self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "trips": self.trips,
+                "backoff": self.backoff,
+                "retry_in": round(max(0.0, self.retry_at - time.monotonic()), 1)
+                if self.state != self.CLOSED else 0.0
+            }
+
+
+class UpstreamGateway:
+    """Every call to one upstream goes through here.
+
+    Calls draw from a shared token bucket (waiting at most ``max_wait``
+    seconds for a token) and pass through a CircuitBreaker. When either
+    refuses, ``UpstreamUnavailable`` is raised at once, so callers can fall
+    back to cached data instead of queueing behind a failing service. Only
+    exceptions raised by the call itself count as failures, and not
+    UpstreamRejected (a bad request, not an outage); an empty but
+    successful answer does not count either.
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, max_wait: float = 2.0,
+                 breaker: CircuitBreaker = None):
+        self.name = name
+        self.bucket = TokenBucket(rate=rate, capacity=burst)
+        self.max_wait = max_wait
+        self.breaker = breaker or CircuitBreaker()
+        self.calls = 0
+        self.failures = 0
+        self.rejected_open = 0
+        self.rejected_rate = 0
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        if not self.breaker.allow():
+            self.rejected_open += 1
+            raise UpstreamUnavailable(
+                f"{self.name} circuit open, retrying in {self.breaker.retry_in():.0f}s")
+
+        deadline = time.monotonic() + self.max_wait
+        while not self.bucket.try_acquire():
+            wait = self.bucket.wait_time()
+            if time.monotonic() + wait > deadline:
+                self.rejected_rate += 1
+                # Not an upstream failure; let another caller take the probe
+                self.breaker.release()
+                raise UpstreamUnavailable(f"{self.name} rate limit reached")
+            time.sleep(wait)
+
+        self.calls += 1
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except UpstreamRejected:
+            # Says nothing about the service; free the probe if this was one
+            self.breaker.release()
+            observe_call(self.name, started, "rejected")
+            raise
+        except Exception:
+            self.failures += 1
+            self.breaker.record_failure()
+            observe_call(self.name, started, "error")
+            raise
+        self.breaker.record_success()
+        observe_call(self.name, started, "success")
+        return result
+
+    def wrap(self, func: Callable) -> Callable:
+        """``func`` with every call routed through the gateway"""
+        @functools.wraps(func)
+        def wrapped(*args, **kwargs):
+            return self.call(func, *args, **kwargs)
+        return wrapped
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "failures": self.failures,
+            "rejected_open": self.rejected_open,
+            "rejected_rate": self.rejected_rate,
+            "tokens": round(self.bucket.available(), 2),
+            "circuit": self.breaker.stats()
+        }
+
+    def metrics(self):
+        """Scrape-time families for metrics.add_collector"""
+        labels = {"upstream": self.name}
+        circuit = self.breaker.stats()
+        return [
+            ("upstream_rejected_total", "counter",
+             "Upstream calls refused without being made, by reason",
+             [(dict(labels, reason="circuit_open"), self.rejected_open),
+              (dict(labels, reason="rate_limit"), self.rejected_rate)]),
+            ("upstream_circuit_open", "gauge",
+             "1 while the upstream circuit breaker refuses calls",
+             [(labels, 0 if circuit["state"] == CircuitBreaker.CLOSED else 1)]),
+            ("upstream_circuit_trips_total", "counter",
+             "Times the upstream circuit breaker opened", [(labels, circuit["trips"])]),
+            ("upstream_rate_tokens", "gauge",
+             "Upstream calls available in the rate limit bucket",
+             [(labels, self.bucket.available())])
+        ]
@@ -0,0 +1,78 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+# Keys whose version is remembered; the least recently stamped go first
+MAX_VERSION_KEYS = 10000
+
+
+class VersionLog:
+    """Change versions for cached values, for delta responses and ETags.
+
+    ``record`` stamps a key with the next global version only when the
+    value's fingerprint differs from the last one recorded, so refreshes
+    that return the same quote do not count as changes. Versions start at
+    the current time in milliseconds, which keeps them increasing across
+    restarts: a ``since`` from a previous process is always older than
+    anything stamped by this one.
+
+    ``get`` never creates entries, so looking up arbitrary keys costs
+    nothing. Keys never recorded (e.g. restored from the persistent cache)
+    report ``floor``: the starting version, raised to the newest version
+    dropped when more than ``max_keys`` keys are tracked. An evicted key
+    therefore still counts as changed for any ``since`` older than its
+    last change.
+    """
+
+    def __init__(self, name: str, max_keys: int = MAX_VERSION_KEYS):
+        self.name = name
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self.version = int(time.time() * 1000)
+        self.floor = self.version
+        self._versions: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._fingerprints: Dict[Hashable, Any] = {}
+
+    def record(self, key: Hashable, fingerprint: Any) -> int:
+        with self._lock:
+            if key in self._versions and self._fingerprints.get(key) == fingerprint:
+                return self._versions[key]
+            self.version += 1
+            self._versions[key] = self.version
+            self._versions.move_to_end(key)
+            self._fingerprints[key] = fingerprint
+            while len(self._versions) > self.max_keys:
+                evicted, version = self._versions.popitem(last=False)
+                self._fingerprints.pop(evicted, None)
+                self.floor = max(self.floor, version)
+            return self.version
+
+    def get(self, key: Hashable) -> int:
+        with self._lock:
+            return self._versions.get(key, self.floor)
+
+    def current(self) -> int:
+        with self._lock:
+            return self.version
+
+    def etag(self, keys: Iterable[Hashable], extra: str = "") -> str:
+        """Weak ETag that changes whenever any of the keys changes"""
+        parts = [f"{key}:{self.get(key)}" for key in keys]
+        digest = hashlib.sha1("|".join(parts + [extra]).encode()).hexdigest()[:20]
+        return f'W/"{digest}"'
+
+
+def _opaque(tag: str) -> str:
+    # Weak comparison: W/"x" and "x" name the same representation
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header value covers the ETag"""
+    if not if_none_match:
+        return False
+    tags = [_opaque(tag) for tag in if_none_match.split(",")]
+    return "*" in tags or _opaque(etag) in tags
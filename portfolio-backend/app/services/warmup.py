@@ -0,0 +1,73 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class WarmUp:
+    """Background loading of what data requests need, behind a readiness flag.
+
+    The server binds and answers health checks before the heavy data
+    libraries are loaded; ``start()`` then runs ``steps`` (name, callable)
+    on a daemon thread. A data request that arrives first loads what it
+    needs itself: Python's import lock makes it wait for an import the
+    warm-up already began instead of loading twice. ``ready`` is true once
+    every step has succeeded; a failed step leaves the process not ready.
+    """
+
+    STARTING = "starting"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, steps: List[Tuple[str, Callable[[], Any]]]):
+        self.steps = steps
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.timings: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self.created_at = time.monotonic()
+        self.ready_after: Optional[float] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="warm-up", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        for name, step in self.steps:
+            started = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                self.error = f"{name}: {e}"
+                print(f"❌ Warm-up step {name} failed: {e}")
+            self.timings[name] = round(time.perf_counter() - started, 3)
+        self.ready_after = round(time.monotonic() - self.created_at, 3)
+        self._done.set()
+        if self.error is None:
+            print(f"✅ Ready ({self.ready_after}s after start)")
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set() and self.error is None
+
+    @property
+    def status(self) -> str:
+        if not self._done.is_set():
+            return self.STARTING
+        return self.READY if self.error is None else self.FAILED
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the warm-up has finished; returns ``ready``"""
+        self._done.wait(timeout)
+        return self.ready
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "ready_after": self.ready_after,
+            "steps": dict(self.timings),
+            "error": self.error
+        }
@@ -0,0 +1,132 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.services.upstream import UpstreamRejected
+
+CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+
+
+class ChartClient:
+    """Quotes from Yahoo's chart endpoint over pooled keep-alive connections.
+
+    One ``requests.Session`` is shared by every call, so after the first
+    request to the host each quote reuses an open TLS connection instead of
+    paying for a new handshake. The pool holds ``max_concurrency``
+    connections, which is also the number of symbols ``quotes`` fetches at
+    once. Connection errors and 429/5xx answers are retried twice with a
+    short backoff. ``timeout`` is (connect, read) seconds.
+
+    Answers that reject the symbol (4xx other than 429, no usable chart
+    data) raise UpstreamRejected; transport errors, timeouts, 429 and 5xx
+    raise a plain ValueError, which the circuit breaker counts.
+    """
+
+    def __init__(self, max_concurrency: int = 8,
+                 timeout: Tuple[float, float] = (3.05, 10.0)):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate"
+        })
+        retry = Retry(total=2, backoff_factor=0.3,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(["GET"]),
+                      respect_retry_after_header=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency,
+                              pool_block=True, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix="yahoo-chart")
+            return self._executor
+
+    def quote(self, symbol: str) -> Dict[str, Any]:
+        """Latest price for one symbol; raises ValueError on any failure"""
+        try:
+            response = self.session.get(CHART_URL.format(symbol=symbol), timeout=self.timeout)
+        except requests.RequestException as e:
+            raise ValueError(f"Request failed: {e}")
+        if response.status_code != 200:
+            message = f"API returned status code: {response.status_code}"
+            if 400 <= response.status_code < 500 and response.status_code != 429:
+                raise UpstreamRejected(message)
+            raise ValueError(message)
+
+        try:
+            meta = json.loads(response.content)["chart"]["result"][0]["meta"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            raise UpstreamRejected("No chart data in API response")
+        return parse_meta(symbol, meta)
+
+    def quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Quotes for many symbols, at most ``max_concurrency`` in flight.
+
+        Failed symbols map to {"error": message} so one bad ticker does not
+        fail the batch. If every symbol failed for upstream reasons (not
+        UpstreamRejected) the service is down and ValueError is raised, so
+        the gateway's circuit breaker sees the outage.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        if len(symbols) == 1:
+            futures = None
+        else:
+            executor = self._get_executor()
+            futures = {symbol: executor.submit(self.quote, symbol) for symbol in symbols}
+
+        results = {}
+        upstream_errors = []
+        for symbol in symbols:
+            try:
+                results[symbol] = futures[symbol].result() if futures else self.quote(symbol)
+            except UpstreamRejected as e:
+                results[symbol] = {"error": str(e)}
+            except ValueError as e:
+                results[symbol] = {"error": str(e)}
+                upstream_errors.append(e)
+        if symbols and len(upstream_errors) == len(symbols):
+            raise ValueError(f"All {len(symbols)} quotes failed: {upstream_errors[0]}")
+        return results
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+def parse_meta(symbol: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Quote dict from a chart response's ``meta`` block"""
+    current_price = meta.get("regularMarketPrice") or 0
+    previous_close = meta.get("previousClose") or meta.get("chartPreviousClose") or 0
+    if current_price == 0 or previous_close == 0:
+        raise ValueError("Invalid price data from API")
+
+    change = current_price - previous_close
+    return {
+        "symbol": symbol,
+        "name": meta.get("longName", symbol),
+        "current_price": round(current_price, 2),
+        "change": round(change, 2),
+        "change_percent": round(change / previous_close * 100, 2),
+        "previous_close": round(previous_close, 2),
+        "volume": meta.get("regularMarketVolume", 0),
+        "sector": meta.get("sector", "N/A"),
+        "last_updated": datetime.now().isoformat()
+    }
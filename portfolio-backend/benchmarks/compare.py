@@ -0,0 +1,90 @@
+"""Compare a benchmark run against a stored baseline.
+
+    python -m benchmarks.compare benchmarks/baselines/load.json /tmp/load.json
+
+Load runs are matched on (backend, scenario, concurrency), micro
+benchmarks on name and startup runs on target. A result regresses when it
+is worse than the baseline by more than ``--tolerance`` (a fraction): lower
+throughput, higher p95 latency, ns per call or startup seconds, or more
+upstream calls per request. Exits 1 if
+anything regressed, so it can gate CI on a machine with a stable baseline.
+"""
+import argparse
+import sys
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.common import load_results, print_table
+
+# metric -> (getter, True when higher is better)
+LOAD_METRICS = {
+    "throughput_rps": (lambda r: r["throughput_rps"], True),
+    "p95_ms": (lambda r: r["latency_ms"]["p95"], False),
+    "upstream_per_request": (lambda r: r["upstream_calls_per_request"], False)
+}
+MICRO_METRICS = {
+    "best_ns": (lambda r: r["best_ns"], False)
+}
+STARTUP_METRICS = {
+    "import_median_s": (lambda r: r["import_median_s"], False),
+    "health_s": (lambda r: r["health_s"], False),
+    "ready_s": (lambda r: r["ready_s"], False)
+}
+METRICS = {"load": LOAD_METRICS, "micro": MICRO_METRICS, "startup": STARTUP_METRICS}
+
+
+def result_key(kind: str, result: Dict[str, Any]) -> Tuple:
+    if kind == "load":
+        return result["backend"], result["scenario"], result["concurrency"]
+    if kind == "startup":
+        return (result["target"],)
+    return (result["name"],)
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any],
+            tolerance: float) -> Tuple[List[List[Any]], int]:
+    if baseline["kind"] != current["kind"]:
+        raise ValueError(f"cannot compare {baseline['kind']} results with {current['kind']}")
+    kind = baseline["kind"]
+    metrics = METRICS[kind]
+    previous = {result_key(kind, r): r for r in baseline["results"]}
+
+    rows, regressions = [], 0
+    for result in current["results"]:
+        key = result_key(kind, result)
+        if key not in previous:
+            continue
+        for metric, (get, higher_is_better) in metrics.items():
+            old, new = get(previous[key]), get(result)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            # Upstream counts are exact for a given plan: any increase counts
+            regressed = worse > (0 if metric == "upstream_per_request" else tolerance)
+            regressions += regressed
+            rows.append(["/".join(map(str, key)), metric, old, new,
+                         f"{change:+.1%}", "REGRESSED" if regressed else ""])
+    return rows, regressions
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="allowed relative slowdown before failing")
+    args = parser.parse_args(argv)
+
+    baseline, current = load_results(args.baseline), load_results(args.current)
+    if baseline["environment"].get("cpus") != current["environment"].get("cpus"):
+        print("⚠️ Baseline was recorded on a machine with a different CPU count")
+    rows, regressions = compare(baseline, current, args.tolerance)
+    print_table(rows, ["benchmark", "metric", "baseline", "current", "change", ""])
+    if regressions:
+        print(f"\n❌ {regressions} regression(s) beyond {args.tolerance:.0%}")
+        sys.exit(1)
+    print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import csv
+import json
+import os
+from typing import List
+
+import numpy as np
+
+from app.services.market_data import OHLCV_COLUMNS, REPLAY_FUNDAMENTALS_FILE, REPLAY_HISTORY_DIR
+
+# Synthetic tickers: BENCH00001.NS, ... so they never collide with real listings
+SYMBOL_PREFIX = "BENCH"
+LISTING_FILE = "symbols.csv"
+HISTORY_DAYS = 30
+SECTORS = ["Technology", "Banking", "Energy", "FMCG", "Healthcare", "Automobile"]
+
+
+def bench_symbols(count: int) -> List[str]:
+    """Yahoo symbols of the synthetic universe, in a stable order"""
+    return [f"{SYMBOL_PREFIX}{i:05d}.NS" for i in range(count)]
+
+
+def write_dataset(root: str, count: int, seed: int = 0) -> str:
+    """Replay data (see market_data.ReplayProvider) for ``count`` symbols.
+
+    Each symbol gets ``HISTORY_DAYS`` business days of random-walk OHLCV
+    and a fundamentals record; a listing CSV for SYMBOL_MASTER_PATH is
+    written next to them. Returns the listing path.
+    """
+    rng = np.random.default_rng(seed)
+    history_dir = os.path.join(root, REPLAY_HISTORY_DIR)
+    os.makedirs(history_dir, exist_ok=True)
+    dates = np.arange(np.datetime64("2025-01-01"), np.datetime64("2025-03-01"),
+                      dtype="datetime64[D]")
+    dates = dates[np.is_busday(dates)][-HISTORY_DAYS:]
+
+    fundamentals = {}
+    listing = [("symbol", "name", "sector", "exchange")]
+    for symbol in bench_symbols(count):
+        closes = rng.uniform(100, 3000) * np.exp(np.cumsum(rng.normal(0, 0.015, len(dates))))
+        opens = closes * (1 + rng.normal(0, 0.005, len(dates)))
+        highs = np.maximum(opens, closes) * 1.01
+        lows = np.minimum(opens, closes) * 0.99
+        volumes = rng.integers(10_000, 5_000_000, len(dates))
+        with open(os.path.join(history_dir, f"{symbol}.csv"), "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Date"] + OHLCV_COLUMNS)
+            for row in zip(dates, opens, highs, lows, closes, volumes):
+                writer.writerow([str(row[0])] + [f"{x:.2f}" for x in row[1:5]] + [int(row[5])])
+
+        ticker = symbol[:-len(".NS")]
+        sector = SECTORS[len(fundamentals) % len(SECTORS)]
+        shares = int(rng.integers(10_000_000, 5_000_000_000))
+        eps = round(float(closes[-1]) / rng.uniform(10, 60), 2)
+        fundamentals[symbol] = {
+            "longName": f"{ticker} Benchmark Ltd",
+            "currentPrice": round(float(closes[-1]), 2),
+            "trailingEps": eps,
+            "sector": sector,
+            "sharesOutstanding": shares,
+            "marketCap": round(float(closes[-1]) * shares),
+            "freeCashflow": round(eps * shares * rng.uniform(0.2, 1.4)),
+            "totalRevenue": round(eps * shares * rng.uniform(5, 20)),
+            "operatingCashflow": round(eps * shares * rng.uniform(1, 2)),
+            "capitalExpenditures": -round(eps * shares * rng.uniform(0.1, 0.8))
+        }
+        listing.append((ticker, f"{ticker} Benchmark Ltd", sector, "NSE"))
+
+    with open(os.path.join(root, REPLAY_FUNDAMENTALS_FILE), "w") as f:
+        json.dump(fundamentals, f)
+    listing_path = os.path.join(root, LISTING_FILE)
+    with open(listing_path, "w", newline="") as f:
+        csv.writer(f).writerows(listing)
+    return listing_path
@@ -0,0 +1,307 @@
+"""Load test for real_backend.py and the FastAPI app against replayed market data.
+
+    python -m benchmarks.load --backend real --concurrency 1,8,32 --hit-ratio 0.9
+
+Each backend runs as a subprocess with MARKET_DATA_PROVIDER=replay over a
+synthetic dataset, so no request leaves the machine and the injected
+upstream latency is the same on every run. Requests are planned up front
+from a seeded RNG: with probability ``hit_ratio`` a symbol is drawn from a
+warm set that was requested before measuring (Zipf-skewed with ``skew``,
+uniform at 0), otherwise it is a symbol never requested before, so every
+miss really goes upstream. Upstream calls are read from the server's stats
+before and after each run.
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.common import (
+    BASELINE_DIR, PROJECT_DIR, latency_summary, print_table, write_results)
+from benchmarks.dataset import bench_symbols, write_dataset
+
+STARTUP_TIMEOUT = 60
+
+# Endpoints per backend; the FastAPI app has no fundamentals endpoint
+BACKENDS = {
+    "real": {
+        "command": [sys.executable, "real_backend.py"],
+        "stats": "/stats",
+        "scenarios": ("price", "batch", "fundamentals")
+    },
+    "fastapi": {
+        "command": [sys.executable, "-m", "uvicorn", "app.app:app", "--host", "127.0.0.1",
+                    "--log-level", "warning", "--no-access-log"],
+        "stats": "/stocks/stats",
+        "scenarios": ("price", "batch")
+    }
+}
+
+
+def scenario_path(scenario: str, symbols: List[str]) -> str:
+    if scenario == "price":
+        return f"/stocks/price/{symbols[0]}"
+    if scenario == "fundamentals":
+        return f"/stocks/fundamentals/{symbols[0]}"
+    return "/stocks/batch/prices?symbols=" + ",".join(symbols)
+
+
+class Plan:
+    """Seeded request plan: warm set, then one path list per run"""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = np.random.default_rng(args.seed)
+        self.warm = bench_symbols(args.warm_symbols)
+        weights = 1.0 / np.arange(1, len(self.warm) + 1) ** args.skew
+        self.weights = weights / weights.sum()
+        self.next_cold = len(self.warm)
+        self.runs = []
+        for scenario in args.scenarios:
+            per_request = args.batch_size if scenario == "batch" else 1
+            for concurrency in args.concurrency:
+                paths = [scenario_path(scenario, self.draw(per_request))
+                         for _ in range(args.requests)]
+                self.runs.append((scenario, concurrency, paths))
+
+    def draw(self, count: int) -> List[str]:
+        symbols = []
+        for hit in self.rng.random(count) < self.args.hit_ratio:
+            if hit:
+                symbols.append(self.warm[self.rng.choice(len(self.warm), p=self.weights)])
+            else:
+                symbols.append(f"BENCH{self.next_cold:05d}.NS")
+                self.next_cold += 1
+        return symbols
+
+    @property
+    def universe(self) -> int:
+        return self.next_cold
+
+
+class Client:
+    """One connection per worker thread, reopened whenever the server closes it"""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.connection = None
+
+    def get(self, path: str):
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+        try:
+            self.connection.request("GET", path, headers={"Accept-Encoding": "gzip"})
+            response = self.connection.getresponse()
+            body = response.read()
+        except (http.client.HTTPException, OSError):
+            self.close()
+            raise
+        if response.will_close:
+            self.close()
+        return response.status, body
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def get_json(port: int, path: str) -> Dict[str, Any]:
+    client = Client(port)
+    try:
+        _, body = client.get(path)
+        return json.loads(body)
+    finally:
+        client.close()
+
+
+def upstream_calls(port: int, stats_path: str) -> int:
+    return get_json(port, stats_path)["data"]["market_data"]["calls"]
+
+
+def drive(port: int, paths: List[str], concurrency: int) -> Dict[str, Any]:
+    """Send ``paths`` from ``concurrency`` threads; latencies in seconds"""
+    latencies = [0.0] * len(paths)
+    errors = [0] * concurrency
+    cursor = iter(range(len(paths)))
+    cursor_lock = threading.Lock()
+
+    def worker(slot):
+        client = Client(port)
+        while True:
+            with cursor_lock:
+                i = next(cursor, None)
+            if i is None:
+                break
+            started = time.perf_counter()
+            try:
+                status, _ = client.get(paths[i])
+                if status != 200:
+                    errors[slot] += 1
+            except (http.client.HTTPException, OSError):
+                errors[slot] += 1
+            latencies[i] = time.perf_counter() - started
+        client.close()
+
+    threads = [threading.Thread(target=worker, args=(slot,)) for slot in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {"elapsed": elapsed, "latencies": latencies, "errors": sum(errors)}
+
+
+def start_backend(name: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    command = list(BACKENDS[name]["command"])
+    if name == "fastapi":
+        command += ["--port", str(port)]
+    process = subprocess.Popen(command, cwd=PROJECT_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} backend exited with code {process.returncode}")
+        try:
+            get_json(port, BACKENDS[name]["stats"])
+            return process
+        except (OSError, ValueError, http.client.HTTPException):
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{name} backend did not start within {STARTUP_TIMEOUT}s")
+
+
+def backend_env(args, root: str, listing: str, port: int) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "MARKET_DATA_PROVIDER": "replay",
+        "REPLAY_DATA_DIR": root,
+        "REPLAY_LATENCY_MS": str(args.latency_ms),
+        "REPLAY_JITTER_MS": str(args.jitter_ms),
+        "REPLAY_FAILURE_RATE": "0",
+        "SYMBOL_MASTER_PATH": listing,
+        "HISTORY_DIR": os.path.join(root, "history") if args.history_store else "",
+        "CACHE_DB_PATH": "",
+        "REFRESH_ENABLED": "false",
+        # The load is synthetic: keep the upstream rate limit out of the way
+        "UPSTREAM_CALLS_PER_SECOND": "100000",
+        "UPSTREAM_BURST": "100000",
+        "CACHE_MAX_ENTRIES": str(max(2000, 2 * args.universe)),
+        "PYTHONUNBUFFERED": "1"
+    })
+    return env
+
+
+def run_backend(name: str, args, plan: Plan, root: str, listing: str) -> List[Dict[str, Any]]:
+    port = args.port
+    stats_path = BACKENDS[name]["stats"]
+    process = start_backend(name, port, backend_env(args, root, listing, port))
+    results = []
+    try:
+        for scenario, concurrency, paths in plan.runs:
+            if scenario not in BACKENDS[name]["scenarios"]:
+                continue
+            # Warm every hot symbol on this endpoint before measuring
+            warm_up = [scenario_path(scenario, [symbol]) for symbol in plan.warm]
+            drive(port, warm_up, min(8, len(warm_up)))
+
+            before = upstream_calls(port, stats_path)
+            run = drive(port, paths, concurrency)
+            calls = upstream_calls(port, stats_path) - before
+            result = {
+                "backend": name,
+                "scenario": scenario,
+                "concurrency": concurrency,
+                "requests": len(paths),
+                "errors": run["errors"],
+                "elapsed_s": round(run["elapsed"], 3),
+                "throughput_rps": round(len(paths) / run["elapsed"], 1),
+                "latency_ms": latency_summary(run["latencies"]),
+                "upstream_calls": calls,
+                "upstream_calls_per_request": round(calls / len(paths), 4)
+            }
+            results.append(result)
+            print(f"   {name:8} {scenario:12} c={concurrency:<4} "
+                  f"{result['throughput_rps']:>8} req/s  "
+                  f"p50 {result['latency_ms']['p50']} ms  p99 {result['latency_ms']['p99']} ms  "
+                  f"upstream {calls}")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--backend", choices=["real", "fastapi", "both"], default="both")
+    parser.add_argument("--scenarios", default="price,batch,fundamentals",
+                        help="comma-separated: price, batch, fundamentals")
+    parser.add_argument("--concurrency", default="1,8,32",
+                        help="comma-separated client concurrency levels")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per run")
+    parser.add_argument("--hit-ratio", type=float, default=0.9,
+                        help="share of symbols drawn from the warm set")
+    parser.add_argument("--warm-symbols", type=int, default=50, help="size of the warm set")
+    parser.add_argument("--skew", type=float, default=1.0,
+                        help="Zipf exponent over the warm set (0 = uniform)")
+    parser.add_argument("--batch-size", type=int, default=20, help="symbols per batch request")
+    parser.add_argument("--latency-ms", type=float, default=20,
+                        help="replayed upstream latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=5)
+    parser.add_argument("--history-store", action="store_true",
+                        help="serve prices through the on-disk history store")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", default=os.path.join(BASELINE_DIR, "load.json"))
+    args = parser.parse_args(argv)
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - {"price", "batch", "fundamentals"}
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    if not 0 <= args.hit_ratio <= 1:
+        parser.error("--hit-ratio must be between 0 and 1")
+    return args
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    plan = Plan(args)
+    args.universe = plan.universe
+    backends = ["real", "fastapi"] if args.backend == "both" else [args.backend]
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench-replay-") as root:
+        print(f"📦 Writing replay data for {plan.universe} symbols")
+        listing = write_dataset(root, plan.universe, seed=args.seed)
+        for name in backends:
+            print(f"🚀 {name}")
+            # A fresh server per backend: cold symbols are cold again
+            results.extend(run_backend(name, args, plan, root, listing))
+
+    print()
+    print_table(
+        [[r["backend"], r["scenario"], r["concurrency"], r["throughput_rps"],
+          r["latency_ms"]["p50"], r["latency_ms"]["p95"], r["latency_ms"]["p99"],
+          r["upstream_calls"], r["errors"]] for r in results],
+        ["backend", "scenario", "conc", "req/s", "p50 ms", "p95 ms", "p99 ms",
+         "upstream", "errors"])
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "port")}
+    write_results(args.output, "load", config, results)
+
+
+if __name__ == "__main__":
+    main()
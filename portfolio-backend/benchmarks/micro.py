@@ -0,0 +1,158 @@
+"""Micro-benchmarks for the request hot paths.
+
+    python -m benchmarks.micro [--filter cache] [--output FILE]
+
+Covers the cache lookup, the JSON encoding path (stdlib json vs
+payload.dumps, full gzip vs EncodedBody), per-request metrics recording
+and the fundamentals/FCF estimation in real_backend, the last against a zero-latency replay of a
+synthetic dataset. Each benchmark reports nanoseconds per call as the
+best and median of several repeats.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.common import BASELINE_DIR, PROJECT_DIR, print_table, write_results
+from benchmarks.dataset import bench_symbols, write_dataset
+
+REPEATS = 7
+TARGET_SECONDS = 0.05
+
+
+def measure(func: Callable[[], object], repeats: int = REPEATS) -> Dict[str, float]:
+    """ns per call: loops sized so one repeat takes about TARGET_SECONDS"""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= TARGET_SECONDS / 10 or loops >= 1 << 20:
+            break
+        loops *= 2
+    loops = max(1, int(loops * TARGET_SECONDS / max(elapsed, 1e-9)))
+
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        timings.append((time.perf_counter() - started) / loops * 1e9)
+    timings.sort()
+    return {"loops": loops, "best_ns": round(timings[0], 1),
+            "median_ns": round(timings[len(timings) // 2], 1)}
+
+
+def configure_replay(root: str, symbols: int) -> List[str]:
+    """Point real_backend's settings at a zero-latency synthetic replay"""
+    listing = write_dataset(root, symbols)
+    os.environ.update({
+        "MARKET_DATA_PROVIDER": "replay",
+        "REPLAY_DATA_DIR": root,
+        "REPLAY_LATENCY_MS": "0",
+        "REPLAY_JITTER_MS": "0",
+        "REPLAY_FAILURE_RATE": "0",
+        "SYMBOL_MASTER_PATH": listing,
+        "HISTORY_DIR": "",
+        "CACHE_DB_PATH": "",
+        "REFRESH_ENABLED": "false",
+        "UPSTREAM_CALLS_PER_SECOND": "1000000000",
+        "UPSTREAM_BURST": "1000000000"
+    })
+    return bench_symbols(symbols)
+
+
+def benchmarks(symbols: List[str]) -> Dict[str, Callable[[], object]]:
+    # Imported after configure_replay: settings are read at import time
+    import real_backend
+    from app.services import metrics
+    from app.services.cache import TTLCache
+    from app.services.payload import dumps
+
+    service = real_backend.StockDataService()
+    symbol = symbols[0]
+    price = service.get_real_stock_price(symbol)
+    fundamentals = service.get_accurate_fundamentals_with_estimated_fcf(symbol)
+
+    cache = TTLCache("bench", ttl=3600, maxsize=len(symbols),
+                     serialize=real_backend.cached_body)
+    for s in symbols:
+        cache.set(f"price_{s}", dict(price, symbol=s))
+    key = f"price_{symbol}"
+
+    def load_price():
+        raise AssertionError("benchmark cache should never miss")
+
+    def encoded_hit(gzipped):
+        def run():
+            body, age, _ = cache.fetch_encoded(key, load_price)
+            return body.body(b',"cached":true,"cache_age":%d}' % int(age), gzipped)
+        return run
+
+    full_response = {"success": True, "data": fundamentals, "cached": True, "cache_age": 12}
+    full_body = json.dumps(full_response).encode()
+    fundamentals_body = real_backend.cached_body(fundamentals)
+    fundamentals_body.body(b"}", True)
+    eps, sector = fundamentals["eps"], fundamentals["sector"]
+
+    return {
+        "cache.get_hit": lambda: cache.get(key),
+        "cache.fetch_hit": lambda: cache.fetch(key, load_price),
+        "cache.fetch_encoded_hit": encoded_hit(False),
+        "cache.fetch_encoded_hit_gzip": encoded_hit(True),
+        "json.stdlib_price": lambda: json.dumps(price).encode(),
+        "json.payload_price": lambda: dumps(price),
+        "json.stdlib_fundamentals": lambda: json.dumps(full_response).encode(),
+        "json.payload_fundamentals": lambda: dumps(full_response),
+        "gzip.full_fundamentals": lambda: gzip.compress(full_body, 6),
+        "gzip.encoded_body_fundamentals":
+            lambda: fundamentals_body.body(b',"cached":true,"cache_age":12}', True),
+        "fcf.estimate_from_eps": lambda: service.get_estimated_fcf_from_eps(eps, sector),
+        "fcf.fundamentals_with_estimated_fcf":
+            lambda: service.get_accurate_fundamentals_with_estimated_fcf(symbol),
+        "replay.price_fetch": lambda: service.get_real_stock_price(symbol),
+        "metrics.route_label": lambda: metrics.route_label(
+            f"/stocks/fundamentals/{symbol}", real_backend.METRIC_ROUTES),
+        "metrics.observe_request": lambda: metrics.observe_request(
+            "GET", "/stocks/price/{symbol}", 200, 0.001)
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--filter", default="", help="only run benchmarks containing this")
+    parser.add_argument("--symbols", type=int, default=1000, help="cache and dataset size")
+    parser.add_argument("--output", default=os.path.join(BASELINE_DIR, "micro.json"))
+    args = parser.parse_args(argv)
+
+    # real_backend resolves its paths relative to the project directory
+    os.chdir(PROJECT_DIR)
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench-micro-") as root:
+        symbols = configure_replay(root, args.symbols)
+        for name, func in benchmarks(symbols).items():
+            if args.filter not in name:
+                continue
+            result = {"name": name, **measure(func)}
+            results.append(result)
+            print(f"   {name:40} {result['best_ns']:>12.1f} ns")
+
+    print()
+    print_table([[r["name"], r["best_ns"], r["median_ns"], r["loops"]] for r in results],
+                ["benchmark", "best ns", "median ns", "loops"])
+    from app.services import payload
+    config = {"symbols": args.symbols, "repeats": REPEATS,
+              "orjson": payload.orjson is not None}
+    write_results(args.output, "micro", config, results)
+
+
+if __name__ == "__main__":
+    main()
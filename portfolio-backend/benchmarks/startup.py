@@ -0,0 +1,143 @@
+"""Startup benchmark: import time, time to first health check and to ready.
+
+    python -m benchmarks.startup [--runs 5] [--output FILE]
+
+Each measurement runs in a fresh interpreter. ``import_s`` is the time
+to import an entry module; ``health_s`` and ``ready_s`` are the wall time
+from launching the server until /health, then /ready, first answer 200.
+``heavy_modules`` lists the data libraries already loaded by the import,
+which should stay empty apart from numpy.
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import BASELINE_DIR, PROJECT_DIR, print_table, write_results
+
+HEAVY_MODULES = ("numpy", "pandas", "yfinance", "requests")
+TIMEOUT = 60
+
+# Entry modules and how to launch them as servers
+TARGETS = {
+    "real_backend": [sys.executable, "real_backend.py"],
+    "proper_backend": [sys.executable, "proper_backend.py"],
+    "app.app": [sys.executable, "-m", "uvicorn", "app.app:app", "--host", "127.0.0.1",
+                "--log-level", "warning"]
+}
+
+IMPORT_SNIPPET = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def server_env(port: int) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        # No network: the refresh schedulers would call upstream at startup
+        "REFRESH_ENABLED": "false",
+        "CACHE_DB_PATH": "",
+        "HISTORY_DIR": "",
+        "PYTHONUNBUFFERED": "1"
+    })
+    return env
+
+
+def measure_import(module: str, env: Dict[str, str]) -> Dict[str, Any]:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=PROJECT_DIR, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def first_ok(port: int, path: str, deadline: float) -> Optional[float]:
+    """Poll ``path`` until it answers 200; the time it did, or None"""
+    while time.monotonic() < deadline:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+        try:
+            connection.request("GET", path)
+            if connection.getresponse().status == 200:
+                return time.monotonic()
+        except (OSError, http.client.HTTPException):
+            pass
+        finally:
+            connection.close()
+        time.sleep(0.005)
+    return None
+
+
+def measure_server(target: str, port: int, env: Dict[str, str]) -> Dict[str, Optional[float]]:
+    command = list(TARGETS[target])
+    if target == "app.app":
+        command += ["--port", str(port)]
+    started = time.monotonic()
+    process = subprocess.Popen(command, cwd=PROJECT_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = started + TIMEOUT
+        healthy = first_ok(port, "/health", deadline)
+        ready = first_ok(port, "/ready", deadline) if healthy else None
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {
+        "health_s": round(healthy - started, 3) if healthy else None,
+        "ready_s": round(ready - started, 3) if ready else None
+    }
+
+
+def median(values: List[Optional[float]]) -> Optional[float]:
+    values = [v for v in values if v is not None]
+    return round(statistics.median(values), 3) if values else None
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--targets", default=",".join(TARGETS))
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", default=os.path.join(BASELINE_DIR, "startup.json"))
+    args = parser.parse_args(argv)
+
+    results = []
+    for target in [t.strip() for t in args.targets.split(",") if t.strip()]:
+        env = server_env(args.port)
+        imports = [measure_import(target, env) for _ in range(args.runs)]
+        servers = [measure_server(target, args.port, env) for _ in range(args.runs)]
+        seconds = [run["seconds"] for run in imports]
+        result = {
+            "target": target,
+            "runs": args.runs,
+            "import_best_s": round(min(seconds), 3),
+            "import_median_s": median(seconds),
+            "health_s": median([run["health_s"] for run in servers]),
+            "ready_s": median([run["ready_s"] for run in servers]),
+            "heavy_modules": imports[-1]["loaded"]
+        }
+        results.append(result)
+        print(f"   {target:16} import {result['import_median_s']}s  "
+              f"health {result['health_s']}s  ready {result['ready_s']}s")
+
+    print()
+    print_table([[r["target"], r["import_best_s"], r["import_median_s"], r["health_s"],
+                  r["ready_s"], ",".join(r["heavy_modules"]) or "-"] for r in results],
+                ["target", "import best s", "import median s", "health s", "ready s",
+                 "loaded at import"])
+    write_results(args.output, "startup", {"runs": args.runs}, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,39 @@
 import http.server
 import socketserver
 import json
-import requests
-from datetime import datetime
-
-
-class StockAPIHandler(http.server.BaseHTTPRequestHandler):
+import os
+from urllib.parse import parse_qs, urlsplit
+from app.core.config import settings
+from app.services import metrics
+from app.services.market_data import provider_from_settings
+from app.services.upstream import CircuitBreaker, UpstreamGateway, UpstreamUnavailable
+from app.services.warmup import WarmUp
+
+# Upper bound on symbols per batch request
+MAX_BATCH_SYMBOLS = 100
+
+# Quotes from MARKET_DATA_PROVIDER; for Yahoo one keep-alive connection
+# pool serves the whole process. Every call shares the same rate limit and
+# circuit breaker as the other servers
+market_data = provider_from_settings(settings)
+upstream_gateway = UpstreamGateway(
+    market_data.name, rate=settings.UPSTREAM_CALLS_PER_SECOND,
+    burst=settings.UPSTREAM_BURST, max_wait=settings.UPSTREAM_MAX_WAIT,
+    breaker=CircuitBreaker(
+        failure_threshold=settings.UPSTREAM_FAILURE_THRESHOLD,
+        backoff=settings.UPSTREAM_BACKOFF,
+        max_backoff=settings.UPSTREAM_MAX_BACKOFF))
+metrics.add_collector(upstream_gateway.metrics)
+# Its data libraries load in the background after the port is bound
+warm_up = WarmUp([("market_data", market_data.warm_up)])
+
+# Endpoint labels for request metrics (see metrics.route_label)
+METRIC_ROUTES = ("/", "/health", "/ready", "/metrics", "/stocks/price/{symbol}", "/stocks/batch/prices")
+
+
+class StockAPIHandler(metrics.RequestMetricsMixin, http.server.BaseHTTPRequestHandler):
+
+    metric_routes = METRIC_ROUTES
 
     def do_GET(self):
         print(f"📡 Request: {self.path}")
@@ -30,6 +58,11 @@ class StockAPIHandler(http.server.BaseHTTPRequestHandler):
                 response = {"success": True, "data": price_data}
                 self.send_response(200)
 
+            except UpstreamUnavailable as e:
+                print(f"❌ Error: {e}")
+                response = {"success": False, "error": str(e)}
+                self.send_response(503)
+
             except Exception as e:
                 print(f"❌ Error: {e}")
                 response = {"success": False, "error": str(e)}
@@ -40,6 +73,63 @@ class StockAPIHandler(http.server.BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(json.dumps(response).encode('utf-8'))
 
+        elif self.path.startswith('/stocks/batch/prices'):
+            # /stocks/batch/prices?symbols=AAPL,RELIANCE.NS
+            query = parse_qs(urlsplit(self.path).query)
+            symbols = list(dict.fromkeys(
+                symbol.strip().upper()
+                for value in query.get('symbols', []) for symbol in value.split(',')
+                if symbol.strip()
+            ))
+
+            if not symbols or len(symbols) > MAX_BATCH_SYMBOLS:
+                response = {"success": False,
+                            "error": f"Pass 1 to {MAX_BATCH_SYMBOLS} symbols as ?symbols=A,B"}
+                self.send_response(400)
+            else:
+                try:
+                    response = {"success": True,
+                                "data": upstream_gateway.call(market_data.quotes, symbols)}
+                    self.send_response(200)
+                except UpstreamUnavailable as e:
+                    print(f"❌ Error: {e}")
+                    response = {"success": False, "error": str(e)}
+                    self.send_response(503)
+                except Exception as e:
+                    print(f"❌ Error: {e}")
+                    response = {"success": False,
+                                "error": f"Failed to fetch real-time data: {str(e)}"}
+                    self.send_response(502)
+
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(json.dumps(response).encode('utf-8'))
+
+        elif self.path == '/health':
+            # Liveness: answered without touching any data library
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(b'{"status": "healthy"}')
+
+        elif self.path == '/ready':
+            # Readiness: 503 until the data libraries are loaded
+            self.send_response(200 if warm_up.ready else 503)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(json.dumps(warm_up.stats()).encode('utf-8'))
+
+        elif self.path == '/metrics':
+            body = metrics.render()
+            self.send_response(200)
+            self.send_header('Content-type', metrics.CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
         else:
             self.send_response(404)
             self.send_header('Content-type', 'application/json')
@@ -51,82 +141,36 @@ class StockAPIHandler(http.server.BaseHTTPRequestHandler):
     def get_real_stock_data(self, symbol):
         """Get real stock data from Yahoo Finance API"""
         try:
-            # For Indian stocks, we need to use Yahoo Finance format
-            if symbol.endswith('.NS'):
-                yahoo_symbol = symbol  # RELIANCE.NS
-            else:
-                yahoo_symbol = symbol  # AAPL, TSLA, etc.
-
-            # Yahoo Finance API endpoint
-            url = f"https://query1.finance.yahoo.com/v8/finance/chart/{yahoo_symbol}"
-
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-
-            response = requests.get(url, headers=headers, timeout=10)
-            print(f"🔍 Yahoo API Response Status: {response.status_code}")
-
-            if response.status_code == 200:
-                data = response.json()
-                print(f"📊 Yahoo API Data: {json.dumps(data)[:200]}...")
-
-                if 'chart' in data and 'result' in data['chart'] and data['chart']['result']:
-                    result = data['chart']['result'][0]
-                    meta = result['meta']
-
-                    current_price = meta.get('regularMarketPrice', 0)
-                    previous_close = meta.get('previousClose', 0)
-
-                    if current_price == 0 or previous_close == 0:
-                        raise ValueError("Invalid price data from API")
-
-                    change = current_price - previous_close
-                    change_percent = (change / previous_close) * 100
-
-                    return {
-                        "symbol": symbol,
-                        "name": meta.get('longName', symbol),
-                        "current_price": round(current_price, 2),
-                        "change": round(change, 2),
-                        "change_percent": round(change_percent, 2),
-                        "previous_close": round(previous_close, 2),
-                        "volume": meta.get('regularMarketVolume', 0),
-                        "sector": meta.get('sector', 'N/A'),
-                        "last_updated": datetime.now().isoformat()
-                    }
-                else:
-                    raise ValueError("No chart data in API response")
-            else:
-                raise ValueError(
-                    f"API returned status code: {response.status_code}")
-
-        except Exception as e:
+            return upstream_gateway.call(market_data.quote, symbol)
+        except ValueError as e:
             print(f"❌ Detailed error: {str(e)}")
             raise ValueError(f"Failed to fetch real-time data: {str(e)}")
 
 
 def start_server():
-    PORT = 8000
+    PORT = int(os.environ.get("PORT", 8000))
     try:
         with socketserver.TCPServer(("", PORT), StockAPIHandler) as httpd:
+            warm_up.start()
             print("🚀 BACKEND SERVER STARTED!")
             print(f"📍 URL: http://localhost:{PORT}")
             print("📊 Test these in your browser:")
-            print("   1. http://localhost:8000/")
-            print("   2. http://localhost:8000/stocks/price/AAPL")
-            print("   3. http://localhost:8000/stocks/price/TSLA")
-            print("   4. http://localhost:8000/stocks/price/RELIANCE.NS")
+            print(f"   1. http://localhost:{PORT}/")
+            print(f"   2. http://localhost:{PORT}/stocks/price/AAPL")
+            print(f"   3. http://localhost:{PORT}/stocks/price/TSLA")
+            print(f"   4. http://localhost:{PORT}/stocks/price/RELIANCE.NS")
+            print(f"   5. http://localhost:{PORT}/stocks/batch/prices?symbols=AAPL,TSLA")
             print("\n⏳ Waiting for requests...")
             httpd.serve_forever()
     except OSError:
-        print("❌ Port 8000 busy. Trying 8001...")
-        start_server_with_port(8001)
+        print(f"❌ Port {PORT} busy. Trying {PORT + 1}...")
+        start_server_with_port(PORT + 1)
 
 
 def start_server_with_port(port):
     try:
         with socketserver.TCPServer(("", port), StockAPIHandler) as httpd:
+            warm_up.start()
             print(f"🚀 BACKEND SERVER STARTED on port {port}!")
             print(f"📍 URL: http://localhost:{port}")
             print(f"📊 Test: http://localhost:{port}/stocks/price/AAPL")
@@ -1,172 +1,183 @@
-﻿import http.server
+﻿import email.utils
+import http.server
 import os
+import signal
 import socketserver
 import json
-import yfinance as yf
-from datetime import datetime
+import threading
 import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+from app.core.config import settings
+from app.services import metrics
+from app.services.backtest import backtest, parse_allocations
+from app.services.backtest import parse_options as parse_backtest_options
+from app.services.cache import TTLCache
+from app.services.history_store import COLUMNS, HistoryStore, days_to_iso
+from app.services.market_data import provider_from_settings
+from app.services.payload import EncodedBody, dumps
+from app.services.dcf import (
+    DEFAULT_DISCOUNT_RATES, DEFAULT_GROWTH_RATES, DEFAULT_TERMINAL_RATES,
+    parse_distribution, sensitivity_grid, simulate, to_json_array)
+from app.services.persistent_cache import open_store
+from app.services.portfolio import parse_holdings, value_portfolio
+from app.services.optimizer import efficient_frontier, parse_options
+from app.services.rate_limit import TokenBucket
+from app.services.risk import (
+    BENCHMARK_SYMBOL, DEFAULT_CONFIDENCE, DEFAULT_WINDOW, ROLLING_STATE_ENTRIES,
+    ROLLING_STATE_TTL, portfolio_risk
+)
+from app.services.refresh_scheduler import RefreshScheduler
+from app.services.screener import FundamentalsTable
+from app.services.stream_hub import StreamHub
+from app.services.symbols import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, load_symbol_index
+from app.services.upstream import CircuitBreaker, UpstreamGateway
+from app.services.versions import VersionLog, etag_matches
+from app.services.warmup import WarmUp
 
-# Cache for prices (5 minutes) and fundamentals
-price_cache = {}
-fundamentals_cache = {}
-CACHE_DURATION = 300  # 5 minutes in seconds
+# Market data (Yahoo, or recorded files for offline load tests). Every call
+# shares one rate limit and circuit breaker; while the circuit is open calls
+# fail fast and requests are answered from the caches.
+market_data = provider_from_settings(settings)
+upstream_gateway = UpstreamGateway(
+    market_data.name, rate=settings.UPSTREAM_CALLS_PER_SECOND,
+    burst=settings.UPSTREAM_BURST, max_wait=settings.UPSTREAM_MAX_WAIT,
+    breaker=CircuitBreaker(
+        failure_threshold=settings.UPSTREAM_FAILURE_THRESHOLD,
+        backoff=settings.UPSTREAM_BACKOFF,
+        max_backoff=settings.UPSTREAM_MAX_BACKOFF))
 
+# The provider's data libraries (pandas, yfinance) load in the background
+# once the server is bound, so / and /health answer from the first second;
+# /ready turns 200 when they are loaded
+warm_up = WarmUp([("market_data", market_data.warm_up)])
 
-class RealStockAPIHandler(http.server.SimpleHTTPRequestHandler):
+# Listed NSE/BSE symbols for search and validation (None: accept any ticker)
+symbol_index = load_symbol_index(settings.SYMBOL_MASTER_PATH)
 
-    def _set_headers(self, status_code=200):
-        self.send_response(status_code)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
 
-    def do_OPTIONS(self):
-        self._set_headers(200)
+def is_listed(symbol):
+    """Whether a ticker may be sent upstream (always, without a symbol master)"""
+    if symbol_index is None or not settings.SYMBOL_VALIDATION:
+        return True
+    return symbol_index.resolve(symbol) is not None
 
-    def do_GET(self):
-        # Handle CORS preflight
-        if self.path == '/':
-            self._set_headers()
-            response = {
-                "message": "Portfolio Visualizer API - Optimized",
-                "status": "healthy",
-                "version": "2.0.0",
-                "cache_enabled": True,
-                "endpoints": [
-                    "/stocks/price/{symbol}",
-                    "/stocks/fundamentals/{symbol}",
-                    "/stocks/"
-                ]
-            }
-            self.wfile.write(json.dumps(response).encode())
 
-        elif self.path.startswith('/stocks/price/'):
-            symbol = self.path.split('/')[-1]
-            try:
-                # Check cache first
-                if not symbol.endswith(('.NS', '.BO')):
-                    symbol = f"{symbol}.NS"
+def fetch_histories(symbols, **kwargs):
+    """History download through the gateway, skipping unlisted symbols"""
+    listed = [symbol for symbol in symbols if is_listed(symbol)]
+    return upstream_gateway.call(market_data.histories, listed, **kwargs) if listed else {}
 
-                cache_key = f"price_{symbol}"
-                current_time = time.time()
-
-                if cache_key in price_cache:
-                    cache_data = price_cache[cache_key]
-                    if current_time - cache_data["timestamp"] < CACHE_DURATION:
-                        # Return cached data
-                        self._set_headers()
-                        response = {
-                            "success": True,
-                            "data": cache_data["data"],
-                            "cached": True,
-                            "cache_age": int(current_time - cache_data["timestamp"])
-                        }
-                        self.wfile.write(json.dumps(response).encode())
-                        return
-
-                # Get fresh data
-                price_data = self.get_real_stock_price(symbol)
 
-                # Cache it
-                price_cache[cache_key] = {
-                    "data": price_data,
-                    "timestamp": current_time
-                }
+def cached_body(data):
+    """Response body up to the cache fields, encoded once per cached value"""
+    return EncodedBody(b'{"success":true,"data":' + dumps(data))
 
-                self._set_headers()
-                response = {
-                    "success": True,
-                    "data": price_data,
-                    "cached": False
-                }
 
-            except Exception as e:
-                self._set_headers(500)
-                response = {
-                    "success": False,
-                    "error": str(e)
-                }
+# Bounded caches for prices (minutes) and fundamentals (hours). Expired
+# entries are served stale while a background refresh runs, and concurrent
+# misses for the same symbol share one Yahoo call. With CACHE_DB_PATH set
+# both caches write through to SQLite and warm up lazily after a restart.
+cache_store = open_store(settings.CACHE_DB_PATH)
+price_cache = TTLCache(
+    "price", ttl=settings.PRICE_CACHE_TTL,
+    maxsize=settings.CACHE_MAX_ENTRIES,
+    stale_ttl=settings.PRICE_CACHE_STALE_TTL,
+    store=cache_store, serialize=cached_body)
+fundamentals_cache = TTLCache(
+    "fundamentals", ttl=settings.FUNDAMENTALS_CACHE_TTL,
+    maxsize=settings.CACHE_MAX_ENTRIES,
+    stale_ttl=settings.FUNDAMENTALS_CACHE_STALE_TTL,
+    store=cache_store, serialize=cached_body)
+# Rolling risk states per portfolio and window, so repeat requests only
+# push the bars added since (see risk.rolling_series)
+rolling_states = TTLCache(
+    "rolling_risk", ttl=ROLLING_STATE_TTL, maxsize=ROLLING_STATE_ENTRIES)
 
-            self.wfile.write(json.dumps(response).encode())
+# Daily OHLCV on disk: price misses fetch only the bars since the last one
+history_store = HistoryStore(
+    settings.HISTORY_DIR, fetch_histories,
+    backfill_period=settings.HISTORY_BACKFILL_PERIOD) if settings.HISTORY_DIR else None
 
-        elif self.path.startswith('/stocks/fundamentals/'):
-            symbol = self.path.split('/')[-1]
-            try:
-                # Check cache first for fundamentals
-                if not symbol.endswith(('.NS', '.BO')):
-                    symbol = f"{symbol}.NS"
+# Concurrency limit for the worker pool (one request per worker thread)
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS", 16))
+# Connections allowed to wait for a free worker; beyond that they get a 503
+MAX_QUEUED = int(os.environ.get("MAX_QUEUED", 64))
 
-                cache_key = f"fundamentals_{symbol}"
-                current_time = time.time()
-
-                if cache_key in fundamentals_cache:
-                    cache_data = fundamentals_cache[cache_key]
-                    if current_time - cache_data["timestamp"] < CACHE_DURATION:
-                        self._set_headers()
-                        response = {
-                            "success": True,
-                            "data": cache_data["data"],
-                            "cached": True,
-                            "cache_age": int(current_time - cache_data["timestamp"])
-                        }
-                        self.wfile.write(json.dumps(response).encode())
-                        return
+# Upper bound on values per DCF sensitivity axis
+MAX_GRID_AXIS = 200
+# Upper bound on symbols per multi-symbol request
+MAX_BATCH_SYMBOLS = 500
+# Upper bound on POST body size
+MAX_BODY_BYTES = 1024 * 1024
 
-                # Get fresh fundamentals with ALWAYS estimated FCF
-                fundamentals_data = self.get_accurate_fundamentals_with_estimated_fcf(
-                    symbol)
+# Headers on every JSON response
+RESPONSE_HEADERS = (
+    ('Content-type', 'application/json'),
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Methods', 'GET, POST, OPTIONS'),
+    ('Access-Control-Allow-Headers', 'Content-Type, If-None-Match'),
+    ('Access-Control-Expose-Headers', 'ETag'),
+)
+# The same block pre-encoded for responses written straight from the cache
+CACHED_RESPONSE_HEADERS = ''.join(
+    f"{name}: {value}\r\n" for name, value in RESPONSE_HEADERS
+).encode() + b'Vary: Accept-Encoding\r\n'
 
-                # Cache it
-                fundamentals_cache[cache_key] = {
-                    "data": fundamentals_data,
-                    "timestamp": current_time
-                }
+# Endpoint labels for request metrics, matched in order (see metrics.route_label)
+METRIC_ROUTES = (
+    "/", "/health", "/ready", "/stats", "/metrics", "/stocks/",
+    "/stocks/price/{symbol}",
+    "/stocks/fundamentals/{symbol}",
+    "/stocks/dcf/simulate",
+    "/stocks/dcf/{symbol}",
+    "/stocks/history/{symbol}",
+    "/stocks/screener",
+    "/stocks/stream",
+    "/stocks/batch/prices",
+    "/stocks/search",
+    "/stocks/portfolio/value",
+    "/stocks/portfolio/risk",
+    "/stocks/portfolio/optimize",
+    "/stocks/portfolio/backtest",
+)
 
-                self._set_headers()
-                response = {
-                    "success": True,
-                    "data": fundamentals_data,
-                    "cached": False,
-                    "note": "Using EPS-based FCF estimation for accuracy"
-                }
+# Display names for the fallback fundamentals payload
+FALLBACK_NAMES = {
+    "RELIANCE.NS": "Reliance Industries",
+    "TCS.NS": "Tata Consultancy Services",
+    "HDFCBANK.NS": "HDFC Bank",
+    "INFY.NS": "Infosys",
+    "ITC.NS": "ITC Limited"
+}
 
-            except Exception as e:
-                # Fallback to cached fundamentals if Yahoo fails
-                self._set_headers()
-                response = {
-                    "success": True,
-                    "data": self.get_cached_fundamentals(symbol),
-                    "note": "Using cached fundamentals (Yahoo Finance failed)",
-                    "error": str(e)
-                }
+AVAILABLE_STOCKS = ["RELIANCE", "TCS", "HDFCBANK",
+                    "INFY", "ITC", "SBIN", "HINDUNILVR"]
 
-            self.wfile.write(json.dumps(response).encode())
+# FCF-to-EPS ratios by sector for EPS-based FCF estimation
+SECTOR_FCF_RATIOS = {
+    "Energy": 1.05,
+    "Oil & Gas": 1.03,
+    "Technology": 0.80,
+    "IT": 0.75,
+    "Banking": 0.65,
+    "Financial Services": 0.68,
+    "FMCG": 0.85,
+    "Consumer Defensive": 0.82,
+    "Healthcare": 0.75,
+    "Pharmaceuticals": 0.78,
+    "Automobile": 0.70,
+    "Industrial": 0.72,
+    "Telecommunication": 0.90,
+    "Utilities": 0.95,
+    "default": 0.80
+}
 
-        elif self.path == '/stocks/':
-            self._set_headers()
-            response = {
-                "success": True,
-                "data": {
-                    "available_stocks": ["RELIANCE", "TCS", "HDFCBANK", "INFY", "ITC", "SBIN", "HINDUNILVR"]
-                }
-            }
-            self.wfile.write(json.dumps(response).encode())
 
-        else:
-            self._set_headers(404)
-            response = {
-                "success": False,
-                "error": f"Cannot GET {self.path}",
-                "available_endpoints": [
-                    "/",
-                    "/stocks/price/{symbol}",
-                    "/stocks/fundamentals/{symbol}",
-                    "/stocks/"
-                ]
-            }
-            self.wfile.write(json.dumps(response).encode())
+class StockDataService:
+    """Yahoo Finance fetching and FCF estimation, usable outside a request"""
 
     def get_real_stock_price(self, symbol):
         """Get REAL stock price from yfinance - OPTIMIZED"""
@@ -174,59 +185,147 @@ class RealStockAPIHandler(http.server.SimpleHTTPRequestHandler):
             # Format symbol for Indian stocks
             if not symbol.endswith(('.NS', '.BO')):
                 symbol = f"{symbol}.NS"
+            if not is_listed(symbol):
+                raise ValueError(f"Unknown symbol {symbol}")
 
-            # Use minimal data fetch
-            stock = yf.Ticker(symbol)
-            history = stock.history(period="1d")  # Only 1 day needed
-
-            if history.empty:
-                # Try 5-day as fallback
-                history = stock.history(period="5d")
-                if history.empty:
-                    raise ValueError(f"No data for {symbol}")
+            if history_store is not None and history_store.last_date(symbol) is not None:
+                # Only the bars since the last stored one are downloaded
+                history_store.update([symbol])
+                return self.price_from_quote(
+                    symbol, history_store.latest_quote(symbol))
 
-            current_price = history['Close'].iloc[-1]
-            previous_close = history['Close'].iloc[-2] if len(
-                history) > 1 else current_price
+            # Symbols not in the store yet are quoted directly; their history
+            # is backfilled once a history endpoint asks for it
 
-            change = current_price - previous_close
-            change_percent = (change / previous_close) * \
-                100 if previous_close != 0 else 0
+            # 5 days, so the previous close is there even after a weekend
+            history = upstream_gateway.call(market_data.history, symbol, period="5d")
 
-            return {
-                "symbol": symbol,
-                "current_price": round(current_price, 2),
-                "change": round(change, 2),
-                "change_percent": round(change_percent, 2),
-                "previous_close": round(previous_close, 2),
-                "last_updated": datetime.now().isoformat(),
-                "data_source": "yfinance (optimized)"
-            }
+            return self.price_from_history(symbol, history)
 
         except Exception as e:
             raise Exception(f"Error fetching price for {symbol}: {str(e)}")
 
-    def get_estimated_fcf_from_eps(self, eps, sector):
-        """Estimate FCF from EPS based on sector ratios"""
-        sector_ratios = {
-            "Energy": 1.05,
-            "Oil & Gas": 1.03,
-            "Technology": 0.80,
-            "IT": 0.75,
-            "Banking": 0.65,
-            "Financial Services": 0.68,
-            "FMCG": 0.85,
-            "Consumer Defensive": 0.82,
-            "Healthcare": 0.75,
-            "Pharmaceuticals": 0.78,
-            "Automobile": 0.70,
-            "Industrial": 0.72,
-            "Telecommunication": 0.90,
-            "Utilities": 0.95,
-            "default": 0.80
+    def price_from_history(self, symbol, history):
+        """Build the price payload from the last two rows of a daily history"""
+        if history.empty:
+            raise ValueError(f"No data for {symbol}")
+
+        current_price = history['Close'].iloc[-1]
+        previous_close = history['Close'].iloc[-2] if len(
+            history) > 1 else current_price
+
+        change = current_price - previous_close
+        change_percent = (change / previous_close) * \
+            100 if previous_close != 0 else 0
+
+        return {
+            "symbol": symbol,
+            "current_price": round(current_price, 2),
+            "change": round(change, 2),
+            "change_percent": round(change_percent, 2),
+            "previous_close": round(previous_close, 2),
+            "last_updated": datetime.now().isoformat(),
+            "data_source": "yfinance (optimized)"
+        }
+
+    def price_from_quote(self, symbol, quote):
+        """Build the price payload from a history store quote"""
+        return {
+            "symbol": symbol,
+            "current_price": round(quote["close"], 2),
+            "change": round(quote["change"], 2),
+            "change_percent": round(quote["change_percent"], 2),
+            "previous_close": round(quote["previous_close"], 2),
+            "last_updated": datetime.now().isoformat(),
+            "data_source": "yfinance (history store)"
         }
 
-        ratio = sector_ratios.get(sector, sector_ratios["default"])
+    def get_batch_prices(self, symbols, use_cache=True):
+        """Get prices for many symbols: cache hits plus ONE bulk download"""
+        formatted = {
+            symbol: symbol if symbol.endswith(('.NS', '.BO')) else f"{symbol}.NS"
+            for symbol in symbols
+        }
+        results = {}
+        missing = []
+        for symbol in symbols:
+            if not is_listed(formatted[symbol]):
+                results[symbol] = {"error": f"Unknown symbol {formatted[symbol]}"}
+                continue
+            cached = None
+            if use_cache:
+                cached, _ = price_cache.get(f"price_{formatted[symbol]}")
+            if cached is not None:
+                results[symbol] = cached
+            else:
+                missing.append(symbol)
+        cache_hits = sum(1 for symbol in symbols if symbol in results
+                         and "error" not in results[symbol])
+
+        if missing:
+            yahoo_symbols = sorted({formatted[symbol] for symbol in missing})
+            # Stored symbols top up their tail; the rest get a short download
+            # instead of a multi-year backfill on the request thread
+            stored = set()
+            if history_store is not None:
+                stored = {s for s in yahoo_symbols if history_store.last_date(s) is not None}
+            cold = [s for s in yahoo_symbols if s not in stored]
+            histories = {}
+            update_error = download_error = None
+            if stored:
+                try:
+                    history_store.update(sorted(stored))
+                except Exception as e:
+                    update_error = str(e)
+            if cold:
+                try:
+                    histories = fetch_histories(cold, period="5d")
+                except Exception as e:
+                    download_error = str(e)
+
+            for symbol in missing:
+                yahoo_symbol = formatted[symbol]
+                try:
+                    if yahoo_symbol in stored:
+                        if update_error is not None:
+                            raise ValueError(update_error)
+                        price_data = self.price_from_quote(
+                            yahoo_symbol, history_store.latest_quote(yahoo_symbol))
+                        price_cache.set(f"price_{yahoo_symbol}", price_data)
+                        results[symbol] = price_data
+                        continue
+                    history = histories.get(yahoo_symbol)
+                    if history is None:
+                        raise ValueError(
+                            download_error or f"No data for {yahoo_symbol}")
+                    price_data = self.price_from_history(yahoo_symbol, history)
+                    price_cache.set(f"price_{yahoo_symbol}", price_data)
+                    results[symbol] = price_data
+                except Exception as e:
+                    results[symbol] = {
+                        "error": f"Error fetching price for {yahoo_symbol}: {str(e)}"
+                    }
+
+        return {symbol: results[symbol] for symbol in symbols}, cache_hits
+
+    def get_history(self, symbol, start=None, end=None):
+        """Daily OHLCV between start and end (YYYY-MM-DD) from the store"""
+        if not symbol.endswith(('.NS', '.BO')):
+            symbol = f"{symbol}.NS"
+        # Backfills a new symbol, otherwise tops up the tail at most once
+        # per price TTL
+        if not is_listed(symbol):
+            raise ValueError(f"Unknown symbol {symbol}")
+        history_store.refresh([symbol], settings.PRICE_CACHE_TTL)
+        dates, ohlcv = history_store.range(symbol, start, end)
+        history = {"symbol": symbol, "dates": days_to_iso(dates)}
+        for i, column in enumerate(COLUMNS):
+            history[column] = ohlcv[:, i].tolist()
+        return history
+
+    def get_estimated_fcf_from_eps(self, eps, sector):
+        """Estimate FCF from EPS based on sector ratios"""
+        ratio = SECTOR_FCF_RATIOS.get(sector, SECTOR_FCF_RATIOS["default"])
         return round(eps * ratio, 2)
 
     def get_sector_multiplier_text(self, sector):
@@ -252,9 +351,10 @@ class RealStockAPIHandler(http.server.SimpleHTTPRequestHandler):
             # Ensure .NS suffix
             if not symbol.endswith(('.NS', '.BO')):
                 symbol = f"{symbol}.NS"
+            if not is_listed(symbol):
+                raise ValueError(f"Unknown symbol {symbol}")
 
-            stock = yf.Ticker(symbol)
-            info = stock.info
+            info = upstream_gateway.call(market_data.fundamentals, symbol)
 
             # Get current price
             current_price = info.get('currentPrice')
@@ -322,114 +422,1212 @@ class RealStockAPIHandler(http.server.SimpleHTTPRequestHandler):
             print(f"Error fetching accurate fundamentals for {symbol}: {e}")
             raise Exception(f"Failed to fetch accurate fundamentals: {str(e)}")
 
-    def get_cached_fundamentals(self, symbol):
-        """Fallback fundamental data - OPTIMIZED"""
-        try:
+    def get_fundamentals(self, symbol):
+        """Fundamentals through the cache (fetching on a miss)"""
+        if not symbol.endswith(('.NS', '.BO')):
+            symbol = f"{symbol}.NS"
+        fundamentals_data, _, _ = fundamentals_cache.fetch(
+            f"fundamentals_{symbol}",
+            self.get_accurate_fundamentals_with_estimated_fcf, symbol)
+        return fundamentals_data
+
+    def get_dcf_sensitivity(self, symbol, growth_rates, discount_rates, terminal_rates):
+        """Intrinsic value and margin of safety for a whole assumption grid"""
+        fundamentals = self.get_fundamentals(symbol)
+        fcf_per_share = fundamentals["fcfPerShare"]
+        current_price = fundamentals["currentPrice"]
+
+        started = time.perf_counter()
+        grid = sensitivity_grid(
+            fcf_per_share, current_price,
+            growth_rates, discount_rates, terminal_rates)
+        compute_ms = (time.perf_counter() - started) * 1000
+
+        return {
+            "symbol": fundamentals["symbol"],
+            "currentPrice": current_price,
+            "fcfPerShare": fcf_per_share,
+            "fcfSource": fundamentals.get("fcfSource"),
+            "growth_rates": [float(x) for x in growth_rates],
+            "discount_rates": [float(x) for x in discount_rates],
+            "terminal_growth_rates": [float(x) for x in terminal_rates],
+            "axes": ["growth", "discount", "terminal_growth"],
+            "intrinsic_value": to_json_array(grid["intrinsic_value"]),
+            "margin_of_safety": to_json_array(grid["margin_of_safety"]),
+            "compute_ms": round(compute_ms, 3)
+        }
+
+    def get_dcf_simulation(self, symbols, paths, distributions, seed, bins):
+        """Monte Carlo DCF over a watchlist with one shared set of draws"""
+        valued = []
+        results = {}
+        for symbol in symbols:
+            try:
+                fundamentals = self.get_fundamentals(symbol)
+                valued.append((symbol, fundamentals))
+            except Exception as e:
+                results[symbol] = {"error": str(e)}
+
+        started = time.perf_counter()
+        simulation = simulate(
+            [f["fcfPerShare"] for _, f in valued],
+            [f["currentPrice"] for _, f in valued],
+            paths=paths, distributions=distributions, seed=seed, bins=bins)
+        compute_ms = (time.perf_counter() - started) * 1000
+
+        for (symbol, fundamentals), result in zip(valued, simulation["results"]):
+            result.update({
+                "symbol": fundamentals["symbol"],
+                "currentPrice": fundamentals["currentPrice"],
+                "fcfPerShare": fundamentals["fcfPerShare"]
+            })
+            results[symbol] = result
+
+        return {
+            "paths": simulation["paths"],
+            "valid_paths": simulation["valid_paths"],
+            "seed": seed,
+            "distributions": simulation["distributions"],
+            "results": {symbol: results[symbol] for symbol in symbols},
+            "compute_ms": round(compute_ms, 3)
+        }
+
+    def get_portfolio_valuation(self, holdings, since=None, if_none_match=None):
+        """Value a whole portfolio from one batched price lookup.
+
+        Returns (valuation, etag). The valuation is None when
+        ``if_none_match`` already names the current quotes. With ``since``
+        only holdings whose quote changed after that version are listed;
+        totals and sector allocation always cover the whole portfolio.
+        """
+        symbols = list(dict.fromkeys(h["symbol"] for h in holdings))
+        prices, cache_hits = self.get_batch_prices(symbols)
+
+        price_keys = {
+            symbol: f"price_{symbol if symbol.endswith(('.NS', '.BO')) else f'{symbol}.NS'}"
+            for symbol in symbols
+        }
+        etag = quote_versions.etag(
+            price_keys.values(), extra=json.dumps(holdings, sort_keys=True))
+        if if_none_match is not None and etag_matches(if_none_match, etag):
+            return None, etag
+
+        # Sectors come from cached fundamentals only; no extra upstream calls
+        sectors = {}
+        for symbol in symbols:
+            yahoo_symbol = symbol if symbol.endswith(('.NS', '.BO')) else f"{symbol}.NS"
+            fundamentals = fundamentals_cache.peek(f"fundamentals_{yahoo_symbol}")
+            if fundamentals:
+                sectors[symbol] = fundamentals.get("sector")
+
+        valuation = value_portfolio(holdings, prices, sectors)
+        valuation["cache_hits"] = cache_hits
+        valuation["fetched"] = len(symbols) - cache_hits
+        valuation["version"] = quote_versions.current()
+        if since is not None:
+            changed = {
+                symbol for symbol in symbols
+                if "error" in prices[symbol] or quote_versions.get(price_keys[symbol]) > since
+            }
+            valuation["holdings"] = [
+                row for row in valuation["holdings"] if row["symbol"] in changed]
+            valuation["delta"] = True
+        return valuation, etag
+
+    def get_portfolio_risk(self, holdings, start=None, window=DEFAULT_WINDOW,
+                           confidence=DEFAULT_CONFIDENCE):
+        """Risk metrics for the holdings from the local history store"""
+        quantities = {}
+        for holding in holdings:
+            symbol = holding["symbol"]
             if not symbol.endswith(('.NS', '.BO')):
                 symbol = f"{symbol}.NS"
+            quantities[symbol] = quantities.get(symbol, 0) + holding["quantity"]
+        symbols = list(quantities)
 
-            # Get current price
-            cache_key = f"price_{symbol}"
-            if cache_key in price_cache:
-                current_price = price_cache[cache_key]["data"]["current_price"]
+        # New bars are downloaded at most once per price TTL
+        history_store.refresh(symbols + [BENCHMARK_SYMBOL], settings.PRICE_CACHE_TTL)
+        has_benchmark = history_store.last_date(BENCHMARK_SYMBOL) is not None
+        dates, closes = history_store.aligned_closes(
+            symbols + [BENCHMARK_SYMBOL] if has_benchmark else symbols, start)
+        return portfolio_risk(
+            dates, closes[:, :len(symbols)], symbols,
+            [quantities[symbol] for symbol in symbols],
+            closes[:, -1] if has_benchmark else None,
+            window=window, confidence=confidence, rolling_states=rolling_states)
+
+    def get_efficient_frontier(self, symbols, start=None, **options):
+        """Efficient frontier for the symbols from the local history store"""
+        symbols = list(dict.fromkeys(
+            symbol if symbol.endswith(('.NS', '.BO')) else f"{symbol}.NS"
+            for symbol in symbols))
+        history_store.refresh(symbols, settings.PRICE_CACHE_TTL)
+        dates, closes = history_store.aligned_closes(symbols, start)
+        return efficient_frontier(dates, closes, symbols, **options)
+
+    def get_backtest(self, symbols, allocations, start=None, end=None, **options):
+        """Backtest a batch of allocations over the symbols' stored closes"""
+        weights = parse_allocations(allocations, symbols)
+        yahoo_symbols = [
+            symbol if symbol.endswith(('.NS', '.BO')) else f"{symbol}.NS"
+            for symbol in symbols
+        ]
+        history_store.refresh(yahoo_symbols, settings.PRICE_CACHE_TTL)
+        dates, closes = history_store.aligned_closes(yahoo_symbols, start, end)
+        return backtest(dates, closes, symbols, weights, **options)
+
+    def get_cached_fundamentals(self, symbol):
+        """Fallback fundamentals from the last known good data.
+
+        Used when Yahoo is failing, so it never calls upstream: it returns
+        the last cached fundamentals however old, or a minimal payload with
+        the last cached price.
+        """
+        if not symbol.endswith(('.NS', '.BO')):
+            symbol = f"{symbol}.NS"
+
+        fundamentals = fundamentals_cache.peek(f"fundamentals_{symbol}")
+        if fundamentals is not None:
+            return fundamentals
+
+        cached_price = price_cache.peek(f"price_{symbol}")
+        return {
+            "symbol": symbol,
+            "name": FALLBACK_NAMES.get(symbol, "Unknown"),
+            "currentPrice": cached_price["current_price"] if cached_price else 0,
+            "eps": 0,
+            "sector": "N/A",
+            "fcfPerShare": 0,
+            "fcfSource": "error",
+            "data_source": "Error Fallback",
+            "last_updated": datetime.now().isoformat()
+        }
+
+
+class RealStockAPIHandler(metrics.RequestMetricsMixin, StockDataService,
+                          http.server.SimpleHTTPRequestHandler):
+
+    metric_routes = METRIC_ROUTES
+
+    def _set_headers(self, status_code=200, headers=None):
+        self.send_response(status_code)
+        for name, value in RESPONSE_HEADERS:
+            self.send_header(name, value)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+    def query_symbols(self, query):
+        """Symbols from ?symbols=A,B,C and/or repeated ?symbols=A&symbols=B"""
+        symbols = []
+        for value in query.get('symbols', []):
+            for symbol in value.split(','):
+                symbol = symbol.strip().upper()
+                if symbol and symbol not in symbols:
+                    symbols.append(symbol)
+        return symbols
+
+    def read_json_body(self):
+        """Parse the request body as JSON (bounded by MAX_BODY_BYTES)"""
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError(f"Request body larger than {MAX_BODY_BYTES} bytes")
+        try:
+            return json.loads(self.rfile.read(length) or b'null')
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON body: {e}")
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        if path == '/stocks/portfolio/value':
+            # Body: {"holdings": [{"symbol", "quantity", "purchasePrice", "sector"?}],
+            #        "since"?: version}; honours If-None-Match
+            try:
+                payload = self.read_json_body()
+                holdings = parse_holdings(payload)
+                if len({h["symbol"] for h in holdings}) > MAX_BATCH_SYMBOLS:
+                    raise ValueError(
+                        f"At most {MAX_BATCH_SYMBOLS} distinct symbols per portfolio")
+                since = parse_since(payload.get("since"))
+            except ValueError as e:
+                self._set_headers(400)
+                response = {
+                    "success": False,
+                    "error": str(e)
+                }
+                self.wfile.write(json.dumps(response).encode())
+                return
+
+            try:
+                valuation, etag = self.get_portfolio_valuation(
+                    holdings, since, self.headers.get('If-None-Match'))
+                if valuation is None:
+                    self._set_headers(304, {'ETag': etag})
+                    return
+                self._set_headers(200, {'ETag': etag, 'Cache-Control': 'no-cache'})
+                response = {
+                    "success": True,
+                    "data": valuation
+                }
+            except Exception as e:
+                self._set_headers(500)
+                response = {
+                    "success": False,
+                    "error": str(e)
+                }
+
+            self.wfile.write(json.dumps(response).encode())
+
+        elif path == '/stocks/portfolio/risk':
+            # Body: {"holdings": [...], "start"?: "YYYY-MM-DD", "window"?: 63,
+            #        "confidence"?: 0.95}
+            try:
+                payload = self.read_json_body()
+                holdings = parse_holdings(payload)
+                if len({h["symbol"] for h in holdings}) > MAX_BATCH_SYMBOLS:
+                    raise ValueError(
+                        f"At most {MAX_BATCH_SYMBOLS} distinct symbols per portfolio")
+                try:
+                    window = int(payload.get("window", DEFAULT_WINDOW))
+                    confidence = float(payload.get("confidence", DEFAULT_CONFIDENCE))
+                except (TypeError, ValueError):
+                    raise ValueError("window must be an integer and confidence a number")
+            except ValueError as e:
+                self._set_headers(400)
+                response = {
+                    "success": False,
+                    "error": str(e)
+                }
+                self.wfile.write(json.dumps(response).encode())
+                return
+
+            if history_store is None:
+                self._set_headers(503)
+                response = {
+                    "success": False,
+                    "error": "History store is disabled (HISTORY_DIR is empty)"
+                }
             else:
-                price_data = self.get_real_stock_price(symbol)
-                current_price = price_data["current_price"]
+                try:
+                    risk = self.get_portfolio_risk(
+                        holdings, payload.get("start"), window, confidence)
+                    self._set_headers()
+                    response = {
+                        "success": True,
+                        "data": risk
+                    }
+                except ValueError as e:
+                    self._set_headers(400)
+                    response = {
+                        "success": False,
+                        "error": str(e)
+                    }
+                except Exception as e:
+                    self._set_headers(500)
+                    response = {
+                        "success": False,
+                        "error": str(e)
+                    }
 
-            # Get sector for estimation
-            stock = yf.Ticker(symbol)
-            info = stock.info
-            sector = info.get('sector', 'N/A')
-            eps = info.get('trailingEps') or info.get('forwardEps') or 101.5
-
-            # Estimate FCF from EPS
-            estimated_fcf = self.get_estimated_fcf_from_eps(eps, sector)
-
-            # Static fundamentals database with EPS-based FCF
-            fundamentals_db = {
-                "RELIANCE.NS": {
-                    "name": "Reliance Industries",
-                    "currentPrice": current_price,
-                    "eps": round(eps, 2),
-                    "sector": sector,
-                    "fcfPerShare": estimated_fcf,
-                    "fcfSource": "estimated",
-                    "data_source": "EPS-based estimation (Fallback)"
-                },
-                "TCS.NS": {
-                    "name": "Tata Consultancy Services",
-                    "currentPrice": current_price,
-                    "eps": round(eps, 2),
-                    "sector": sector,
-                    "fcfPerShare": estimated_fcf,
-                    "fcfSource": "estimated",
-                    "data_source": "EPS-based estimation (Fallback)"
-                },
-                "HDFCBANK.NS": {
-                    "name": "HDFC Bank",
-                    "currentPrice": current_price,
-                    "eps": round(eps, 2),
-                    "sector": sector,
-                    "fcfPerShare": estimated_fcf,
-                    "fcfSource": "estimated",
-                    "data_source": "EPS-based estimation (Fallback)"
-                },
-                "INFY.NS": {
-                    "name": "Infosys",
-                    "currentPrice": current_price,
-                    "eps": round(eps, 2),
-                    "sector": sector,
-                    "fcfPerShare": estimated_fcf,
-                    "fcfSource": "estimated",
-                    "data_source": "EPS-based estimation (Fallback)"
-                },
-                "ITC.NS": {
-                    "name": "ITC Limited",
-                    "currentPrice": current_price,
-                    "eps": round(eps, 2),
-                    "sector": sector,
-                    "fcfPerShare": estimated_fcf,
-                    "fcfSource": "estimated",
-                    "data_source": "EPS-based estimation (Fallback)"
+            self.wfile.write(json.dumps(response).encode())
+
+        elif path == '/stocks/portfolio/optimize':
+            # Body: {"symbols"?: [...] (default: AVAILABLE_STOCKS), "start"?,
+            #        "long_only"?, "max_weight"?, "risk_free"?, "points"?,
+            #        "samples"?, "seed"?}
+            try:
+                payload = self.read_json_body() or {}
+                if not isinstance(payload, dict):
+                    raise ValueError("Body must be a JSON object")
+                symbols = payload.get("symbols") or AVAILABLE_STOCKS
+                if not isinstance(symbols, list) or len(symbols) > MAX_BATCH_SYMBOLS:
+                    raise ValueError(
+                        f"'symbols' must be a list of at most {MAX_BATCH_SYMBOLS} symbols")
+                symbols = [str(symbol).strip().upper() for symbol in symbols]
+                options = parse_options(payload)
+            except ValueError as e:
+                self._set_headers(400)
+                response = {
+                    "success": False,
+                    "error": str(e)
                 }
+                self.wfile.write(json.dumps(response).encode())
+                return
+
+            if history_store is None:
+                self._set_headers(503)
+                response = {
+                    "success": False,
+                    "error": "History store is disabled (HISTORY_DIR is empty)"
+                }
+            else:
+                try:
+                    frontier = self.get_efficient_frontier(
+                        symbols, payload.get("start"), **options)
+                    self._set_headers()
+                    response = {
+                        "success": True,
+                        "data": frontier
+                    }
+                except ValueError as e:
+                    self._set_headers(400)
+                    response = {
+                        "success": False,
+                        "error": str(e)
+                    }
+                except Exception as e:
+                    self._set_headers(500)
+                    response = {
+                        "success": False,
+                        "error": str(e)
+                    }
+
+            self.wfile.write(json.dumps(response).encode())
+
+        elif path == '/stocks/portfolio/backtest':
+            # Body: {"symbols": [...], "allocations": [[w, ...] | {symbol: w}],
+            #        "start"?, "end"?, "rebalance"?: "none"|"monthly"|"quarterly",
+            #        "cost_bps"?, "initial"?, "curve_points"?}
+            try:
+                payload = self.read_json_body()
+                if not isinstance(payload, dict):
+                    raise ValueError("Body must be a JSON object")
+                symbols = payload.get("symbols")
+                if not isinstance(symbols, list) or not 0 < len(symbols) <= MAX_BATCH_SYMBOLS:
+                    raise ValueError(
+                        f"'symbols' must be a list of 1 to {MAX_BATCH_SYMBOLS} symbols")
+                symbols = list(dict.fromkeys(str(symbol).strip().upper() for symbol in symbols))
+                options = parse_backtest_options(payload)
+            except ValueError as e:
+                self._set_headers(400)
+                response = {
+                    "success": False,
+                    "error": str(e)
+                }
+                self.wfile.write(json.dumps(response).encode())
+                return
+
+            if history_store is None:
+                self._set_headers(503)
+                response = {
+                    "success": False,
+                    "error": "History store is disabled (HISTORY_DIR is empty)"
+                }
+            else:
+                try:
+                    result = self.get_backtest(
+                        symbols, payload.get("allocations"), payload.get("start"),
+                        payload.get("end"), **options)
+                    self._set_headers()
+                    response = {
+                        "success": True,
+                        "data": result
+                    }
+                except ValueError as e:
+                    self._set_headers(400)
+                    response = {
+                        "success": False,
+                        "error": str(e)
+                    }
+                except Exception as e:
+                    self._set_headers(500)
+                    response = {
+                        "success": False,
+                        "error": str(e)
+                    }
+
+            self.wfile.write(json.dumps(response).encode())
+
+        else:
+            self._set_headers(404)
+            response = {
+                "success": False,
+                "error": f"Cannot POST {self.path}",
+                "available_endpoints": [
+                    "/stocks/portfolio/value",
+                    "/stocks/portfolio/risk",
+                    "/stocks/portfolio/optimize",
+                    "/stocks/portfolio/backtest"
+                ]
             }
+            self.wfile.write(json.dumps(response).encode())
 
-            data = fundamentals_db.get(symbol, fundamentals_db["RELIANCE.NS"])
-            data["currentPrice"] = round(current_price, 2)
-            data["eps"] = round(eps, 2)
-            data["sector"] = sector
-            data["fcfPerShare"] = estimated_fcf
-            data["last_updated"] = datetime.now().isoformat()
+    def do_OPTIONS(self):
+        self._set_headers(200)
 
-            return data
+    def do_GET(self):
+        # Handle CORS preflight
+        if self.path == '/':
+            self._set_headers()
+            response = {
+                "message": "Portfolio Visualizer API - Optimized",
+                "status": "healthy",
+                "version": "2.0.0",
+                "cache_enabled": True,
+                "endpoints": [
+                    "/stocks/price/{symbol}",
+                    "/stocks/fundamentals/{symbol}",
+                    "/stocks/batch/prices?symbols=A,B",
+                    "/stocks/dcf/{symbol}?growth=&discount=&terminal=",
+                    "/stocks/dcf/simulate?symbols=A,B&paths=&seed=",
+                    "/stocks/screener?growth=&discount=&terminal=&sector=&min_mos=",
+                    "/stocks/history/{symbol}?start=&end=",
+                    "/stocks/stream?symbols=A,B",
+                    "/stocks/search?q=&limit=",
+                    "/stocks/",
+                    "/stats",
+                    "/metrics",
+                    "/health",
+                    "/ready"
+                ]
+            }
+            self.wfile.write(json.dumps(response).encode())
 
-        except Exception as e:
-            # Minimal fallback data
-            return {
-                "symbol": symbol,
-                "name": "Unknown",
-                "currentPrice": current_price if 'current_price' in locals() else 0,
-                "eps": 0,
-                "sector": "N/A",
-                "fcfPerShare": 0,
-                "fcfSource": "error",
-                "data_source": "Error Fallback",
-                "last_updated": datetime.now().isoformat()
+        elif self.path.startswith('/stocks/price/'):
+            symbol = self.path.split('/')[-1]
+            try:
+                # Check cache first
+                if not symbol.endswith(('.NS', '.BO')):
+                    symbol = f"{symbol}.NS"
+                if not is_listed(symbol):
+                    self.write_unknown_symbol(symbol)
+                    return
+                price_scheduler.track(symbol)
+
+                cache_key = f"price_{symbol}"
+                body, cache_age, status = price_cache.fetch_encoded(
+                    cache_key, self.get_real_stock_price, symbol)
+                self.write_cached(body, cache_age, status)
+
+            except Exception as e:
+                # Past the stale window: the last known price beats an error
+                last_price = price_cache.peek(f"price_{symbol}")
+                if last_price is not None:
+                    self._set_headers()
+                    response = {
+                        "success": True,
+                        "data": last_price,
+                        "cached": True,
+                        "stale": True,
+                        "error": str(e)
+                    }
+                else:
+                    self._set_headers(500)
+                    response = {
+                        "success": False,
+                        "error": str(e)
+                    }
+                self.wfile.write(json.dumps(response).encode())
+
+        elif self.path.startswith('/stocks/fundamentals/'):
+            symbol = self.path.split('/')[-1]
+            try:
+                # Check cache first for fundamentals
+                if not symbol.endswith(('.NS', '.BO')):
+                    symbol = f"{symbol}.NS"
+                if not is_listed(symbol):
+                    self.write_unknown_symbol(symbol)
+                    return
+                fundamentals_scheduler.track(symbol)
+
+                # Fresh fundamentals ALWAYS use estimated FCF
+                cache_key = f"fundamentals_{symbol}"
+                body, cache_age, status = fundamentals_cache.fetch_encoded(
+                    cache_key, self.get_accurate_fundamentals_with_estimated_fcf,
+                    symbol)
+                self.write_cached(
+                    body, cache_age, status,
+                    note="Using EPS-based FCF estimation for accuracy")
+
+            except Exception as e:
+                # Fallback to cached fundamentals if Yahoo fails
+                self._set_headers()
+                response = {
+                    "success": True,
+                    "data": self.get_cached_fundamentals(symbol),
+                    "note": "Using cached fundamentals (Yahoo Finance failed)",
+                    "error": str(e)
+                }
+                self.wfile.write(json.dumps(response).encode())
+
+        elif self.path.startswith('/stocks/dcf/simulate'):
+            # /stocks/dcf/simulate?symbols=TCS,INFY&paths=100000&seed=42
+            #   &growth=normal:8:3&discount=uniform:10:14&terminal=2.5
+            query = parse_qs(urlsplit(self.path).query)
+            symbols = self.query_symbols(query)
+            try:
+                if not symbols or len(symbols) > MAX_BATCH_SYMBOLS:
+                    raise ValueError(
+                        f"'symbols' needs 1 to {MAX_BATCH_SYMBOLS} symbols")
+                paths = int(query.get('paths', ['100000'])[0])
+                bins = int(query.get('bins', ['50'])[0])
+                seed = int(query['seed'][0]) if 'seed' in query else None
+                distributions = {
+                    name: parse_distribution(query[name][0])
+                    for name in ("growth", "discount", "terminal")
+                    if name in query
+                }
+                if not 1 <= bins <= 1000:
+                    raise ValueError("'bins' must be between 1 and 1000")
+            except ValueError as e:
+                self._set_headers(400)
+                response = {
+                    "success": False,
+                    "error": f"Invalid simulation parameters: {str(e)}"
+                }
+                self.wfile.write(json.dumps(response).encode())
+                return
+
+            try:
+                simulation = self.get_dcf_simulation(
+                    symbols, paths, distributions, seed, bins)
+                self._set_headers()
+                response = {
+                    "success": True,
+                    "data": simulation
+                }
+            except ValueError as e:
+                self._set_headers(400)
+                response = {
+                    "success": False,
+                    "error": str(e)
+                }
+            except Exception as e:
+                self._set_headers(500)
+                response = {
+                    "success": False,
+                    "error": str(e)
+                }
+
+            self.wfile.write(json.dumps(response).encode())
+
+        elif self.path.startswith('/stocks/dcf/'):
+            # /stocks/dcf/SYMBOL?growth=5,8,10&discount=10,12&terminal=2,3
+            # Rates are percent; omitted axes use the Valuation page ranges
+            url = urlsplit(self.path)
+            symbol = url.path.rstrip('/').split('/')[-1]
+            query = parse_qs(url.query)
+            try:
+                axes = []
+                for name, default in (("growth", DEFAULT_GROWTH_RATES),
+                                      ("discount", DEFAULT_DISCOUNT_RATES),
+                                      ("terminal", DEFAULT_TERMINAL_RATES)):
+                    if name in query:
+                        values = np.array([
+                            float(v) for part in query[name]
+                            for v in part.split(',') if v.strip()])
+                    else:
+                        values = default
+                    if len(values) == 0 or len(values) > MAX_GRID_AXIS:
+                        raise ValueError(
+                            f"'{name}' needs 1 to {MAX_GRID_AXIS} values")
+                    axes.append(values)
+            except ValueError as e:
+                self._set_headers(400)
+                response = {
+                    "success": False,
+                    "error": f"Invalid DCF assumptions: {str(e)}"
+                }
+                self.wfile.write(json.dumps(response).encode())
+                return
+
+            try:
+                dcf_data = self.get_dcf_sensitivity(symbol, *axes)
+                self._set_headers()
+                response = {
+                    "success": True,
+                    "data": dcf_data
+                }
+            except Exception as e:
+                self._set_headers(500)
+                response = {
+                    "success": False,
+                    "error": str(e)
+                }
+
+            self.wfile.write(json.dumps(response).encode())
+
+        elif self.path.startswith('/stocks/history/'):
+            # /stocks/history/SYMBOL?start=2020-01-01&end=2024-12-31
+            url = urlsplit(self.path)
+            symbol = url.path.rstrip('/').split('/')[-1]
+            query = parse_qs(url.query)
+            if history_store is None:
+                self._set_headers(503)
+                response = {
+                    "success": False,
+                    "error": "History store is disabled (HISTORY_DIR is empty)"
+                }
+            else:
+                try:
+                    history = self.get_history(
+                        symbol, query.get('start', [None])[0],
+                        query.get('end', [None])[0])
+                    self._set_headers()
+                    response = {
+                        "success": True,
+                        "data": history
+                    }
+                except Exception as e:
+                    self._set_headers(500)
+                    response = {
+                        "success": False,
+                        "error": str(e)
+                    }
+
+            self.wfile.write(json.dumps(response).encode())
+
+        elif self.path.startswith('/stocks/screener'):
+            # /stocks/screener?growth=8&discount=12&terminal=3&sector=IT
+            #   &min_mos=10&sort=margin_of_safety&order=desc&page=1&page_size=50
+            query = parse_qs(urlsplit(self.path).query)
+
+            def number(name, default=None):
+                return float(query[name][0]) if name in query else default
+
+            try:
+                screen = screener_table.screen(
+                    growth=number('growth', 8.0),
+                    discount=number('discount', 12.0),
+                    terminal_growth=number('terminal', 3.0),
+                    sector=query.get('sector', [None])[0],
+                    min_margin=number('min_mos'),
+                    max_margin=number('max_mos'),
+                    min_price=number('min_price'),
+                    max_price=number('max_price'),
+                    sort_by=query.get('sort', ['margin_of_safety'])[0],
+                    descending=query.get('order', ['desc'])[0] != 'asc',
+                    page=int(query.get('page', ['1'])[0]),
+                    page_size=int(query.get('page_size', ['50'])[0]))
+                self._set_headers()
+                response = {
+                    "success": True,
+                    "data": screen
+                }
+            except ValueError as e:
+                self._set_headers(400)
+                response = {
+                    "success": False,
+                    "error": str(e)
+                }
+
+            self.wfile.write(json.dumps(response).encode())
+
+        elif self.path.startswith('/stocks/stream'):
+            # Server-Sent Events: "quotes" events carry {symbol: price_data}
+            # for changed quotes only; the connection is handed to stream_hub
+            symbols = self.query_symbols(parse_qs(urlsplit(self.path).query))
+            if not symbols or len(symbols) > MAX_BATCH_SYMBOLS:
+                self._set_headers(400)
+                response = {
+                    "success": False,
+                    "error": f"Query parameter 'symbols' needs 1 to {MAX_BATCH_SYMBOLS} symbols"
+                }
+                self.wfile.write(json.dumps(response).encode())
+                return
+
+            symbols = [s if s.endswith(('.NS', '.BO')) else f"{s}.NS" for s in symbols]
+            unlisted = [s for s in symbols if not is_listed(s)]
+            if unlisted:
+                self._set_headers(404)
+                response = {
+                    "success": False,
+                    "error": f"Unknown symbols: {', '.join(unlisted)}"
+                }
+                self.wfile.write(json.dumps(response).encode())
+                return
+
+            # Current quotes from the cache only; missing ones follow after
+            # the stream scheduler's next refresh
+            initial = {}
+            for symbol in symbols:
+                price_data = price_cache.peek(f"price_{symbol}")
+                if price_data is not None:
+                    initial[symbol] = price_data
+
+            self.send_response(200)
+            self.send_header('Content-type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('X-Accel-Buffering', 'no')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            try:
+                stream_hub.subscribe(self.connection, symbols, initial)
+                self.server.detach(self.connection)
+            except ValueError as e:
+                self.wfile.write(f"event: error\ndata: {json.dumps(str(e))}\n\n".encode())
+            self.close_connection = True
+
+        elif self.path.startswith('/stocks/batch/prices'):
+            # ?symbols=A,B[&since=version]: with since, only quotes that
+            # changed after that version are returned; honours If-None-Match
+            query = parse_qs(urlsplit(self.path).query)
+            symbols = self.query_symbols(query)
+            try:
+                since = parse_since(query.get('since', [None])[0])
+            except ValueError as e:
+                symbols, error = [], str(e)
+            else:
+                error = "Query parameter 'symbols' is required"
+
+            if not symbols:
+                self._set_headers(400)
+                response = {
+                    "success": False,
+                    "error": error
+                }
+            else:
+                try:
+                    yahoo_symbols = {
+                        s: s if s.endswith(('.NS', '.BO')) else f"{s}.NS" for s in symbols}
+                    price_scheduler.track(*yahoo_symbols.values())
+                    prices, cache_hits = self.get_batch_prices(symbols)
+
+                    etag = quote_versions.etag(
+                        f"price_{yahoo_symbols[s]}" for s in symbols)
+                    if etag_matches(self.headers.get('If-None-Match'), etag):
+                        self._set_headers(304, {'ETag': etag})
+                        return
+
+                    response = {
+                        "success": True,
+                        "data": prices,
+                        "cache_hits": cache_hits,
+                        "fetched": len(symbols) - cache_hits,
+                        "version": quote_versions.current()
+                    }
+                    if since is not None:
+                        response["data"] = {
+                            s: price for s, price in prices.items()
+                            if "error" in price
+                            or quote_versions.get(f"price_{yahoo_symbols[s]}") > since
+                        }
+                        response["unchanged"] = [s for s in symbols if s not in response["data"]]
+                    self._set_headers(200, {'ETag': etag, 'Cache-Control': 'no-cache'})
+                except Exception as e:
+                    self._set_headers(500)
+                    response = {
+                        "success": False,
+                        "error": str(e)
+                    }
+
+            self.wfile.write(json.dumps(response).encode())
+
+        elif self.path.startswith('/stocks/search'):
+            # /stocks/search?q=tata&limit=10 -- typeahead over the symbol master
+            query = parse_qs(urlsplit(self.path).query)
+            try:
+                text = query.get('q', [''])[0].strip()
+                limit = int(query.get('limit', [DEFAULT_SEARCH_LIMIT])[0])
+                if not text:
+                    raise ValueError("Query parameter 'q' is required")
+                if not 1 <= limit <= MAX_SEARCH_LIMIT:
+                    raise ValueError(f"limit must be between 1 and {MAX_SEARCH_LIMIT}")
+                if symbol_index is None:
+                    self._set_headers(503)
+                    response = {"success": False, "error": "Symbol master not loaded"}
+                else:
+                    self._set_headers()
+                    response = {"success": True, "data": symbol_index.search(text, limit)}
+            except ValueError as e:
+                self._set_headers(400)
+                response = {
+                    "success": False,
+                    "error": str(e)
+                }
+
+            self.wfile.write(json.dumps(response).encode())
+
+        elif self.path == '/stats':
+            self._set_headers()
+            response = {
+                "success": True,
+                "data": {
+                    "caches": [
+                        price_cache.stats(),
+                        fundamentals_cache.stats()
+                    ],
+                    "schedulers": [
+                        price_scheduler.stats(),
+                        stream_scheduler.stats(),
+                        fundamentals_scheduler.stats()
+                    ],
+                    "stream": stream_hub.stats(),
+                    "warm_up": warm_up.stats(),
+                    "upstream": upstream_gateway.stats(),
+                    "market_data": market_data.stats(),
+                    "symbols": symbol_index.stats() if symbol_index is not None else None,
+                    "history": history_store.stats() if history_store is not None else None
+                }
             }
+            self.wfile.write(json.dumps(response).encode())
+
+        elif self.path == '/health':
+            # Liveness: answered without touching any data library
+            self._set_headers()
+            self.wfile.write(b'{"status":"healthy"}')
+
+        elif self.path == '/ready':
+            self._set_headers(200 if warm_up.ready else 503)
+            self.wfile.write(json.dumps(warm_up.stats()).encode())
+
+        elif self.path == '/metrics':
+            body = metrics.render()
+            self.send_response(200)
+            self.send_header('Content-type', metrics.CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        elif self.path == '/stocks/':
+            self._set_headers()
+            response = {
+                "success": True,
+                "data": {
+                    "available_stocks": AVAILABLE_STOCKS
+                }
+            }
+            self.wfile.write(json.dumps(response).encode())
+
+        else:
+            self._set_headers(404)
+            response = {
+                "success": False,
+                "error": f"Cannot GET {self.path}",
+                "available_endpoints": [
+                    "/",
+                    "/stocks/price/{symbol}",
+                    "/stocks/fundamentals/{symbol}",
+                    "/stocks/batch/prices?symbols=A,B",
+                    "/stocks/dcf/{symbol}?growth=&discount=&terminal=",
+                    "/stocks/dcf/simulate?symbols=A,B&paths=&seed=",
+                    "/stocks/screener?growth=&discount=&terminal=&sector=&min_mos=",
+                    "/stocks/history/{symbol}?start=&end=",
+                    "/stocks/stream?symbols=A,B",
+                    "/stocks/search?q=&limit=",
+                    "/stocks/",
+                    "/stats",
+                    "/metrics",
+                    "/health",
+                    "/ready"
+                ]
+            }
+            self.wfile.write(json.dumps(response).encode())
+
+    def write_unknown_symbol(self, symbol):
+        """404 for a ticker missing from the symbol master, with suggestions"""
+        self._set_headers(404)
+        response = {
+            "success": False,
+            "error": f"Unknown symbol {symbol}",
+            "suggestions": symbol_index.search(symbol.split('.')[0], 5)
+        }
+        self.wfile.write(json.dumps(response).encode())
+
+    def write_cached(self, body, cache_age, status, note=None):
+        """Write a cache lookup's success payload in one pre-encoded write.
+
+        ``body`` comes from TTLCache.fetch_encoded; only the cache fields
+        (and ``note``, on a miss) are encoded per request. The cache age is
+        also sent as an Age header.
+        """
+        if status == TTLCache.MISS:
+            tail = b',"cached":false'
+            if note:
+                tail += b',"note":' + dumps(note)
+            cache_age = 0
+        else:
+            tail = b',"cached":true,"cache_age":%d' % int(cache_age)
+            if status == TTLCache.STALE:
+                tail += b',"stale":true'
+        gzip = body.gzippable() and 'gzip' in self.headers.get('Accept-Encoding', '')
+        content = body.body(tail + b'}', gzip)
+
+        self.log_request(200, len(content))
+        self.wfile.write(b''.join((
+            b'%s 200 OK\r\nServer: %s\r\nDate: %s\r\n' % (
+                self.protocol_version.encode(), self.version_string().encode(), http_date()),
+            CACHED_RESPONSE_HEADERS,
+            b'Content-Encoding: gzip\r\n' if gzip else b'',
+            b'Age: %d\r\nContent-Length: %d\r\n\r\n' % (int(cache_age), len(content)),
+            content
+        )))
+
+
+# Background refresh: keep hot symbols fresh so requests hit the cache.
+# Prices refresh in bulk batches; fundamentals one symbol at a time on a
+# slower cadence. Both draw from one upstream budget.
+stock_data = StockDataService()
+refresh_budget = TokenBucket(
+    rate=settings.REFRESH_CALLS_PER_MINUTE / 60,
+    capacity=max(1, settings.REFRESH_CALLS_PER_MINUTE / 6))
+
+
+def refresh_prices(symbols):
+    prices, _ = stock_data.get_batch_prices(symbols, use_cache=False)
+    errors = [p["error"] for p in prices.values() if "error" in p]
+    if errors and len(errors) == len(prices):
+        raise ValueError(errors[0])
+
+
+def refresh_fundamentals(symbols):
+    for symbol in symbols:
+        fundamentals_cache.refresh(
+            f"fundamentals_{symbol}",
+            stock_data.get_accurate_fundamentals_with_estimated_fcf, symbol)
+
+
+price_scheduler = RefreshScheduler(
+    "price", refresh_prices,
+    interval=settings.PRICE_CACHE_TTL * 0.8,
+    universe=[f"{s}.NS" for s in AVAILABLE_STOCKS],
+    batch_size=settings.REFRESH_BATCH_SIZE,
+    budget=refresh_budget,
+    hot_window=settings.REFRESH_HOT_WINDOW)
+
+
+def quote_fingerprint(price_data):
+    """The fields that make a quote "changed" (last_updated alone does not)"""
+    return (price_data.get("current_price"), price_data.get("change"),
+            price_data.get("previous_close"))
+
+
+# Live quotes for /stocks/stream: every price cache write is offered to the
+# hub, which forwards only changed quotes to that symbol's subscribers
+stream_hub = StreamHub(
+    "price", fingerprint=quote_fingerprint,
+    max_subscribers=settings.STREAM_MAX_SUBSCRIBERS)
+
+# Change versions behind ?since= deltas and ETags on batch/portfolio responses
+quote_versions = VersionLog("price")
+
+
+def publish_price(key, price_data):
+    quote_versions.record(key, quote_fingerprint(price_data))
+    stream_hub.publish(key[len("price_"):], price_data)
+
+
+price_cache.add_listener(publish_price)
+
+# Cache and upstream state for /metrics, read at scrape time
+metrics.add_collector(price_cache.metrics)
+metrics.add_collector(fundamentals_cache.metrics)
+metrics.add_collector(rolling_states.metrics)
+metrics.add_collector(upstream_gateway.metrics)
+
+# Subscribed symbols get one shared refresh per interval, whatever the
+# number of subscribers
+stream_scheduler = RefreshScheduler(
+    "price_stream", refresh_prices,
+    interval=settings.STREAM_REFRESH_INTERVAL,
+    batch_size=settings.REFRESH_BATCH_SIZE,
+    budget=refresh_budget,
+    sources=[stream_hub.symbols])
+
+
+def load_screener_universe():
+    """Yahoo symbols the screener ranks: SCREENER_UNIVERSE, else every
+    listing in the symbol master, after the default stocks and capped at
+    SCREENER_MAX_SYMBOLS"""
+    symbols = [f"{s}.NS" for s in AVAILABLE_STOCKS]
+    if settings.SCREENER_UNIVERSE:
+        for symbol in settings.SCREENER_UNIVERSE.split(','):
+            symbol = symbol.strip().upper()
+            if symbol_index is not None:
+                symbol = symbol_index.resolve(symbol) or ''
+            elif symbol and '.' not in symbol:
+                symbol += '.NS'
+            if symbol:
+                symbols.append(symbol)
+    elif symbol_index is not None:
+        symbols += symbol_index.yahoo_symbols()
+    return list(dict.fromkeys(symbols))[:max(settings.SCREENER_MAX_SYMBOLS, 1)]
+
+
+# The fundamentals scheduler warms the whole screener universe, not just
+# the symbols users have opened
+screener_universe = load_screener_universe()
+fundamentals_scheduler = RefreshScheduler(
+    "fundamentals", refresh_fundamentals,
+    interval=settings.FUNDAMENTALS_CACHE_TTL * 0.8,
+    universe=screener_universe,
+    batch_size=1, bulk=False,
+    budget=refresh_budget,
+    hot_window=settings.REFRESH_HOT_WINDOW)
+
+
+def load_screener_rows():
+    """Screener rows from the caches only: no upstream calls"""
+    prices = price_cache.snapshot()
+    rows = []
+    for fundamentals in fundamentals_cache.snapshot().values():
+        symbol = fundamentals["symbol"]
+        price = prices.get(f"price_{symbol}")
+        rows.append({
+            "symbol": symbol,
+            "name": fundamentals.get("name"),
+            "sector": fundamentals.get("sector"),
+            "eps": fundamentals.get("eps"),
+            "currentPrice": price["current_price"] if price else fundamentals.get("currentPrice")
+        })
+    return rows
+
+
+# Columnar fundamentals for the screener universe, rebuilt from the caches
+# at most every 30 s; the fundamentals scheduler keeps the universe filled
+screener_table = FundamentalsTable(
+    load_screener_rows, SECTOR_FCF_RATIOS, universe=screener_universe)
+
+
+_http_date = (None, b'')
+
+
+def http_date():
+    """Date header value, formatted at most once per second"""
+    global _http_date
+    now = int(time.time())
+    second, value = _http_date
+    if second != now:
+        value = email.utils.formatdate(now, usegmt=True).encode()
+        _http_date = (now, value)
+    return value
+
+
+def parse_since(value):
+    """A client's last-seen version (?since= / "since"), or None"""
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError("'since' must be an integer version")
+
+
+class PooledHTTPServer(socketserver.TCPServer):
+    """TCPServer that hands each connection to a bounded worker pool.
+
+    At most ``max_queued`` connections wait for a worker. Past that the
+    accept thread answers 503 straight away and closes the connection, so
+    a burst of slow upstream fetches cannot pile up an unbounded backlog.
+    """
+
+    allow_reuse_address = True
+    # Room for bursts of (re)connecting stream subscribers
+    request_queue_size = 128
+
+    OVERLOADED = (b"HTTP/1.0 503 Service Unavailable\r\n"
+                  b"Content-Type: application/json\r\n"
+                  b"Access-Control-Allow-Origin: *\r\n"
+                  b"Retry-After: 1\r\n"
+                  b"Connection: close\r\n\r\n"
+                  b'{"success": false, "error": "Server busy, retry shortly"}')
+
+    def __init__(self, server_address, handler_class, max_workers=MAX_WORKERS,
+                 max_queued=MAX_QUEUED):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="http-worker")
+        # One slot per connection being handled or waiting for a worker
+        self.slots = threading.BoundedSemaphore(max_workers + max_queued)
+        self.rejected = 0
+        self.detached = set()
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            self.rejected += 1
+            self._reject(request)
+            return
+        try:
+            self.executor.submit(self._process_request_worker,
+                                 request, client_address)
+        except RuntimeError:
+            # Executor already shut down
+            self.slots.release()
+            self.shutdown_request(request)
+
+    def _reject(self, request):
+        try:
+            # Never let a slow client hold up the accept loop
+            request.settimeout(0.5)
+            request.sendall(self.OVERLOADED)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def detach(self, request):
+        """Keep a connection open after its handler returns (streaming)"""
+        self.detached.add(request)
+
+    def shutdown_request(self, request):
+        if request in self.detached:
+            self.detached.discard(request)
+            return
+        super().shutdown_request(request)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True, cancel_futures=False)
 
 
 def start_server():
     PORT = int(os.environ.get("PORT", 8000))
-    with socketserver.TCPServer(("", PORT), RealStockAPIHandler) as httpd:
+    with PooledHTTPServer(("", PORT), RealStockAPIHandler) as httpd:
+        metrics.add_collector(lambda: [(
+            "http_connections_rejected_total", "counter",
+            "Connections answered 503 because every worker and queue slot was taken",
+            [({}, httpd.rejected)])])
+
+        def request_shutdown(signum, frame):
+            # shutdown() blocks until serve_forever exits, so call it off-thread
+            print(f"\n🛑 Signal {signum} received, draining requests...")
+            threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, request_shutdown)
+        signal.signal(signal.SIGINT, request_shutdown)
+
+        if settings.REFRESH_ENABLED:
+            price_scheduler.start()
+            stream_scheduler.start()
+            fundamentals_scheduler.start()
+
         print(f"🚀 OPTIMIZED Portfolio Backend Started!")
         print(f"📍 Port: {PORT}")
+        print(f"🧵 Workers: {MAX_WORKERS}")
         print(f"📊 Endpoints:")
         print(f"   • /stocks/price/SYMBOL - Real prices (5-min cache)")
         print(f"   • /stocks/fundamentals/SYMBOL - EPS-based FCF estimation")
+        print(f"   • /stocks/batch/prices?symbols=A,B - Bulk prices (1 upstream call)")
+        print(f"   • /stocks/dcf/SYMBOL - DCF sensitivity grid")
+        print(f"   • /stocks/dcf/simulate?symbols=A,B - Monte Carlo DCF")
+        print(f"   • /stocks/screener - DCF ranking of the screener universe")
+        print(f"   • /stocks/history/SYMBOL?start=&end= - Daily OHLCV")
+        print(f"   • POST /stocks/portfolio/value - Portfolio valuation")
+        print(f"   • POST /stocks/portfolio/risk - Volatility, beta, drawdown, VaR")
+        print(f"   • POST /stocks/portfolio/optimize - Efficient frontier, max Sharpe")
+        print(f"   • POST /stocks/portfolio/backtest - Rebalanced allocation backtests")
+        print(f"   • /stocks/stream?symbols=A,B - Live quotes (Server-Sent Events)")
+        print(f"   • /stocks/search?q= - Symbol and company name typeahead")
         print(f"   • /stocks/ - Available stocks")
+        print(f"   • /metrics - Prometheus metrics")
+        print(f"   • /health, /ready - Liveness and readiness")
         print(f"⚡ Features: CORS enabled, 5-min caching, Accurate FCF estimation")
         print(f"\nPress Ctrl+C to stop")
+        warm_up.start()
         httpd.serve_forever()
+    price_scheduler.stop()
+    stream_scheduler.stop()
+    fundamentals_scheduler.stop()
+    stream_hub.stop()
+    print("👋 Server stopped")
 
 
 if __name__ == "__main__":
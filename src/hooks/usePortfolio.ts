@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Portfolio, Holding } from '../types/portfolio';
 import { stockApi } from '../services/stockApi';
 
@@ -11,6 +11,8 @@ export const usePortfolio = () => {
     const [portfolio, setPortfolio] = useState<Portfolio>({ holdings: [] });
     const [isLoaded, setIsLoaded] = useState(false);
     const [isUpdatingPrices, setIsUpdatingPrices] = useState(false);
+    // True while the live price stream is connected; polling pauses meanwhile
+    const isStreamingRef = useRef(false);
 
     // Load portfolio from localStorage on mount
     useEffect(() => {
@@ -58,7 +60,14 @@ export const usePortfolio = () => {
             const symbols = currentHoldings.map(h => h.symbol);
             console.log('📡 Fetching prices for symbols:', symbols);
 
-            const priceResults = await stockApi.getMultipleStockPrices(symbols);
+            // One round trip values the whole portfolio server-side; fall back
+            // to plain price lookups against backends without that endpoint
+            const valuation = await stockApi.valuePortfolio(currentHoldings);
+            const priceResults = valuation
+                ? valuation.holdings.map((h: any) => h.priceAvailable
+                    ? { success: true, data: { current_price: h.currentPrice } }
+                    : { success: false })
+                : await stockApi.getMultipleStockPrices(symbols);
 
             console.log('📊 Price results received:', priceResults);
 
@@ -105,9 +114,9 @@ export const usePortfolio = () => {
                 updateStockPrices();
             }, 500);
 
-            // Update prices every 2 minutes
+            // Update prices every 2 minutes unless the live stream is up
             const interval = setInterval(() => {
-                if (!isUpdatingPrices) {
+                if (!isUpdatingPrices && !isStreamingRef.current) {
                     updateStockPrices();
                 }
             }, 120000);
@@ -119,6 +128,38 @@ export const usePortfolio = () => {
         }
     }, [isLoaded, portfolio.holdings?.length]);
 
+    // Subscribe to pushed quotes for the current symbol set
+    const symbolKey = Array.from(new Set(
+        (portfolio.holdings || []).map(h => h.symbol.toUpperCase())
+    )).sort().join(',');
+
+    useEffect(() => {
+        if (!isLoaded || !symbolKey) return;
+
+        const unsubscribe = stockApi.subscribePrices(
+            symbolKey.split(','),
+            (quotes: Record<string, any>) => {
+                setPortfolio(prev => ({
+                    ...prev,
+                    holdings: prev.holdings.map(holding => {
+                        const quote = quotes[holding.symbol.toUpperCase()];
+                        return quote && quote.current_price
+                            ? { ...holding, currentPrice: quote.current_price }
+                            : holding;
+                    })
+                }));
+            },
+            (connected: boolean) => {
+                isStreamingRef.current = connected;
+            }
+        );
+
+        return () => {
+            isStreamingRef.current = false;
+            if (unsubscribe) unsubscribe();
+        };
+    }, [isLoaded, symbolKey]);
+
     const addHolding = (holdingData: Omit<Holding, 'id'>) => {
         console.log('➕ Adding new holding:', holdingData.symbol);
 
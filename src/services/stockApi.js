@@ -1,5 +1,8 @@
 const API_BASE = 'https://portfolio-visualizer-yql8.onrender.com';
 
+// Last portfolio valuation and its ETag, so an unchanged portfolio costs a 304
+let lastValuation = { body: null, etag: null, data: null };
+
 export const stockApi = {
     async getStockPrice(symbol) {
         try {
@@ -49,6 +52,10 @@ export const stockApi = {
     async getMultipleStockPrices(symbols) {
         try {
             console.log(`📡 Fetching real prices for: ${symbols.join(', ')}`);
+            const batch = await this.getBatchStockPrices(symbols);
+            if (batch) return batch;
+
+            // Older backends have no batch endpoint: fall back to one request per symbol
             const promises = symbols.map(symbol => this.getStockPrice(symbol));
             const results = await Promise.all(promises);
             return results;
@@ -67,5 +74,85 @@ export const stockApi = {
                 }
             }));
         }
+    },
+
+    async valuePortfolio(holdings) {
+        try {
+            const body = JSON.stringify({
+                holdings: holdings.map(h => ({
+                    symbol: h.symbol,
+                    quantity: h.quantity,
+                    purchasePrice: h.purchasePrice
+                }))
+            });
+            const headers = { 'Content-Type': 'application/json' };
+            if (lastValuation.body === body && lastValuation.etag) {
+                headers['If-None-Match'] = lastValuation.etag;
+            }
+
+            const response = await fetch(`${API_BASE}/stocks/portfolio/value`, {
+                method: 'POST',
+                headers,
+                body
+            });
+            if (response.status === 304) return lastValuation.data;
+            if (!response.ok) return null;
+
+            const data = await response.json();
+            if (!data.success) return null;
+            lastValuation = { body, etag: response.headers.get('ETag'), data: data.data };
+            return data.data;
+        } catch (error) {
+            console.error('❌ Portfolio valuation request failed:', error);
+            return null;
+        }
+    },
+
+    async getBatchStockPrices(symbols) {
+        try {
+            const query = encodeURIComponent(symbols.join(','));
+            const response = await fetch(`${API_BASE}/stocks/batch/prices?symbols=${query}`);
+            if (!response.ok) return null;
+
+            const data = await response.json();
+            if (!data.success || !data.data) return null;
+
+            return symbols.map(symbol => {
+                const price = data.data[symbol.toUpperCase()];
+                if (!price || price.error) {
+                    return { success: false, error: price ? price.error : 'No data' };
+                }
+                return { success: true, data: price };
+            });
+        } catch (error) {
+            console.error('❌ Batch price request failed:', error);
+            return null;
+        }
+    },
+
+    // Live quotes over Server-Sent Events. onQuotes receives {SYMBOL: price}
+    // keyed by the plain symbol, for changed quotes only. Returns an
+    // unsubscribe function, or null when the browser has no EventSource.
+    subscribePrices(symbols, onQuotes, onStatus = () => {}) {
+        if (typeof EventSource === 'undefined' || symbols.length === 0) return null;
+
+        const query = encodeURIComponent(symbols.join(','));
+        const source = new EventSource(`${API_BASE}/stocks/stream?symbols=${query}`);
+        source.onopen = () => onStatus(true);
+        // EventSource reconnects by itself; report the gap so callers can poll
+        source.onerror = () => onStatus(false);
+        source.addEventListener('quotes', event => {
+            try {
+                const quotes = {};
+                Object.entries(JSON.parse(event.data)).forEach(([symbol, price]) => {
+                    quotes[symbol] = price;
+                    quotes[symbol.replace(/\.(NS|BO)$/, '')] = price;
+                });
+                onQuotes(quotes);
+            } catch (error) {
+                console.error('❌ Bad stream event:', error);
+            }
+        });
+        return () => source.close();
     }
 };
\ No newline at end of file